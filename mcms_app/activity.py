@@ -0,0 +1,95 @@
+"""
+Activity log summaries: how many records of each kind were created in a
+date range and what they were worth. Every table is read with a single
+aggregate, and the result is cached per range and day until new activity
+is recorded.
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from . import cache_utils
+from .models import (
+    Deposit,
+    InventoryTransaction,
+    Loan,
+    LoanRepayment,
+    Motorcycle,
+    Sale,
+    Supplier,
+    SupplierDelivery,
+    SupplierPayment,
+    Withdrawal,
+)
+
+# Label -> (model, date field, amount field or None), in display order
+SUMMARY_SOURCES = [
+    ("New Sales", Sale, "sale_date", "final_price"),
+    ("New Supplier Payments", SupplierPayment, "payment_date", "amount_paid"),
+    ("New Deliveries", SupplierDelivery, "delivery_date", None),
+    ("New Deposits", Deposit, "deposit_date", "deposit_amount"),
+    ("New Withdrawals", Withdrawal, "withdrawal_date", "withdrawal_amount"),
+    ("New Loans", Loan, "loan_date", "loan_amount"),
+    ("New Loan Repayments", LoanRepayment, "repayment_date", "repayment_amount"),
+    ("Inventory Updates", InventoryTransaction, "transaction_date", None),
+    ("New Motorcycle Models", Motorcycle, "created_at", None),
+    ("New Suppliers", Supplier, "created_at", None),
+]
+
+
+def day_bounds(start_date, end_date):
+    """Aware datetimes spanning start_date through end_date inclusive."""
+
+    def midnight(day):
+        return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+    return midnight(start_date), midnight(end_date + datetime.timedelta(days=1))
+
+
+def compute_activity_summary(start_date, end_date):
+    """Count and total value per activity type, leaving out types with none."""
+    start, end = day_bounds(start_date, end_date)
+    summary = {}
+    for label, model, date_field, amount_field in SUMMARY_SOURCES:
+        if model._meta.get_field(date_field).get_internal_type() == "DateField":
+            in_range = {
+                f"{date_field}__gte": start_date,
+                f"{date_field}__lte": end_date,
+            }
+        else:
+            in_range = {f"{date_field}__gte": start, f"{date_field}__lt": end}
+        aggregates = {"count": Count("pk")}
+        if amount_field:
+            aggregates["total_amount"] = Sum(amount_field)
+
+        totals = model.objects.filter(**in_range).aggregate(**aggregates)
+        if not totals["count"]:
+            continue
+        summary[label] = {
+            "count": totals["count"],
+            "total_amount": (
+                (totals["total_amount"] or Decimal("0.00")) if amount_field else None
+            ),
+        }
+    return summary
+
+
+def activity_summary(start_date, end_date):
+    """
+    The cached summary for a range. Keys include today's date so a range that
+    is still open is recomputed daily even if nothing new is recorded.
+    """
+    return cache_utils.get_or_compute(
+        [cache_utils.ACTIVITY, cache_utils.LEDGER],
+        [
+            "activity-summary",
+            start_date.isoformat(),
+            end_date.isoformat(),
+            timezone.localdate().isoformat(),
+        ],
+        lambda: compute_activity_summary(start_date, end_date),
+        timeout=60 * 60 * 24,
+    )
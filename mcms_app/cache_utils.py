@@ -0,0 +1,92 @@
+"""
+Versioned cache namespaces. Every cached value is keyed with the current
+version of the namespaces it depends on, so bumping a version retires all of
+its entries at once without tracking or deleting individual keys. Versions
+are counted in the database, so a bump is atomic and every process sees it.
+"""
+
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+INVENTORY = "inventory"
+OPEN_ORDERS = "open-orders"
+LEDGER = "ledger"
+ACTIVITY = "activity"
+REPORTS = "reports"
+
+
+def get_versions(namespaces):
+    """{namespace: version}, read in one query and created where missing."""
+    from .models import CacheVersion
+
+    versions = dict(
+        CacheVersion.objects.filter(namespace__in=namespaces).values_list(
+            "namespace", "version"
+        )
+    )
+    for namespace in set(namespaces) - set(versions):
+        # Start from the clock rather than 1 so a recreated counter can never
+        # reissue a version that entries still in the cache were stored under.
+        versions[namespace] = CacheVersion.objects.get_or_create(
+            namespace=namespace, defaults={"version": int(time.time() * 1000)}
+        )[0].version
+    return versions
+
+
+def get_version(namespace):
+    return get_versions([namespace])[namespace]
+
+
+def bump_version(namespace):
+    from .models import CacheVersion
+
+    # A namespace nobody has read yet has no counter and nothing to retire.
+    CacheVersion.objects.filter(namespace=namespace).update(version=F("version") + 1)
+
+
+# Namespaces invalidated in the current thread's transaction
+_pending = threading.local()
+
+
+def _flush_pending():
+    namespaces = getattr(_pending, "namespaces", None)
+    _pending.namespaces = set()
+    for namespace in namespaces or ():
+        bump_version(namespace)
+
+
+def invalidate_on_commit(*namespaces):
+    """
+    Bump the namespaces once the current transaction commits. Each namespace
+    is bumped once per transaction however many writes invalidated it.
+    """
+    if not hasattr(_pending, "namespaces"):
+        _pending.namespaces = set()
+    _pending.namespaces.update(namespaces)
+    # As with payment completion checks, every call registers its own hook so
+    # a rollback cannot leave the set without one; later hooks find it empty.
+    transaction.on_commit(_flush_pending)
+
+
+def versioned_key(namespaces, *parts):
+    versions = get_versions(namespaces)
+    versions = ":".join(f"{ns}{versions[ns]}" for ns in namespaces)
+    return ":".join(["mcms", versions, *(str(part) for part in parts)])
+
+
+def get_or_compute(namespaces, parts, compute, timeout=None):
+    """
+    Return the cached value for `parts` under the given namespaces, computing
+    and storing it on a miss. Entries live until a namespace is bumped, or
+    for `timeout` seconds if one is given.
+    """
+    key = versioned_key(namespaces, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
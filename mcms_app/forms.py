@@ -8,7 +8,10 @@ from decimal import Decimal
 from django.forms.models import BaseInlineFormSet
 from decimal import Decimal, InvalidOperation
 from django.urls import reverse
+from django.utils.functional import cached_property
+from .reports import GRANULARITY_CHOICES, MAX_BUCKETS, bucket_count
 import datetime
+from collections import defaultdict
 
 
 class SupplierForm(forms.ModelForm):
@@ -136,6 +139,21 @@ class SupplierPaymentForm(forms.ModelForm):
         return cleaned_data
 
 
+class PreloadedModelChoiceField(forms.ModelChoiceField):
+    """
+    A ModelChoiceField that resolves submitted keys from objects its formset
+    loaded once, rather than running a query for every form.
+    """
+
+    def __init__(self, queryset, *args, loaded=None, **kwargs):
+        super().__init__(queryset, *args, **kwargs)
+        self.loaded = loaded or {}
+
+    def to_python(self, value):
+        obj = self.loaded.get(str(value))
+        return obj if obj is not None else super().to_python(value)
+
+
 class SupplierPaymentItemForm(forms.ModelForm):
     class Meta:
         model = SupplierPaymentItem
@@ -162,9 +180,15 @@ class SupplierPaymentItemForm(forms.ModelForm):
             "remarks": forms.TextInput(attrs={"class": "form-control"}),
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, motorcycles=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.fields["motorcycle_model"].queryset = Motorcycle.objects.all()
+        field = self.fields["motorcycle_model"]
+        self.fields["motorcycle_model"] = PreloadedModelChoiceField(
+            Motorcycle.objects.all(),
+            loaded=motorcycles,
+            widget=field.widget,
+            label=field.label,
+        )
 
         if hasattr(self.instance, "payment") and self.instance.payment:
             if self.instance.payment.status != SupplierPayment.ACTIVE or (
@@ -186,6 +210,16 @@ class SupplierPaymentItemForm(forms.ModelForm):
             raise ValidationError("Unit price must be greater than zero.")
         return price
 
+    def _get_validation_exclusions(self):
+        # The model choice field has already fetched the motorcycle, so the
+        # model's own foreign key check would only query for it again.
+        return super()._get_validation_exclusions() | {"motorcycle_model"}
+
+    def validate_unique(self):
+        # Lines are checked against each other by the formset and against
+        # the stored ones by SupplierPaymentItem.save_batch, in one query.
+        pass
+
     def clean(self):
         cleaned_data = super().clean()
         expected_quantity = cleaned_data.get("expected_quantity")
@@ -216,12 +250,49 @@ class BaseSupplierPaymentItemFormSet(BaseInlineFormSet):
         self.parent_amount_paid_for_items = kwargs.pop(
             "parent_amount_paid_for_items", None
         )
+        instance = kwargs.get("instance")
+        if instance is not None and instance.pk and kwargs.get("queryset") is None:
+            # Lines loaded through the relation share the parent payment object,
+            # so its status and delivery checks run once instead of per line.
+            kwargs["queryset"] = instance.payment_items.all()
         super().__init__(*args, **kwargs)
 
         for form in self.forms:
             form.parent_payment_amount_paid = self.parent_amount_paid_for_items
             form.formset_parent_instance = self.instance
 
+    @cached_property
+    def _motorcycles(self):
+        return {
+            str(motorcycle.pk): motorcycle for motorcycle in Motorcycle.objects.all()
+        }
+
+    def get_form_kwargs(self, index):
+        kwargs = super().get_form_kwargs(index)
+        if self.is_bound:
+            # Submitted lines look their model up here instead of one by one.
+            kwargs["motorcycles"] = self._motorcycles
+        return kwargs
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        if self.is_bound:
+            pk_field = form.fields[self._pk_field.name]
+            form.fields[self._pk_field.name] = PreloadedModelChoiceField(
+                pk_field.queryset,
+                loaded={str(item.pk): item for item in self.get_queryset()},
+                initial=pk_field.initial,
+                required=False,
+                widget=pk_field.widget,
+            )
+
+    def save_items(self, user=None):
+        """Save the submitted lines through the payment item batch path."""
+        items = self.save(commit=False)
+        return SupplierPaymentItem.save_batch(
+            self.instance, items, self.deleted_objects, user=user
+        )
+
     def clean(self):
         super().clean()
 
@@ -358,30 +429,10 @@ class SupplierDeliveryForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         available_payments_queryset = (
             SupplierPayment.objects.filter(
-                status=SupplierPayment.ACTIVE, payment_items__isnull=False
-            )
-            .annotate(
-                annotated_total_expected_quantity=Coalesce(
-                    Sum("payment_items__expected_quantity"),
-                    0,
-                    output_field=DecimalField(),
+                status=SupplierPayment.ACTIVE,
+                payment_items__expected_quantity__gt=F(
+                    "payment_items__delivered_quantity"
                 ),
-                annotated_total_delivered_quantity=Coalesce(
-                    Sum(
-                        "deliveries__delivery_items__delivered_quantity",
-                        filter=Q(deliveries__is_cancelled=False),
-                    ),
-                    0,
-                    output_field=DecimalField(),
-                ),
-            )
-            .filter(
-                Q(
-                    annotated_total_delivered_quantity__lt=F(
-                        "annotated_total_expected_quantity"
-                    )
-                )
-                | Q(annotated_total_expected_quantity=Decimal("0.00"))
             )
             .select_related("supplier")
             .distinct()
@@ -479,6 +530,18 @@ class SupplierDeliveryItemFormSetHelper:
 
     def get_formset(self, data=None, instance=None):
         class ValidatedDeliveryFormSet(self.formset_class):
+            def full_clean(self):
+                # Load the payment's quantities once and hand them to every
+                # row, so each item's model clean validates without queries.
+                self.delivery_allowance = None
+                if self.is_bound and getattr(self.instance, "payment_id", None):
+                    self.delivery_allowance = DeliveryAllowance.for_delivery(
+                        self.instance
+                    )
+                    for form in self.forms:
+                        form.instance._delivery_allowance = self.delivery_allowance
+                super().full_clean()
+
             def clean(self):
                 super().clean()
 
@@ -492,57 +555,34 @@ class SupplierDeliveryItemFormSetHelper:
                     raise ValidationError("At least one delivery item is required")
 
                 motorcycle_models_seen = {}
+                pending = defaultdict(int)
 
                 for i, form in enumerate(forms_to_process):
                     motorcycle_model = form.cleaned_data.get("motorcycle_model")
                     delivered_quantity = form.cleaned_data.get("delivered_quantity")
 
-                    if motorcycle_model:
-                        if motorcycle_model in motorcycle_models_seen:
-                            form.add_error(
-                                "motorcycle_model",
-                                f"Duplicate motorcycle model: {motorcycle_model}",
-                            )
-                        motorcycle_models_seen[motorcycle_model] = i
-
-                        if self.instance and self.instance.pk and self.instance.payment:
-                            try:
-                                payment_item = self.instance.payment.payment_items.get(
-                                    motorcycle_model=motorcycle_model
-                                )
-                            except SupplierPaymentItem.DoesNotExist:
-                                form.add_error(
-                                    "motorcycle_model",
-                                    f"'{motorcycle_model}' was not included in the original payment.",
-                                )
-                                continue
-
-                            if (
-                                delivered_quantity is not None
-                                and delivered_quantity > 0
-                            ):
-                                total_delivered_existing_in_db = (
-                                    SupplierDeliveryItem.objects.filter(
-                                        delivery__payment=self.instance.payment,
-                                        motorcycle_model=motorcycle_model,
-                                        delivery__is_cancelled=False,
-                                    )
-                                    .exclude(
-                                        pk=form.instance.pk if form.instance else None
-                                    )
-                                    .aggregate(total=Sum("delivered_quantity"))["total"]
-                                    or 0
-                                )
-
-                                if (
-                                    total_delivered_existing_in_db + delivered_quantity
-                                ) > payment_item.expected_quantity:
-                                    form.add_error(
-                                        "delivered_quantity",
-                                        f"Total delivered quantity for {motorcycle_model} "
-                                        f"({total_delivered_existing_in_db + delivered_quantity}) exceeds "
-                                        f"expected quantity ({payment_item.expected_quantity}).",
-                                    )
+                    if not motorcycle_model:
+                        continue
+
+                    if motorcycle_model in motorcycle_models_seen:
+                        form.add_error(
+                            "motorcycle_model",
+                            f"Duplicate motorcycle model: {motorcycle_model}",
+                        )
+                    motorcycle_models_seen[motorcycle_model] = i
+
+                    if self.delivery_allowance is None or form.errors:
+                        continue
+
+                    problem = self.delivery_allowance.check(
+                        motorcycle_model,
+                        delivered_quantity,
+                        pending=pending[motorcycle_model.pk],
+                    )
+                    if problem:
+                        form.add_error(*problem)
+                    else:
+                        pending[motorcycle_model.pk] += delivered_quantity or 0
 
         return ValidatedDeliveryFormSet(data=data, instance=instance)
 
@@ -605,6 +645,35 @@ class InventoryFilterForm(forms.Form):
     )
 
 
+class ReorderPlanForm(forms.Form):
+    target_days = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=365,
+        widget=forms.NumberInput(
+            attrs={"class": "form-control", "placeholder": "Days of cover"}
+        ),
+    )
+    windows = forms.CharField(
+        required=False,
+        widget=forms.TextInput(
+            attrs={"class": "form-control", "placeholder": "Windows, e.g. 7,30,90"}
+        ),
+    )
+
+    def clean_windows(self):
+        raw = self.cleaned_data.get("windows")
+        if not raw:
+            return None
+        try:
+            windows = sorted({int(part) for part in raw.split(",") if part.strip()})
+        except ValueError:
+            raise ValidationError("Enter whole numbers of days separated by commas.")
+        if not windows or windows[0] < 1 or windows[-1] > 365:
+            raise ValidationError("Each window must be between 1 and 365 days.")
+        return windows
+
+
 class MotorcycleForm(forms.ModelForm):
     class Meta:
         model = Motorcycle
@@ -695,6 +764,16 @@ class CustomerFilterForm(forms.Form):
         required=False,
         widget=forms.TextInput(attrs={"class": "form-control", "placeholder": "phone"}),
     )
+    sort = forms.ChoiceField(
+        choices=[
+            ("", "Sort by Name"),
+            ("-balance", "Highest Balance"),
+            ("balance", "Lowest Balance"),
+        ],
+        required=False,
+        label="Sort",
+        widget=forms.Select(attrs={"class": "form-control"}),
+    )
 
 
 class DepositForm(forms.ModelForm):
@@ -859,9 +938,11 @@ class WithdrawalForm(forms.ModelForm):
             self.fields["withdrawal_date"].initial = timezone.now().date()
 
         if not self.instance.pk:
-            self.fields["deposit"].queryset = Deposit.objects.filter(
-                deposit_status__in=["active"]
-            ).select_related("customer")
+            self.fields["deposit"].queryset = (
+                Deposit.objects.filter(deposit_status__in=["active"])
+                .select_related("customer")
+                .with_balances()
+            )
         else:
             current_deposit = self.instance.deposit
             available_deposits = Deposit.objects.filter(
@@ -871,10 +952,22 @@ class WithdrawalForm(forms.ModelForm):
             if current_deposit and current_deposit not in available_deposits:
                 from django.db.models import Q
 
-                self.fields["deposit"].queryset = Deposit.objects.filter(
-                    Q(deposit_status__in=["active", "completed"])
-                    | Q(pk=current_deposit.pk)
-                ).select_related("customer")
+                self.fields["deposit"].queryset = (
+                    Deposit.objects.filter(
+                        Q(deposit_status__in=["active", "completed"])
+                        | Q(pk=current_deposit.pk)
+                    )
+                    .select_related("customer")
+                    .with_balances()
+                )
+            else:
+                self.fields["deposit"].queryset = Deposit.objects.select_related(
+                    "customer"
+                ).with_balances()
+
+        self.fields["deposit"].label_from_instance = (
+            lambda deposit: f"{deposit} (₦{deposit.remaining_balance:,.2f} available)"
+        )
 
     def clean(self):
         cleaned_data = super().clean()
@@ -1472,3 +1565,159 @@ class ActivityLogFilterForm(forms.Form):
         initial="summary",
         widget=forms.Select(attrs={"class": "form-select"}),
     )
+
+    event_type = forms.ChoiceField(
+        choices=[("", "All Activity")] + ActivityEvent.EVENT_TYPES,
+        required=False,
+        label="Activity Type",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+
+    date_from = forms.DateField(
+        required=False,
+        label="From",
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    date_to = forms.DateField(
+        required=False,
+        label="To",
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get("date_from")
+        date_to = cleaned_data.get("date_to")
+        if date_to and not date_from:
+            raise ValidationError({"date_from": "Choose where the range starts."})
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError({"date_to": "The range cannot end before it starts."})
+        return cleaned_data
+
+
+class PeriodReportForm(forms.Form):
+    date_from = forms.DateField(
+        label="From",
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    date_to = forms.DateField(
+        label="To",
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    granularity = forms.ChoiceField(
+        choices=GRANULARITY_CHOICES,
+        initial="monthly",
+        label="Group By",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    compare = forms.BooleanField(
+        required=False,
+        label="Compare with previous year",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get("date_from")
+        date_to = cleaned_data.get("date_to")
+        granularity = cleaned_data.get("granularity")
+        if not (date_from and date_to and granularity):
+            return cleaned_data
+        if date_from > date_to:
+            raise ValidationError({"date_to": "The range cannot end before it starts."})
+        if bucket_count(date_from, date_to, granularity) > MAX_BUCKETS:
+            raise ValidationError(
+                f"That range has more than {MAX_BUCKETS} periods; "
+                "choose a shorter range or a coarser grouping."
+            )
+        return cleaned_data
+
+
+class ReportJobForm(forms.Form):
+    DATED_REPORTS = (ReportJob.ACTIVITY_LOG, ReportJob.PERIOD_REPORT)
+
+    report_type = forms.ChoiceField(
+        choices=ReportJob.REPORT_TYPES,
+        label="Report",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    date_from = forms.DateField(
+        required=False,
+        label="From",
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    date_to = forms.DateField(
+        required=False,
+        label="To",
+        widget=forms.DateInput(attrs={"class": "form-control", "type": "date"}),
+    )
+    granularity = forms.ChoiceField(
+        choices=GRANULARITY_CHOICES,
+        required=False,
+        initial="monthly",
+        label="Group By",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    compare = forms.BooleanField(
+        required=False,
+        label="Compare with previous year",
+        widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
+    )
+    event_type = forms.ChoiceField(
+        choices=[("", "All Activity")] + ActivityEvent.EVENT_TYPES,
+        required=False,
+        label="Activity Type",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    customer = forms.ModelChoiceField(
+        queryset=Customer.objects.order_by("lastname", "firstname"),
+        required=False,
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        report_type = cleaned_data.get("report_type")
+
+        if report_type in self.DATED_REPORTS:
+            date_from = cleaned_data.get("date_from")
+            date_to = cleaned_data.get("date_to") or date_from
+            cleaned_data["date_to"] = date_to
+            if not date_from:
+                raise ValidationError({"date_from": "Choose where the range starts."})
+            if date_from > date_to:
+                raise ValidationError(
+                    {"date_to": "The range cannot end before it starts."}
+                )
+
+        if report_type == ReportJob.PERIOD_REPORT:
+            granularity = cleaned_data.get("granularity") or "monthly"
+            cleaned_data["granularity"] = granularity
+            if bucket_count(date_from, date_to, granularity) > MAX_BUCKETS:
+                raise ValidationError(
+                    f"That range has more than {MAX_BUCKETS} periods; "
+                    "choose a shorter range or a coarser grouping."
+                )
+
+        if report_type == ReportJob.CUSTOMER_STATEMENT and not cleaned_data.get(
+            "customer"
+        ):
+            raise ValidationError({"customer": "Choose a customer."})
+        return cleaned_data
+
+    def get_params(self):
+        """The job parameters for the chosen report, as JSON-ready values."""
+        cleaned_data = self.cleaned_data
+        report_type = cleaned_data["report_type"]
+        params = {}
+        if report_type in self.DATED_REPORTS:
+            params["date_from"] = cleaned_data["date_from"].isoformat()
+            params["date_to"] = cleaned_data["date_to"].isoformat()
+        if report_type == ReportJob.ACTIVITY_LOG:
+            params["event_type"] = cleaned_data["event_type"]
+        elif report_type == ReportJob.PERIOD_REPORT:
+            params["granularity"] = cleaned_data["granularity"]
+            params["compare"] = cleaned_data["compare"]
+        elif report_type == ReportJob.CUSTOMER_STATEMENT:
+            params["customer"] = cleaned_data["customer"].pk
+        return params
@@ -0,0 +1,292 @@
+"""
+Background report jobs. Reports too heavy to build inside a request are
+queued as ReportJob rows and run by the run_report_worker command; each
+report type has a runner that renders the report to HTML while reporting
+progress, and a check for whether records it read have changed since, which
+decides whether a finished job can be handed out again for the same
+parameters.
+"""
+
+import datetime
+import logging
+import traceback
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.template.loader import render_to_string
+
+from .activity import day_bounds
+from .models import (
+    ActivityEvent,
+    Customer,
+    Deposit,
+    InventoryCost,
+    Loan,
+    LoanRepayment,
+    ReportJob,
+    Sale,
+    Withdrawal,
+)
+from .reports import REPORT_SOURCES, compute_period_report
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+
+
+def _dates(params):
+    return (
+        datetime.date.fromisoformat(params["date_from"]),
+        datetime.date.fromisoformat(params["date_to"]),
+    )
+
+
+def _range_title(name, start_date, end_date):
+    return f"{name} for {start_date:%b %d, %Y} to {end_date:%b %d, %Y}"
+
+
+def _activity_events(params):
+    start, end = day_bounds(*_dates(params))
+    events = ActivityEvent.objects.filter(occurred_at__gte=start, occurred_at__lt=end)
+    if params.get("event_type"):
+        events = events.filter(event_type=params["event_type"])
+    return events
+
+
+def run_activity_log(params, progress):
+    events = _activity_events(params).only(
+        "occurred_at", "event_type", "action", "description"
+    )
+    total = events.count()
+    activities = []
+    for activity in events.iterator(chunk_size=CHUNK_SIZE):
+        activities.append(activity)
+        if len(activities) % CHUNK_SIZE == 0:
+            progress(
+                90 * len(activities) / total,
+                f"Read {len(activities)} of {total} events",
+            )
+    progress(90, "Rendering")
+    title = _range_title("Activity Log", *_dates(params))
+    return title, render_to_string(
+        "reports/jobs/activity_log.html",
+        {"title": title, "activities": activities},
+    )
+
+
+def activity_log_changed(params, since):
+    return _activity_events(params).filter(recorded_at__gte=since).exists()
+
+
+def run_period_report(params, progress):
+    start_date, end_date = _dates(params)
+    progress(10, "Totalling ledger records")
+    report = compute_period_report(
+        start_date, end_date, params["granularity"], params["compare"]
+    )
+    progress(90, "Rendering")
+    title = _range_title("Period Report", start_date, end_date)
+    return title, render_to_string(
+        "reports/period_report.html",
+        {
+            "title": title,
+            "report": report,
+            "compare": params["compare"],
+            "print_mode": True,
+        },
+    )
+
+
+def period_report_changed(params, since):
+    start_date, end_date = _dates(params)
+    if params["compare"]:
+        start_date -= datetime.timedelta(days=366)
+    start, end = day_bounds(start_date, end_date)
+    return any(
+        model.objects.filter(
+            **{
+                f"{date_field}__gte": start,
+                f"{date_field}__lt": end,
+                "updated_at__gte": since,
+            }
+        ).exists()
+        for _, _, model, date_field, *_ in REPORT_SOURCES
+    )
+
+
+def run_customer_statement(params, progress):
+    customer = Customer.objects.get(pk=params["customer"])
+
+    progress(10, "Reading deposits and withdrawals")
+    movements = [
+        (date, reference, "Deposit", amount)
+        for date, reference, amount in Deposit.objects.filter(
+            customer=customer, deposit_status__in=["active", "completed"]
+        ).values_list("deposit_date", "deposit_reference", "deposit_amount")
+    ] + [
+        (date, reference, "Withdrawal", -amount)
+        for date, reference, amount in Withdrawal.objects.filter(
+            deposit__customer=customer, withdrawal_status="completed"
+        ).values_list(
+            "withdrawal_date", "deposit__deposit_reference", "withdrawal_amount"
+        )
+    ]
+    movements.sort(key=lambda movement: movement[0])
+    ledger = []
+    balance = Decimal("0.00")
+    for date, reference, kind, amount in movements:
+        balance += amount
+        ledger.append(
+            {
+                "date": date,
+                "reference": reference,
+                "kind": kind,
+                "amount": abs(amount),
+                "balance": balance,
+            }
+        )
+
+    progress(50, "Reading sales and loans")
+    sales = Sale.objects.filter(customer=customer).select_related("motorcycle")
+    loans = Loan.objects.filter(customer=customer).annotate(
+        repaid=Sum("loanrepayment__repayment_amount")
+    )
+
+    progress(90, "Rendering")
+    title = f"Statement for {customer.name}"
+    return title, render_to_string(
+        "reports/jobs/customer_statement.html",
+        {
+            "title": title,
+            "customer": customer,
+            "ledger": ledger,
+            "balance": balance,
+            "sales": sales.order_by("sale_date"),
+            "loans": loans.order_by("loan_date"),
+        },
+    )
+
+
+def customer_statement_changed(params, since):
+    customer = params["customer"]
+    return any(
+        queryset.filter(updated_at__gte=since).exists()
+        for queryset in (
+            Customer.objects.filter(pk=customer),
+            Deposit.objects.filter(customer=customer),
+            Withdrawal.objects.filter(deposit__customer=customer),
+            Sale.objects.filter(customer=customer),
+            Loan.objects.filter(customer=customer),
+            LoanRepayment.objects.filter(loan__customer=customer),
+        )
+    )
+
+
+def run_inventory_valuation(params, progress):
+    progress(10, "Reading stock costs")
+    rows = list(
+        InventoryCost.objects.select_related("motorcycle_model").order_by(
+            "motorcycle_model__brand", "motorcycle_model__name"
+        )
+    )
+    for row in rows:
+        row.average_value = row.units_on_hand * row.average_unit_cost
+    progress(90, "Rendering")
+    title = "Inventory Valuation"
+    return title, render_to_string(
+        "reports/jobs/inventory_valuation.html",
+        {"title": title, "rows": rows, "totals": InventoryCost.valuation()},
+    )
+
+
+def inventory_valuation_changed(params, since):
+    return InventoryCost.objects.filter(updated_at__gte=since).exists()
+
+
+# Models each report type reads. The change checks compare updated_at, which
+# cannot see deletes, so deleting a row from any of these retires the type's
+# running and finished jobs (see signals.invalidate_report_jobs).
+REPORT_SOURCE_MODELS = {
+    ReportJob.ACTIVITY_LOG: [ActivityEvent],
+    ReportJob.PERIOD_REPORT: [model for _, _, model, *_ in REPORT_SOURCES],
+    ReportJob.CUSTOMER_STATEMENT: [
+        Customer,
+        Deposit,
+        Withdrawal,
+        Sale,
+        Loan,
+        LoanRepayment,
+    ],
+    ReportJob.INVENTORY_VALUATION: [InventoryCost],
+}
+
+# Report type -> (runner, check for changes since a run started)
+REPORT_RUNNERS = {
+    ReportJob.ACTIVITY_LOG: (run_activity_log, activity_log_changed),
+    ReportJob.PERIOD_REPORT: (run_period_report, period_report_changed),
+    ReportJob.CUSTOMER_STATEMENT: (
+        run_customer_statement,
+        customer_statement_changed,
+    ),
+    ReportJob.INVENTORY_VALUATION: (
+        run_inventory_valuation,
+        inventory_valuation_changed,
+    ),
+}
+
+
+def is_current(job):
+    """Whether a finished job's output still reflects the records it read."""
+    _, changed = REPORT_RUNNERS[job.report_type]
+    return (
+        job.status == ReportJob.DONE
+        and job.invalidated_at is None
+        and not changed(job.params, job.started_at)
+    )
+
+
+def enqueue(report_type, params, user=None):
+    """
+    Return the job for these parameters and whether it was newly created.
+    A job already queued or running is shared, and a finished one is reused
+    while nothing it read has changed or been deleted; otherwise a new job
+    is queued.
+    """
+    latest = (
+        ReportJob.objects.filter(
+            params_key=ReportJob.make_key(report_type, params),
+            status__in=[ReportJob.QUEUED, ReportJob.RUNNING, ReportJob.DONE],
+        )
+        .defer("output")
+        .order_by("-created_at")
+        .first()
+    )
+    if latest and (
+        latest.status == ReportJob.QUEUED
+        or (latest.status == ReportJob.RUNNING and latest.invalidated_at is None)
+        or is_current(latest)
+    ):
+        return latest, False
+    job = ReportJob.objects.create(
+        report_type=report_type, params=params, requested_by=user
+    )
+    return job, True
+
+
+def execute_job(pk, token):
+    """
+    Run a claimed job to completion and return its final status, or None if
+    another worker claimed it again before this run could record a result.
+    """
+    job = ReportJob.objects.filter(pk=pk, claim_token=token).first()
+    if job is None:
+        return None
+    run, _ = REPORT_RUNNERS[job.report_type]
+    try:
+        title, output = run(job.params, job.set_progress)
+    except Exception:
+        logger.exception("Report job %s failed", pk)
+        recorded = job.fail(traceback.format_exc())
+    else:
+        recorded = job.finish(title, output)
+    return job.status if recorded else None
@@ -0,0 +1,210 @@
+"""
+Dashboard KPIs. Each table is read once: the sales windows come from a single
+grouped query with conditional aggregates over the daily sales rollup, so
+they cost a few rows per day rather than a scan of the sales. The whole set
+is cached for the day and retired as soon as a ledger, stock or open order
+change commits.
+"""
+
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import cache_utils
+from .models import (
+    CostLayerConsumption,
+    DailySalesFact,
+    Deposit,
+    Inventory,
+    InventoryCost,
+    InventoryTransaction,
+    Loan,
+    LoanRepayment,
+    OpenOrderLine,
+    Sale,
+    SupplierDelivery,
+    SupplierPayment,
+    Withdrawal,
+)
+
+LOW_STOCK_THRESHOLD = 2
+SALES_WINDOWS = ("week", "month", "year")
+
+
+def window_starts(today):
+    """First day of this week, month and year."""
+    return {
+        "week": today - datetime.timedelta(days=today.weekday()),
+        "month": today.replace(day=1),
+        "year": today.replace(month=1, day=1),
+    }
+
+
+def _sales_kpis(starts):
+    aggregates = {}
+    for window, start in starts.items():
+        in_window = Q(day__gte=start)
+        aggregates[f"{window}_count"] = Coalesce(
+            Sum("sales_count", filter=in_window), 0
+        )
+        aggregates[f"{window}_value"] = Coalesce(
+            Sum("revenue", filter=in_window), Value(Decimal("0.00"))
+        )
+
+    rows = (
+        DailySalesFact.objects.filter(status="ACTIVE", day__gte=min(starts.values()))
+        .order_by()
+        .values("motorcycle_model__brand", "motorcycle_model__name", "payment_type")
+        .annotate(**aggregates)
+    )
+
+    kpis = {f"sales_this_{window}_count": 0 for window in SALES_WINDOWS}
+    kpis.update(
+        {f"sales_this_{window}_value": Decimal("0.00") for window in SALES_WINDOWS}
+    )
+    units_by_model = defaultdict(int)
+    month_by_payment_type = defaultdict(lambda: {"count": 0, "total_value": 0})
+    for row in rows:
+        for window in SALES_WINDOWS:
+            kpis[f"sales_this_{window}_count"] += row[f"{window}_count"]
+            kpis[f"sales_this_{window}_value"] += row[f"{window}_value"]
+        units_by_model[
+            (row["motorcycle_model__brand"], row["motorcycle_model__name"])
+        ] += row["year_count"]
+        if row["month_count"]:
+            summary = month_by_payment_type[row["payment_type"]]
+            summary["count"] += row["month_count"]
+            summary["total_value"] += row["month_value"]
+
+    kpis["top_selling_models_year_qty"] = [
+        {"motorcycle__brand": brand, "motorcycle__name": name, "count": count}
+        for (brand, name), count in sorted(
+            units_by_model.items(), key=lambda item: item[1], reverse=True
+        )
+        if count
+    ][:3]
+    kpis["sales_by_payment_type_month"] = sorted(
+        (
+            {"payment_type": payment_type, **summary}
+            for payment_type, summary in month_by_payment_type.items()
+        ),
+        key=lambda row: row["total_value"],
+        reverse=True,
+    )
+    return kpis
+
+
+def _cost_of_sales(start):
+    start = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+    return CostLayerConsumption.objects.filter(
+        sale__status="ACTIVE", sale__sale_date__gte=start, is_reversed=False
+    ).aggregate(
+        total=Coalesce(
+            Sum(F("quantity") * F("unit_cost"), output_field=DecimalField()),
+            Value(Decimal("0.00")),
+            output_field=DecimalField(),
+        )
+    )[
+        "total"
+    ]
+
+
+def _stock_kpis():
+    return Inventory.objects.aggregate(
+        total_inventory_units=Coalesce(Sum("current_quantity"), Value(0)),
+        low_stock_items_count=Count(
+            "id",
+            filter=Q(current_quantity__gt=0, current_quantity__lte=LOW_STOCK_THRESHOLD),
+        ),
+        out_of_stock_items_count=Count("id", filter=Q(current_quantity__lte=0)),
+    )
+
+
+def _recent_activity():
+    return {
+        "recent_sales": list(
+            Sale.objects.filter(status="ACTIVE")
+            .select_related("customer", "motorcycle")
+            .order_by("-sale_date")[:6]
+        ),
+        "recent_deposits": list(
+            Deposit.objects.select_related("customer").order_by("-deposit_date")[:3]
+        ),
+        "recent_withdrawals": list(
+            Withdrawal.objects.select_related("deposit__customer", "sale").order_by(
+                "-withdrawal_date"
+            )[:3]
+        ),
+        "recent_loans": list(
+            Loan.objects.select_related("customer", "sale").order_by("-loan_date")[:3]
+        ),
+        "recent_repayments": list(
+            LoanRepayment.objects.select_related("loan__customer").order_by(
+                "-repayment_date"
+            )[:5]
+        ),
+        "recent_supplier_payments": list(
+            SupplierPayment.objects.select_related("supplier").order_by(
+                "-payment_date"
+            )[:5]
+        ),
+        "recent_inventory_transactions": list(
+            InventoryTransaction.objects.select_related("motorcycle_model").order_by(
+                "-transaction_date"
+            )[:5]
+        ),
+        "recent_supplier_deliveries": list(
+            SupplierDelivery.objects.select_related("payment__supplier").order_by(
+                "-delivery_date"
+            )[:3]
+        ),
+    }
+
+
+def compute_dashboard_kpis(today=None):
+    today = today or timezone.localdate()
+    starts = window_starts(today)
+
+    kpis = _sales_kpis(starts)
+    cost_of_sales = _cost_of_sales(starts["month"])
+    kpis["cost_of_sales_this_month"] = cost_of_sales
+    kpis["gross_margin_this_month"] = kpis["sales_this_month_value"] - cost_of_sales
+
+    kpis["total_customer_deposit_balance"] = (
+        Deposit.objects.filter(deposit_status="active")
+        .with_balances()
+        .aggregate(
+            total=Coalesce(
+                Sum("annotated_remaining_balance"),
+                Value(Decimal("0.00")),
+                output_field=DecimalField(),
+            )
+        )["total"]
+    )
+    kpis["total_outstanding_loan_balance"] = Loan.objects.filter(
+        loan_status__in=["pending", "partially repaid"]
+    ).aggregate(total=Coalesce(Sum("balance"), Value(Decimal("0.00"))))["total"]
+
+    kpis.update(_stock_kpis())
+    kpis["estimated_total_inventory_value"] = InventoryCost.valuation()["fifo_value"]
+
+    undelivered = OpenOrderLine.totals()
+    kpis["total_undelivered_units_from_suppliers"] = undelivered["units"]
+    kpis["total_undelivered_value_from_suppliers"] = undelivered["value"]
+
+    kpis.update(_recent_activity())
+    return kpis
+
+
+def dashboard_kpis():
+    """Today's dashboard figures, recomputed after any ledger or stock change."""
+    return cache_utils.get_or_compute(
+        [cache_utils.LEDGER, cache_utils.INVENTORY, cache_utils.OPEN_ORDERS],
+        ["dashboard", timezone.localdate().isoformat()],
+        compute_dashboard_kpis,
+        timeout=60 * 60 * 24,
+    )
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import ActivityEvent
+
+
+class Command(BaseCommand):
+    help = "Record activity events for existing records that have none."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Records described and inserted per batch.",
+        )
+
+    def handle(self, *args, **options):
+        written = ActivityEvent.backfill(batch_size=options["batch_size"])
+
+        if written:
+            self.stdout.write(
+                self.style.WARNING(f"Recorded {written} missing activity event(s).")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("Every tracked record already has its event.")
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import CostLayer, InventoryCost
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild FIFO cost layers and average costs by replaying deliveries and sales."
+    )
+
+    def handle(self, *args, **options):
+        layer_count, sale_count = CostLayer.rebuild()
+        valuation = InventoryCost.valuation()
+
+        self.stdout.write(
+            f"Opened {layer_count} layer(s), costed {sale_count} sale(s). "
+            f"{valuation['units']} unit(s) valued at {valuation['fifo_value']} (FIFO), "
+            f"{valuation['average_value']:.2f} (weighted average)."
+        )
+        self.stdout.write(self.style.SUCCESS("Cost layers rebuilt."))
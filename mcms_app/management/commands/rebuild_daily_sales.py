@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import DailySalesFact
+
+
+class Command(BaseCommand):
+    help = "Recompute the daily sales rollup from the sale records."
+
+    def handle(self, *args, **options):
+        drifted = DailySalesFact.rebuild()
+
+        if drifted:
+            self.stdout.write(
+                self.style.WARNING(f"Corrected {drifted} daily sales row(s).")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("Daily sales rollup matches the sale records.")
+            )
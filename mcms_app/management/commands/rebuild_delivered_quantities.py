@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import SupplierPaymentItem
+
+
+class Command(BaseCommand):
+    help = "Recompute delivered quantities on supplier payment items from their deliveries."
+
+    def handle(self, *args, **options):
+        drifted = SupplierPaymentItem.rebuild_delivered_quantities()
+
+        if drifted:
+            self.stdout.write(
+                self.style.WARNING(f"Corrected {drifted} payment item(s).")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("Delivered quantities match the deliveries.")
+            )
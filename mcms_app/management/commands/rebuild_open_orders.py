@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import OpenOrderLine
+
+
+class Command(BaseCommand):
+    help = "Recompute the open order book from active supplier payment items."
+
+    def handle(self, *args, **options):
+        drifted = OpenOrderLine.rebuild()
+
+        if drifted:
+            self.stdout.write(
+                self.style.WARNING(f"Corrected {drifted} open order line(s).")
+            )
+        else:
+            self.stdout.write(
+                self.style.SUCCESS("Open order book matches the payment items.")
+            )
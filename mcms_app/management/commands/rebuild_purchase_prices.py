@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import PurchasePrice
+
+
+class Command(BaseCommand):
+    help = "Rebuild the purchase price history from supplier payment items."
+
+    def handle(self, *args, **options):
+        count = PurchasePrice.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {count} purchase price record(s).")
+        )
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import Customer, CustomerBalance
+
+
+class Command(BaseCommand):
+    help = "Verify stored customer deposit balances against deposits and withdrawals."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Overwrite drifted balances with the recomputed totals.",
+        )
+
+    def handle(self, *args, **options):
+        drift = CustomerBalance.reconcile(fix=options["fix"])
+
+        if not drift:
+            self.stdout.write(
+                self.style.SUCCESS("Customer balances match deposits and withdrawals.")
+            )
+            return
+
+        names = {
+            c.pk: str(c)
+            for c in Customer.objects.filter(
+                pk__in=[entry["customer_id"] for entry in drift]
+            )
+        }
+        for entry in drift:
+            self.stdout.write(
+                f"{names.get(entry['customer_id'], entry['customer_id'])}: "
+                f"recorded={entry['recorded_balance']} ledger={entry['ledger_balance']}"
+            )
+
+        if options["fix"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Corrected {len(drift)} customer balance(s).")
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(drift)} customer balance(s) drifted. Re-run with --fix to correct."
+                )
+            )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import Inventory, Motorcycle
+
+
+class Command(BaseCommand):
+    help = "Re-derive stock levels from the inventory ledger and report any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="Overwrite drifted stock levels with the ledger totals.",
+        )
+
+    def handle(self, *args, **options):
+        drift = Inventory.reconcile(fix=options["fix"])
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Inventory matches the ledger."))
+            return
+
+        names = {
+            m.pk: str(m)
+            for m in Motorcycle.objects.filter(
+                pk__in=[entry["motorcycle_model_id"] for entry in drift]
+            )
+        }
+        for entry in drift:
+            self.stdout.write(
+                f"{names.get(entry['motorcycle_model_id'], entry['motorcycle_model_id'])}: "
+                f"recorded={entry['recorded_quantity']} ledger={entry['ledger_quantity']}"
+            )
+
+        if options["fix"]:
+            self.stdout.write(
+                self.style.SUCCESS(f"Corrected {len(drift)} inventory record(s).")
+            )
+        else:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(drift)} inventory record(s) drifted. Re-run with --fix to correct."
+                )
+            )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import SupplierScorecard
+
+
+class Command(BaseCommand):
+    help = "Recompute supplier scorecards for suppliers changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Ignore the watermark and recompute every supplier.",
+        )
+
+    def handle(self, *args, **options):
+        refreshed = SupplierScorecard.refresh(full=options["full"])
+
+        if refreshed:
+            self.stdout.write(
+                self.style.SUCCESS(f"Refreshed {refreshed} supplier scorecard(s).")
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS("Supplier scorecards are up to date."))
@@ -0,0 +1,94 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from mcms_app import worker
+from mcms_app.models import ReportJob
+
+
+class Command(BaseCommand):
+    help = "Run queued report jobs in a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=2,
+            help="Reports run at the same time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between checks for new jobs.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is empty instead of waiting for more jobs.",
+        )
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        poll_interval = options["poll_interval"]
+        running = {}
+
+        # Spawned rather than forked, so no process inherits the database
+        # connection of the one that started it.
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=worker.setup,
+        ) as pool:
+            self.stdout.write(f"Running report jobs in {processes} process(es).")
+            try:
+                while True:
+                    for pk, token in ReportJob.claim(processes - len(running)):
+                        running[pool.submit(worker.run_job, pk, token)] = pk, token
+                        self.stdout.write(f"Started report job #{pk}.")
+
+                    if not running:
+                        if options["once"]:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    finished, _ = wait(
+                        running, timeout=poll_interval, return_when=FIRST_COMPLETED
+                    )
+                    for future in finished:
+                        self.report(*running.pop(future), future)
+            except KeyboardInterrupt:
+                self.stdout.write(
+                    self.style.WARNING(
+                        "Stopping; unfinished jobs will be claimed again once "
+                        "they go stale."
+                    )
+                )
+                pool.shutdown(wait=False, cancel_futures=True)
+                return
+
+        self.stdout.write(self.style.SUCCESS("Report queue is empty."))
+
+    def report(self, pk, token, future):
+        try:
+            status = future.result()
+        except Exception as exc:
+            # The process running the job died before it could record this.
+            job = ReportJob.objects.filter(pk=pk, claim_token=token).first()
+            status = None
+            if job and job.fail(f"Worker process failed: {exc}"):
+                status = ReportJob.FAILED
+
+        if status is None:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Report job #{pk} was claimed again; its result was dropped."
+                )
+            )
+        elif status == ReportJob.DONE:
+            self.stdout.write(self.style.SUCCESS(f"Report job #{pk} finished."))
+        else:
+            self.stdout.write(self.style.WARNING(f"Report job #{pk} failed."))
@@ -0,0 +1,52 @@
+import calendar
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from mcms_app.models import InventorySnapshot
+
+
+def end_of_day(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.max))
+
+
+class Command(BaseCommand):
+    help = (
+        "Checkpoint per-model stock levels. Run at day or month close so that "
+        "point-in-time stock queries only replay a small slice of the ledger."
+    )
+
+    def add_arguments(self, parser):
+        group = parser.add_mutually_exclusive_group()
+        group.add_argument("--day", help="Snapshot the close of this day (YYYY-MM-DD).")
+        group.add_argument(
+            "--month", help="Snapshot the close of this month (YYYY-MM)."
+        )
+
+    def handle(self, *args, **options):
+        if options["day"]:
+            day = parse_date(options["day"])
+            if day is None:
+                raise CommandError("--day must be in YYYY-MM-DD format.")
+            as_of = end_of_day(day)
+        elif options["month"]:
+            try:
+                year, month = (int(part) for part in options["month"].split("-"))
+                last_day = calendar.monthrange(year, month)[1]
+            except ValueError:
+                raise CommandError("--month must be in YYYY-MM format.")
+            as_of = end_of_day(datetime.date(year, month, last_day))
+        else:
+            as_of = timezone.now()
+
+        if as_of > timezone.now():
+            raise CommandError("Cannot snapshot a period that has not closed yet.")
+
+        rows = InventorySnapshot.take(as_of)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Recorded {len(rows)} stock level(s) as of {timezone.localtime(as_of):%Y-%m-%d %H:%M:%S}."
+            )
+        )
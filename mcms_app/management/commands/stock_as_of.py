@@ -0,0 +1,50 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from mcms_app.models import InventorySnapshot, Motorcycle
+
+
+class Command(BaseCommand):
+    help = "Report stock of one or all motorcycle models as of a past timestamp."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "at",
+            help="Timestamp (YYYY-MM-DD HH:MM[:SS]) or date (YYYY-MM-DD, meaning end of that day).",
+        )
+        parser.add_argument(
+            "--model", type=int, help="Limit the report to this motorcycle model id."
+        )
+
+    def handle(self, *args, **options):
+        day = parse_date(options["at"])
+        if day is not None:
+            at = datetime.datetime.combine(day, datetime.time.max)
+        else:
+            at = parse_datetime(options["at"])
+            if at is None:
+                raise CommandError("Could not parse the timestamp.")
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+
+        stock = InventorySnapshot.stock_as_of(at, motorcycle_model=options["model"])
+
+        models = Motorcycle.objects.all()
+        if options["model"]:
+            models = models.filter(pk=options["model"])
+            if not models.exists():
+                raise CommandError(f"Motorcycle model {options['model']} not found.")
+        else:
+            models = models.filter(pk__in=stock.keys())
+
+        total = 0
+        for motorcycle in models:
+            quantity = stock.get(motorcycle.pk, 0)
+            total += quantity
+            self.stdout.write(f"{motorcycle}: {quantity}")
+        self.stdout.write(
+            f"Total units as of {timezone.localtime(at):%Y-%m-%d %H:%M:%S}: {total}"
+        )
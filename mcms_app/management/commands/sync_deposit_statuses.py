@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from mcms_app.models import Deposit
+
+
+class Command(BaseCommand):
+    help = "Mark deposits completed or active according to their completed withdrawals."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the status changes without writing them.",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        report = Deposit.sync_all_deposit_statuses(dry_run=dry_run)
+
+        for reference in report["completed"]:
+            self.stdout.write(f"{reference}: active -> completed")
+        for reference in report["reactivated"]:
+            self.stdout.write(f"{reference}: completed -> active")
+
+        changed = len(report["completed"]) + len(report["reactivated"])
+        if not changed:
+            self.stdout.write(
+                self.style.SUCCESS("All deposit statuses are consistent.")
+            )
+        elif dry_run:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{changed} deposit(s) would change. Re-run without --dry-run to apply."
+                )
+            )
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Updated {changed} deposit(s)."))
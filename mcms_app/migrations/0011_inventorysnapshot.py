@@ -0,0 +1,41 @@
+# Generated by Django 5.2 on 2026-10-17 03:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcms_app', '0010_alter_loan_options_alter_loanrepayment_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateTimeField(db_index=True, help_text='Ledger position this quantity is valid for')),
+                ('quantity', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-as_of'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['transaction_date'], name='mcms_app_in_transac_9f2318_idx'),
+        ),
+        migrations.AddField(
+            model_name='inventorysnapshot',
+            name='motorcycle_model',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='mcms_app.motorcycle'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='inventorysnapshot',
+            unique_together={('motorcycle_model', 'as_of')},
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2 on 2026-10-17 03:06
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mcms_app', '0011_inventorysnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_at', models.DateTimeField()),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity_received', models.PositiveIntegerField()),
+                ('quantity_remaining', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('delivery_item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layer', to='mcms_app.supplierdeliveryitem')),
+                ('motorcycle_model', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='mcms_app.motorcycle')),
+            ],
+            options={
+                'ordering': ['received_at', 'id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CostLayerConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('is_reversed', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('layer', models.ForeignKey(blank=True, help_text='Empty when the units were not covered by any layer', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='consumptions', to='mcms_app.costlayer')),
+                ('sale', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cost_consumptions', to='mcms_app.sale')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InventoryCost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('units_on_hand', models.IntegerField(default=0, help_text='Units still covered by open cost layers')),
+                ('fifo_value', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('average_unit_cost', models.DecimalField(decimal_places=4, default=Decimal('0.0000'), max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('motorcycle_model', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_cost', to='mcms_app.motorcycle')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='costlayer',
+            index=models.Index(fields=['motorcycle_model', 'quantity_remaining', 'received_at'], name='mcms_app_co_motorcy_a1e489_idx'),
+        ),
+    ]
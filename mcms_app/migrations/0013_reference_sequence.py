@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0012_cost_layers"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReferenceSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prefix", models.CharField(max_length=20)),
+                ("day", models.DateField()),
+                ("last_value", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "unique_together": {("prefix", "day")},
+            },
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2 on 2026-10-17 03:11
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0013_reference_sequence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total_deposits",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14
+                    ),
+                ),
+                (
+                    "total_withdrawals",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14
+                    ),
+                ),
+                (
+                    "balance",
+                    models.DecimalField(
+                        db_index=True,
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        max_digits=14,
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "customer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="deposit_balance",
+                        to="mcms_app.customer",
+                    ),
+                ),
+            ],
+        ),
+    ]
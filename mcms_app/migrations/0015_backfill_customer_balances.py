@@ -0,0 +1,52 @@
+# Generated by Django 5.2 on 2026-10-17 03:11
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+def backfill_customer_balances(apps, schema_editor):
+    Deposit = apps.get_model("mcms_app", "Deposit")
+    Withdrawal = apps.get_model("mcms_app", "Withdrawal")
+    CustomerBalance = apps.get_model("mcms_app", "CustomerBalance")
+
+    totals = defaultdict(lambda: [Decimal("0.00"), Decimal("0.00")])
+    for customer_id, total in (
+        Deposit.objects.filter(deposit_status__in=["active", "completed"])
+        .values("customer_id")
+        .annotate(total=Sum("deposit_amount"))
+        .values_list("customer_id", "total")
+    ):
+        totals[customer_id][0] = total
+    for customer_id, total in (
+        Withdrawal.objects.filter(withdrawal_status="completed")
+        .values("deposit__customer_id")
+        .annotate(total=Sum("withdrawal_amount"))
+        .values_list("deposit__customer_id", "total")
+    ):
+        totals[customer_id][1] = total
+
+    CustomerBalance.objects.bulk_create(
+        [
+            CustomerBalance(
+                customer_id=customer_id,
+                total_deposits=deposits,
+                total_withdrawals=withdrawals,
+                balance=deposits - withdrawals,
+            )
+            for customer_id, (deposits, withdrawals) in totals.items()
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0014_customer_balance"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_customer_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2 on 2026-10-17 03:15
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_delivered_quantities(apps, schema_editor):
+    SupplierPaymentItem = apps.get_model("mcms_app", "SupplierPaymentItem")
+    SupplierDeliveryItem = apps.get_model("mcms_app", "SupplierDeliveryItem")
+
+    delivered = (
+        SupplierDeliveryItem.objects.filter(
+            delivery__payment_id=OuterRef("payment_id"),
+            motorcycle_model_id=OuterRef("motorcycle_model_id"),
+            delivery__is_cancelled=False,
+        )
+        .order_by()
+        .values("delivery__payment_id", "motorcycle_model_id")
+        .annotate(total=Sum("delivered_quantity"))
+        .values("total")
+    )
+    SupplierPaymentItem.objects.update(
+        delivered_quantity=Coalesce(
+            Subquery(delivered, output_field=models.IntegerField()), Value(0)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0015_backfill_customer_balances"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="supplierpaymentitem",
+            name="delivered_quantity",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Units received against this item on non-cancelled deliveries",
+            ),
+        ),
+        migrations.RunPython(backfill_delivered_quantities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2 on 2026-10-17 03:23
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+
+def backfill_open_orders(apps, schema_editor):
+    SupplierPaymentItem = apps.get_model("mcms_app", "SupplierPaymentItem")
+    OpenOrderLine = apps.get_model("mcms_app", "OpenOrderLine")
+
+    undelivered = ExpressionWrapper(
+        F("expected_quantity") - F("delivered_quantity"),
+        output_field=models.IntegerField(),
+    )
+    rows = (
+        SupplierPaymentItem.objects.filter(
+            payment__status="ACTIVE",
+            expected_quantity__gt=F("delivered_quantity"),
+        )
+        .order_by()
+        .values("payment__supplier_id", "motorcycle_model_id")
+        .annotate(
+            units=Sum(undelivered),
+            value=Sum(undelivered * F("unit_price"), output_field=DecimalField()),
+        )
+    )
+    OpenOrderLine.objects.bulk_create(
+        OpenOrderLine(
+            supplier_id=row["payment__supplier_id"],
+            motorcycle_model_id=row["motorcycle_model_id"],
+            quantity=row["units"],
+            value=row["value"],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0016_payment_item_delivered_quantity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OpenOrderLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("quantity", models.IntegerField(default=0)),
+                (
+                    "value",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "motorcycle_model",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="open_order_lines",
+                        to="mcms_app.motorcycle",
+                    ),
+                ),
+                (
+                    "supplier",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="open_order_lines",
+                        to="mcms_app.supplier",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["motorcycle_model", "quantity"],
+                        name="mcms_app_op_motorcy_dbb76e_idx",
+                    )
+                ],
+                "unique_together": {("supplier", "motorcycle_model")},
+            },
+        ),
+        migrations.RunPython(backfill_open_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2 on 2026-10-17 03:24
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0017_open_order_book"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SupplierScorecard",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("expected_units", models.PositiveIntegerField(default=0)),
+                ("delivered_units", models.PositiveIntegerField(default=0)),
+                (
+                    "fill_rate",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0.00"),
+                        help_text="Percentage of ordered units delivered on non-cancelled payments",
+                        max_digits=5,
+                    ),
+                ),
+                (
+                    "average_lead_time_days",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        help_text="Mean days from payment to each non-cancelled delivery",
+                        max_digits=7,
+                        null=True,
+                    ),
+                ),
+                ("deliveries_count", models.PositiveIntegerField(default=0)),
+                (
+                    "partial_deliveries",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Deliveries that left their payment with units still outstanding",
+                    ),
+                ),
+                ("cancelled_deliveries", models.PositiveIntegerField(default=0)),
+                (
+                    "cancelled_delivery_rate",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=5
+                    ),
+                ),
+                ("price_trends", models.JSONField(blank=True, default=list)),
+                (
+                    "source_updated_at",
+                    models.DateTimeField(
+                        blank=True,
+                        help_text="Watermark: source rows changed after this are not reflected yet",
+                        null=True,
+                    ),
+                ),
+                ("computed_at", models.DateTimeField(auto_now=True)),
+                (
+                    "supplier",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scorecard",
+                        to="mcms_app.supplier",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2 on 2026-10-17 03:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_purchase_prices(apps, schema_editor):
+    SupplierPaymentItem = apps.get_model("mcms_app", "SupplierPaymentItem")
+    PurchasePrice = apps.get_model("mcms_app", "PurchasePrice")
+
+    PurchasePrice.objects.bulk_create(
+        PurchasePrice(
+            payment_item_id=item_id,
+            motorcycle_model_id=model_id,
+            supplier_id=supplier_id,
+            price_date=timezone.localtime(paid_at).date(),
+            unit_price=unit_price,
+        )
+        for item_id, model_id, supplier_id, paid_at, unit_price in SupplierPaymentItem.objects.exclude(
+            payment__status="CANCELLED"
+        ).values_list(
+            "pk",
+            "motorcycle_model_id",
+            "payment__supplier_id",
+            "payment__payment_date",
+            "unit_price",
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0018_supplier_scorecard"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PurchasePrice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("price_date", models.DateField()),
+                ("unit_price", models.DecimalField(decimal_places=2, max_digits=10)),
+                (
+                    "motorcycle_model",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="purchase_prices",
+                        to="mcms_app.motorcycle",
+                    ),
+                ),
+                (
+                    "payment_item",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="price_record",
+                        to="mcms_app.supplierpaymentitem",
+                    ),
+                ),
+                (
+                    "supplier",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="purchase_prices",
+                        to="mcms_app.supplier",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["motorcycle_model", "-price_date", "-id"],
+                        name="purchaseprice_latest_idx",
+                    ),
+                    models.Index(
+                        fields=["motorcycle_model", "price_date", "unit_price"],
+                        name="purchaseprice_best_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_purchase_prices, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-17 03:30
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0019_purchase_price_history"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="sale",
+            index=models.Index(
+                fields=["status", "sale_date"], name="mcms_app_sa_status_9ac203_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.2 on 2026-10-17 03:31
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_daily_sales(apps, schema_editor):
+    Sale = apps.get_model("mcms_app", "Sale")
+    DailySalesFact = apps.get_model("mcms_app", "DailySalesFact")
+
+    rows = (
+        Sale.objects.order_by()
+        .annotate(day=TruncDate("sale_date"))
+        .values("day", "motorcycle_id", "payment_type", "status")
+        .annotate(sales_count=Count("id"), revenue=Sum("final_price"))
+    )
+    DailySalesFact.objects.bulk_create(
+        DailySalesFact(
+            day=row["day"],
+            motorcycle_model_id=row["motorcycle_id"],
+            payment_type=row["payment_type"],
+            status=row["status"],
+            sales_count=row["sales_count"],
+            units=row["sales_count"],
+            revenue=row["revenue"],
+        )
+        for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0020_sale_status_date_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailySalesFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "payment_type",
+                    models.CharField(
+                        choices=[
+                            ("DEPOSIT", "Deposit"),
+                            ("LOAN", "Loan"),
+                            ("CASH", "Cash"),
+                            ("TRANSFER", "Bank Transfer"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("ACTIVE", "Active"), ("CANCELLED", "Cancelled")],
+                        max_length=20,
+                    ),
+                ),
+                ("sales_count", models.IntegerField(default=0)),
+                ("units", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=16
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "motorcycle_model",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="mcms_app.motorcycle",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "day"], name="mcms_app_da_status_354e10_idx"
+                    )
+                ],
+                "unique_together": {
+                    ("day", "motorcycle_model", "payment_type", "status")
+                },
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
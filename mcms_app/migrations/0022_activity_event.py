@@ -0,0 +1,94 @@
+# Generated by Django 5.2 on 2026-10-17 03:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0021_daily_sales_fact"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActivityEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("occurred_at", models.DateTimeField()),
+                (
+                    "event_type",
+                    models.CharField(
+                        choices=[
+                            ("SALE", "Sale"),
+                            ("SUPPLIER_PAYMENT", "Supplier Payment"),
+                            ("DELIVERY", "Delivery"),
+                            ("DEPOSIT", "Deposit"),
+                            ("WITHDRAWAL", "Withdrawal"),
+                            ("LOAN", "Loan"),
+                            ("LOAN_REPAYMENT", "Loan Repayment"),
+                            ("INVENTORY", "Inventory Update"),
+                            ("MOTORCYCLE", "Motorcycle Model"),
+                            ("SUPPLIER", "Supplier"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("CREATED", "Created"),
+                            ("STATUS_CHANGED", "Status Changed"),
+                        ],
+                        default="CREATED",
+                        max_length=20,
+                    ),
+                ),
+                ("reference_model", models.CharField(max_length=50)),
+                ("reference_id", models.CharField(max_length=40)),
+                (
+                    "description",
+                    models.TextField(help_text="Rendered HTML summary of the event"),
+                ),
+                ("recorded_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="activity_events",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-occurred_at", "-id"],
+                "indexes": [
+                    models.Index(
+                        fields=["occurred_at", "id"],
+                        name="mcms_app_ac_occurre_989dd0_idx",
+                    ),
+                    models.Index(
+                        fields=["event_type", "occurred_at", "id"],
+                        name="mcms_app_ac_event_t_9998d9_idx",
+                    ),
+                    models.Index(
+                        fields=["reference_model", "reference_id"],
+                        name="mcms_app_ac_referen_6baf4d_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
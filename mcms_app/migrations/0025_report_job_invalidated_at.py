@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 03:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0023_report_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportjob",
+            name="invalidated_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2 on 2026-10-17 04:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0025_report_job_invalidated_at"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="inventorycost",
+            name="units_on_hand",
+            field=models.IntegerField(
+                default=0,
+                help_text="Units in stock, as the inventory ledger counts them",
+            ),
+        ),
+    ]
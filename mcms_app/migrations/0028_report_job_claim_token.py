@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-17 04:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("mcms_app", "0027_cache_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reportjob",
+            name="claim_token",
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -2,18 +2,102 @@ from django.db import models
 from django.db.models import Sum
 from django.utils import timezone
 from django.dispatch import receiver
-from django.db import models, transaction
+from django.db import models, transaction, IntegrityError
 from django.utils import timezone
 from django.core.exceptions import ValidationError
-from django.db.models import Sum, F, DecimalField, Q, Value
+from django.db.models import (
+    prefetch_related_objects,
+    Sum,
+    Count,
+    F,
+    DecimalField,
+    Q,
+    Value,
+    Max,
+    Window,
+    RowRange,
+    OuterRef,
+    Subquery,
+    ExpressionWrapper,
+)
 from decimal import Decimal
 import uuid
-from django.db.models.functions import Coalesce
+from django.db.models.functions import Coalesce, Length, RowNumber, TruncDate
 from django.core.validators import MinValueValidator
+from django.apps import apps
 from django.urls import reverse
+from django.utils.html import format_html
+from django.contrib.auth import get_user_model
 from django.utils.functional import cached_property
 import datetime
+import hashlib
+import json
+import re
+from collections import defaultdict
 from django.conf import settings
+import logging
+import threading
+
+from . import cache_utils
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceSequence(models.Model):
+    """Per-day counters behind the human-readable reference numbers"""
+
+    prefix = models.CharField(max_length=20)
+    day = models.DateField()
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ["prefix", "day"]
+
+    def __str__(self):
+        return f"{self.prefix}-{self.day:%Y%m%d}: {self.last_value}"
+
+    @classmethod
+    def next_reference(cls, prefix, model, field):
+        """
+        Allocate the next `PREFIX-YYYYMMDD-NNNN` reference for today with a
+        single atomic increment. The first allocation of a day starts after
+        the highest matching reference already stored in `model.field`, so
+        references issued before the counter existed are never reused.
+        """
+        today = timezone.localdate()
+        day_prefix = f"{prefix}-{today:%Y%m%d}-"
+        counter = cls.objects.filter(prefix=prefix, day=today)
+
+        with transaction.atomic():
+            if not counter.update(last_value=F("last_value") + 1):
+                seed = cls._highest_issued(model, field, day_prefix)
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(
+                            prefix=prefix, day=today, last_value=seed + 1
+                        )
+                except IntegrityError:
+                    counter.update(last_value=F("last_value") + 1)
+            value = counter.values_list("last_value", flat=True).get()
+
+        return f"{day_prefix}{value:04d}"
+
+    @staticmethod
+    def _highest_issued(model, field, day_prefix):
+        """
+        The highest number already stored under `day_prefix`, read with one
+        ordered query. Numbers are zero-padded, so the longest and then
+        greatest reference is the highest, even past 9999.
+        """
+        highest = (
+            model.objects.filter(
+                **{f"{field}__regex": rf"^{re.escape(day_prefix)}[0-9]+$"}
+            )
+            .order_by(Length(field).desc(), f"-{field}")
+            .values_list(field, flat=True)
+            .first()
+        )
+        return int(highest[len(day_prefix) :]) if highest else 0
 
 
 class Motorcycle(models.Model):
@@ -99,27 +183,7 @@ class Motorcycle(models.Model):
         Checks if this motorcycle model can be safely discontinued.
         Prevents discontinuation if it's part of active, undelivered supplier payment items.
         """
-        active_undelivered_supplier_orders = (
-            SupplierPaymentItem.objects.filter(
-                motorcycle_model=self, payment__status=SupplierPayment.ACTIVE
-            )
-            .annotate(
-                total_delivered_for_this_item=Coalesce(
-                    Sum(
-                        "payment__deliveries__delivery_items__delivered_quantity",
-                        filter=Q(payment__deliveries__is_cancelled=False)
-                        & Q(
-                            payment__deliveries__delivery_items__motorcycle_model=self.pk
-                        ),
-                    ),
-                    Value(0),
-                    output_field=DecimalField(),
-                )
-            )
-            .filter(expected_quantity__gt=F("total_delivered_for_this_item"))
-        )
-
-        if active_undelivered_supplier_orders.exists():
+        if OpenOrderLine.has_open_orders(self):
             return (
                 False,
                 "Model is part of one or more active, undelivered supplier payment items.",
@@ -342,16 +406,107 @@ class SupplierPayment(models.Model):
     def _calculate_total_delivered_quantity(self):
         if not self.pk:
             return 0
-        total = 0
-        for delivery in self.deliveries.filter(is_cancelled=False):
-            delivery_total = (
-                delivery.delivery_items.aggregate(total=Sum("delivered_quantity"))[
-                    "total"
-                ]
-                or 0
+        return self.payment_items.aggregate(
+            total_delivered=Coalesce(
+                Sum("delivered_quantity"), 0, output_field=models.IntegerField()
+            )
+        )["total_delivered"]
+
+    @classmethod
+    def schedule_completion_check(cls, payment):
+        """
+        Mark a payment as touched. Every payment marked during a transaction
+        is re-evaluated once, in bulk, when it commits; outside a transaction
+        the check runs immediately.
+        """
+        payment_id = getattr(payment, "pk", payment)
+        if not payment_id:
+            return
+
+        if not transaction.get_connection().in_atomic_block:
+            cls.recompute_completion([payment_id])
+            return
+
+        if not hasattr(_completion_checks, "payment_ids"):
+            _completion_checks.payment_ids = set()
+        _completion_checks.payment_ids.add(payment_id)
+        # Every call registers its own hook: a rollback discards the hooks
+        # but not the pending set, and a single guarded hook would then never
+        # be registered again. The first hook to run flushes the whole set
+        # and the rest find it empty, so the batch still costs one check.
+        transaction.on_commit(_flush_completion_checks)
+
+    @classmethod
+    def recompute_completion(cls, payment_ids):
+        """
+        Complete active payments whose items are fully delivered and reopen
+        completed ones that no longer are. One read and at most two UPDATEs
+        regardless of how many payments are passed, with the status changes
+        logged as one batch of activity events.
+        """
+        payments = (
+            cls.objects.filter(
+                pk__in=payment_ids, status__in=[cls.ACTIVE, cls.COMPLETED]
             )
-            total += delivery_total
-        return total
+            .annotate(
+                total_expected=Coalesce(Sum("payment_items__expected_quantity"), 0),
+                total_delivered=Coalesce(Sum("payment_items__delivered_quantity"), 0),
+            )
+            .values_list(
+                "pk", "supplier_id", "status", "total_expected", "total_delivered"
+            )
+        )
+
+        to_complete, to_reopen, suppliers = [], [], {}
+        for (
+            payment_id,
+            supplier_id,
+            status,
+            total_expected,
+            total_delivered,
+        ) in payments:
+            suppliers[payment_id] = supplier_id
+            logger.debug(
+                "Payment %s: expected=%s delivered=%s",
+                payment_id,
+                total_expected,
+                total_delivered,
+            )
+            fully_delivered = total_expected > 0 and total_delivered >= total_expected
+            if status == cls.ACTIVE and fully_delivered:
+                to_complete.append(payment_id)
+            elif status == cls.COMPLETED and total_delivered < total_expected:
+                to_reopen.append(payment_id)
+
+        now = timezone.now()
+        with transaction.atomic():
+            if to_complete:
+                cls.objects.filter(pk__in=to_complete).update(
+                    status=cls.COMPLETED, updated_at=now
+                )
+            if to_reopen:
+                cls.objects.filter(pk__in=to_reopen).update(
+                    status=cls.ACTIVE, updated_at=now
+                )
+            OpenOrderLine.payments_changed(
+                {
+                    payment_id: (
+                        (suppliers[payment_id], was_active),
+                        (suppliers[payment_id], not was_active),
+                    )
+                    for payment_ids, was_active in (
+                        (to_complete, True),
+                        (to_reopen, False),
+                    )
+                    for payment_id in payment_ids
+                }
+            )
+        if to_complete or to_reopen:
+            ActivityEvent.record_many(
+                cls.objects.filter(pk__in=to_complete + to_reopen),
+                ActivityEvent.STATUS_CHANGED,
+            )
+        return to_complete, to_reopen
 
     def update_completion_status(self, force_recalculate=False):
         """
@@ -368,8 +523,11 @@ class SupplierPayment(models.Model):
             total_expected = self._calculate_total_expected_quantity
             total_delivered = self._calculate_total_delivered_quantity
 
-            print(
-                f"Payment {self.payment_reference}: Expected={total_expected}, Delivered={total_delivered}"
+            logger.debug(
+                "Payment %s: expected=%s delivered=%s",
+                self.payment_reference,
+                total_expected,
+                total_delivered,
             )
 
             if total_expected > 0 and total_delivered >= total_expected:
@@ -419,19 +577,56 @@ class SupplierPayment(models.Model):
             delattr(self, "_calculate_total_delivered_quantity")
 
         if not self.payment_reference:
-            timestamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
-            self.payment_reference = f"PAY-{uuid.uuid4().hex[:8].upper()}-{timestamp}"
+            self.payment_reference = ReferenceSequence.next_reference(
+                "PAY", SupplierPayment, "payment_reference"
+            )
 
         is_new = self.pk is None
+        update_fields = kwargs.get("update_fields")
+        previous = None
+        if not is_new and (
+            update_fields is None
+            or set(update_fields) & {"supplier", "payment_date", "status"}
+        ):
+            previous = (
+                SupplierPayment.objects.filter(pk=self.pk)
+                .values(*PurchasePrice.PAYMENT_FIELDS)
+                .first()
+            )
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if previous:
+                # Status and supplier changes move the payment's open quantities.
+                was_active = previous["status"] == self.ACTIVE
+                OpenOrderLine.payments_changed(
+                    {
+                        self.pk: (
+                            (previous["supplier_id"], was_active),
+                            (self.supplier_id, self.status == self.ACTIVE),
+                        )
+                    }
+                )
+        if previous and PurchasePrice.payment_changed(previous, self):
+            PurchasePrice.sync_payments([self.pk])
 
         if (
             not is_new
             and self.status == self.ACTIVE
             and "status" not in (kwargs.get("update_fields") or [])
         ):
-            self.update_completion_status()
+            SupplierPayment.schedule_completion_check(self.pk)
+
+
+# Payments touched in the current thread's transaction, checked on commit
+_completion_checks = threading.local()
+
+
+def _flush_completion_checks():
+    payment_ids = getattr(_completion_checks, "payment_ids", None)
+    _completion_checks.payment_ids = set()
+    if payment_ids:
+        SupplierPayment.recompute_completion(payment_ids)
 
 
 class SupplierPaymentItem(models.Model):
@@ -449,6 +644,11 @@ class SupplierPaymentItem(models.Model):
     unit_price = models.DecimalField(
         max_digits=10, decimal_places=2, validators=[MinValueValidator(Decimal("0.01"))]
     )
+    delivered_quantity = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Units received against this item on non-cancelled deliveries",
+    )
     remarks = models.TextField(blank=True)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -474,20 +674,253 @@ class SupplierPaymentItem(models.Model):
     def __str__(self):
         return f"{self.motorcycle_model} - {self.expected_quantity} units @ ${self.unit_price}"
 
+    # What an item adds to the open order book, besides its payment
+    OPEN_ORDER_FIELDS = (
+        "motorcycle_model_id",
+        "expected_quantity",
+        "delivered_quantity",
+        "unit_price",
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_open_order_values()
+        return instance
+
+    def _remember_open_order_values(self):
+        self._open_order_values = tuple(
+            self.__dict__.get(field) for field in self.OPEN_ORDER_FIELDS
+        )
+
+    def _open_order_share(self, values=None):
+        """This item's share of the open order book, as loaded or as it is now."""
+        if values is None:
+            values = [getattr(self, field) for field in self.OPEN_ORDER_FIELDS]
+        return OpenOrderLine.share(
+            self.payment.supplier_id,
+            *values,
+            active=self.payment.status == SupplierPayment.ACTIVE,
+        )
+
+    def _stored_open_order_share(self):
+        """The share the book holds for this item, read back if it was not loaded."""
+        values = getattr(self, "_open_order_values", None)
+        if values is None or None in values:
+            values = (
+                SupplierPaymentItem.objects.filter(pk=self.pk)
+                .values_list(*self.OPEN_ORDER_FIELDS)
+                .first()
+            )
+        return [self._open_order_share(values)] if values else []
+
     @property
     def total_expected_cost(self):
         """Calculate total expected cost for this item"""
         return self.expected_quantity * self.unit_price
 
+    @property
+    def remaining_quantity(self):
+        return self.expected_quantity - self.delivered_quantity
+
+    @property
+    def is_fully_delivered(self):
+        return self.delivered_quantity >= self.expected_quantity
+
+    @classmethod
+    def apply_delivered_delta(cls, payment, motorcycle_model, delta):
+        """Shift the delivered counter of a payment's item for one model."""
+        if not delta:
+            return
+        items = cls.objects.filter(
+            payment_id=getattr(payment, "pk", payment),
+            motorcycle_model_id=getattr(motorcycle_model, "pk", motorcycle_model),
+        )
+        with transaction.atomic():
+            item = (
+                items.select_for_update()
+                .values_list(
+                    "payment__supplier_id",
+                    "motorcycle_model_id",
+                    "expected_quantity",
+                    "delivered_quantity",
+                    "unit_price",
+                    "payment__status",
+                )
+                .first()
+            )
+            if item is None:
+                return
+            items.update(delivered_quantity=F("delivered_quantity") + delta)
+
+            *key, expected, delivered, unit_price, status = item
+            active = status == SupplierPayment.ACTIVE
+            OpenOrderLine.apply_changes(
+                [OpenOrderLine.share(*key, expected, delivered, unit_price, active)],
+                [
+                    OpenOrderLine.share(
+                        *key, expected, delivered + delta, unit_price, active
+                    )
+                ],
+            )
+
+    @staticmethod
+    def delivered_quantity_expression():
+        """Delivered units for the outer payment item, summed from delivery items."""
+        delivered = (
+            SupplierDeliveryItem.objects.filter(
+                delivery__payment_id=OuterRef("payment_id"),
+                motorcycle_model_id=OuterRef("motorcycle_model_id"),
+                delivery__is_cancelled=False,
+            )
+            .order_by()
+            .values("delivery__payment_id", "motorcycle_model_id")
+            .annotate(total=Sum("delivered_quantity"))
+            .values("total")
+        )
+        return Coalesce(
+            Subquery(delivered, output_field=models.IntegerField()), Value(0)
+        )
+
+    @classmethod
+    def rebuild_delivered_quantities(cls):
+        """
+        Recompute every delivered counter from the delivery items in one
+        UPDATE. Returns the number of items whose counter was wrong.
+        """
+        with transaction.atomic():
+            drifted = (
+                cls.objects.annotate(actual=cls.delivered_quantity_expression())
+                .exclude(delivered_quantity=F("actual"))
+                .count()
+            )
+            if drifted:
+                cls.objects.update(
+                    delivered_quantity=cls.delivered_quantity_expression()
+                )
+                OpenOrderLine.rebuild()
+        return drifted
+
+    @staticmethod
+    def check_payment_editable(payment):
+        if payment.status != SupplierPayment.ACTIVE and payment.has_deliveries:
+            raise ValidationError(
+                f"Cannot edit payment items after deliveries have begun, even if payment is still Active."
+            )
+
+    @classmethod
+    def save_batch(cls, payment, items, deleted=(), user=None):
+        """
+        Insert, update and delete a payment's lines together. The payment is
+        checked once, lines are validated in memory and each kind of write is
+        a single bulk statement, so a 50-line order costs the same handful of
+        queries as a 1-line one. Completion is rechecked once at the end.
+        """
+        items = list(items)
+        deleted_ids = [item.pk for item in deleted if item.pk]
+        if not items and not deleted_ids:
+            return items
+
+        if payment.pk:
+            cls.check_payment_editable(payment)
+
+        errors = []
+        for item in items:
+            item.payment = payment
+            try:
+                # Foreign keys are checked below, or come from the request.
+                item.clean_fields(
+                    exclude=["payment", "motorcycle_model", "created_by", "updated_by"]
+                )
+                item._clean_amounts()
+            except ValidationError as e:
+                errors.extend(e.messages)
+
+        model_ids = [item.motorcycle_model_id for item in items]
+        if len(set(model_ids)) != len(model_ids):
+            errors.append("Each motorcycle model can only appear once per payment.")
+        if set(model_ids) - set(
+            Motorcycle.objects.filter(pk__in=model_ids).values_list("pk", flat=True)
+        ):
+            errors.append("One or more selected motorcycle models no longer exist.")
+        if payment.pk:
+            kept = (
+                cls.objects.filter(payment=payment, motorcycle_model_id__in=model_ids)
+                .exclude(pk__in=[item.pk for item in items if item.pk] + deleted_ids)
+                .exists()
+            )
+            if kept:
+                errors.append("Each motorcycle model can only appear once per payment.")
+        if errors:
+            raise ValidationError(errors)
+
+        new_items = [item for item in items if item._state.adding]
+        changed_items = [item for item in items if not item._state.adding]
+        removed = [
+            share
+            for item in [*deleted, *changed_items]
+            if item.pk
+            for share in item._stored_open_order_share()
+        ]
+
+        with transaction.atomic():
+            if deleted_ids:
+                cls.objects.filter(payment=payment, pk__in=deleted_ids).delete()
+
+            if new_items:
+                delivered = dict(
+                    SupplierDeliveryItem.objects.filter(
+                        delivery__payment=payment,
+                        delivery__is_cancelled=False,
+                        motorcycle_model_id__in=[
+                            item.motorcycle_model_id for item in new_items
+                        ],
+                    )
+                    .values("motorcycle_model_id")
+                    .annotate(total=Sum("delivered_quantity"))
+                    .values_list("motorcycle_model_id", "total")
+                )
+                for item in new_items:
+                    item.delivered_quantity = delivered.get(item.motorcycle_model_id, 0)
+                    item.created_by = item.created_by or user
+                    item.updated_by = user or item.updated_by
+                cls.objects.bulk_create(new_items)
+
+            if changed_items:
+                now = timezone.now()
+                for item in changed_items:
+                    item.updated_at = now
+                    item.updated_by = user or item.updated_by
+                cls.objects.bulk_update(
+                    changed_items,
+                    [
+                        "motorcycle_model",
+                        "expected_quantity",
+                        "unit_price",
+                        "remarks",
+                        "updated_by",
+                        "updated_at",
+                    ],
+                )
+
+            OpenOrderLine.apply_changes(
+                removed, [item._open_order_share() for item in items]
+            )
+            for item in items:
+                item._remember_open_order_values()
+            PurchasePrice.sync_payments([payment.pk])
+            SupplierPayment.schedule_completion_check(payment)
+        return items
+
     def clean(self):
         super().clean()
 
-        if self.payment_id and self.payment.status != SupplierPayment.ACTIVE:
-            if self.payment.has_deliveries:
-                raise ValidationError(
-                    f"Cannot edit payment items after deliveries have begun, even if payment is still Active."
-                )
+        if self.payment_id:
+            self.check_payment_editable(self.payment)
 
+        self._clean_amounts()
+
+    def _clean_amounts(self):
         if self.expected_quantity is not None and self.expected_quantity <= 0:
             raise ValidationError(
                 {"expected_quantity": "Expected quantity must be greater than zero."}
@@ -497,21 +930,34 @@ class SupplierPaymentItem(models.Model):
                 {"unit_price": "Unit price must be greater than zero."}
             )
 
-        if (
-            self.payment_id
-            and self.expected_quantity is not None
-            and self.unit_price is not None
-        ):
-            try:
-                pass
-            except SupplierPayment.DoesNotExist:
-                pass
-
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
-        if self.payment:
-            self.payment.update_completion_status(force_recalculate=True)
+        if self._state.adding and self.payment_id and self.motorcycle_model_id:
+            self.delivered_quantity = (
+                SupplierDeliveryItem.objects.filter(
+                    delivery__payment_id=self.payment_id,
+                    motorcycle_model_id=self.motorcycle_model_id,
+                    delivery__is_cancelled=False,
+                ).aggregate(total=Sum("delivered_quantity"))["total"]
+                or 0
+            )
+        with transaction.atomic():
+            removed = [] if self._state.adding else self._stored_open_order_share()
+            super().save(*args, **kwargs)
+            OpenOrderLine.apply_changes(removed, [self._open_order_share()])
+        self._remember_open_order_values()
+        PurchasePrice.sync_item(self)
+        if self.payment_id:
+            SupplierPayment.schedule_completion_check(self.payment_id)
+
+    def delete(self, *args, **kwargs):
+        payment_id = self.payment_id
+        with transaction.atomic():
+            removed = self._stored_open_order_share()
+            result = super().delete(*args, **kwargs)
+            OpenOrderLine.apply_changes(removed)
+        SupplierPayment.schedule_completion_check(payment_id)
+        return result
 
     def get_absolute_url(self):
         return reverse("payment_detail", kwargs={"pk": self.pk})
@@ -561,7 +1007,6 @@ class SupplierDelivery(models.Model):
     def clean(self):
         """Validate delivery data"""
         if self.payment.status == "CANCELLED":
-            print(self.payment.status)
             raise ValidationError("Cannot create delivery for cancelled payment")
 
         if self.payment and not self.payment.payment_items.exists():
@@ -573,14 +1018,27 @@ class SupplierDelivery(models.Model):
 
         with transaction.atomic():
             if hasattr(self, "delivery_items"):
+                InventoryTransaction.post_batch(
+                    [
+                        InventoryTransaction(
+                            transaction_type="DELIVERY_REVERSAL",
+                            motorcycle_model_id=delivery_item.motorcycle_model_id,
+                            quantity=-delivery_item.delivered_quantity,
+                            reference_model="SupplierDelivery",
+                            reference_id=self.id,
+                            remarks=f"Reversal of delivery {self.delivery_reference}",
+                            created_by=user,
+                            updated_by=user,
+                        )
+                        for delivery_item in self.delivery_items.all()
+                    ]
+                )
+                CostLayer.retire(self)
                 for delivery_item in self.delivery_items.all():
-                    InventoryTransaction.objects.create(
-                        transaction_type="DELIVERY_REVERSAL",
-                        motorcycle_model=delivery_item.motorcycle_model,
-                        quantity=-delivery_item.delivered_quantity,
-                        reference_model="SupplierDelivery",
-                        reference_id=self.id,
-                        remarks=f"Reversal of delivery {self.delivery_reference}",
+                    SupplierPaymentItem.apply_delivered_delta(
+                        self.payment_id,
+                        delivery_item.motorcycle_model_id,
+                        -delivery_item.delivered_quantity,
                     )
 
             self.is_cancelled = True
@@ -589,30 +1047,110 @@ class SupplierDelivery(models.Model):
 
             self.save(update_fields=["is_cancelled", "updated_at", "updated_by"])
 
+    def post_inventory_receipts(self, delivery_items=None, user=None):
+        """
+        Post the stock receipts for this delivery as a single ledger batch.
+        Items saved with defer_inventory_posting=True are expected to be
+        posted through here instead of one signal per item.
+        """
+        if delivery_items is None:
+            delivery_items = self.delivery_items.all()
+        delivery_items = list(delivery_items)
+        supplier_name = self.payment.supplier.name
+
+        with transaction.atomic():
+            CostLayer.receive(self, delivery_items)
+            return InventoryTransaction.post_batch(
+                [
+                    InventoryTransaction(
+                        transaction_type="SUPPLIER_DELIVERY",
+                        motorcycle_model_id=item.motorcycle_model_id,
+                        quantity=item.delivered_quantity,
+                        reference_model="SupplierDeliveryItem",
+                        reference_id=item.pk,
+                        remarks=f"Delivery from {supplier_name} - {self.delivery_reference}",
+                        created_by=user,
+                        updated_by=user,
+                    )
+                    for item in delivery_items
+                ]
+            )
+
     def save(self, *args, **kwargs):
         if not self.delivery_reference:
-            timestamp = timezone.now().strftime("%Y%m%d%H%M%S%f")
-            self.delivery_reference = f"DEL-{uuid.uuid4().hex[:8].upper()}-{timestamp}"
-
-        is_new = self._state.adding
-        old_is_cancelled = None
-        if not is_new:
-            original_delivery = SupplierDelivery.objects.get(pk=self.pk)
-            old_is_cancelled = original_delivery.is_cancelled
+            self.delivery_reference = ReferenceSequence.next_reference(
+                "DEL", SupplierDelivery, "delivery_reference"
+            )
 
         super().save(*args, **kwargs)
 
-        if self.payment:
-            self.payment.update_completion_status(force_recalculate=True)
-
-        if not is_new and old_is_cancelled != self.is_cancelled:
-            if self.payment:
-                self.payment.update_completion_status(force_recalculate=True)
+        if self.payment_id:
+            SupplierPayment.schedule_completion_check(self.payment_id)
 
     def get_absolute_url(self):
         return reverse("delivery_detail", kwargs={"pk": self.pk})
 
 
+class DeliveryAllowance:
+    """
+    Expected and already-delivered quantities for every model on a delivery's
+    payment, loaded once so a whole batch of delivery rows can be checked in
+    memory. Rows already saved on the delivery itself are not counted as
+    delivered, so editing them is checked against their new quantity only.
+    """
+
+    def __init__(self, payment, expected, delivered):
+        self.payment = payment
+        self.expected = expected
+        self.delivered = delivered
+
+    @classmethod
+    def for_delivery(cls, delivery):
+        payment = delivery.payment
+        expected, delivered = {}, {}
+        for (
+            model_id,
+            expected_quantity,
+            delivered_quantity,
+        ) in payment.payment_items.values_list(
+            "motorcycle_model_id", "expected_quantity", "delivered_quantity"
+        ):
+            expected[model_id] = expected_quantity or 0
+            delivered[model_id] = delivered_quantity
+
+        if delivery.pk and not delivery.is_cancelled:
+            for model_id, quantity in SupplierDeliveryItem.objects.filter(
+                delivery_id=delivery.pk
+            ).values_list("motorcycle_model_id", "delivered_quantity"):
+                if model_id in delivered:
+                    delivered[model_id] -= quantity
+
+        return cls(payment, expected, delivered)
+
+    def check(self, motorcycle_model, quantity, pending=0):
+        """
+        Return (field, message) describing why `quantity` more units of
+        `motorcycle_model` cannot be received, or None if they can. `pending`
+        counts units already claimed by earlier rows of the same batch.
+        """
+        expected = self.expected.get(motorcycle_model.pk)
+        if expected is None:
+            return (
+                "motorcycle_model",
+                f"Model {motorcycle_model} was not included in the original payment.",
+            )
+
+        total = self.delivered[motorcycle_model.pk] + pending + (quantity or 0)
+        if total > expected:
+            return (
+                "delivered_quantity",
+                f"Total delivered quantity ({total}) exceeds expected quantity "
+                f"({expected}) for model {motorcycle_model} under payment "
+                f"{self.payment.payment_reference}.",
+            )
+        return None
+
+
 class SupplierDeliveryItem(models.Model):
     """Details of each delivered motorcycle model"""
 
@@ -660,152 +1198,858 @@ class SupplierDeliveryItem(models.Model):
                 "Internal error: Delivery object not attached to item."
             )
 
-        current_delivery_payment_id = getattr(self.delivery, "payment_id", None)
-
-        if not current_delivery_payment_id:
+        if not getattr(self.delivery, "payment_id", None):
             raise ValidationError("Delivery is not associated with a payment.")
-        try:
-            current_payment = SupplierPayment.objects.get(
-                id=current_delivery_payment_id
-            )
-        except SupplierPayment.DoesNotExist:
-            raise ValidationError("Associated payment does not exist in the database.")
-        except Exception as e:
-            raise ValidationError(f"Error accessing associated payment: {e}")
 
         if self.delivery.is_cancelled:
             raise ValidationError("Cannot add items to cancelled delivery.")
 
-        try:
-            payment_item = current_payment.payment_items.get(
-                motorcycle_model=self.motorcycle_model
-            )
-            expected_qty = (
-                payment_item.expected_quantity
-                if payment_item.expected_quantity is not None
-                else 0
-            )
+        allowance = getattr(self, "_delivery_allowance", None)
+        if allowance is None or allowance.payment.pk != self.delivery.payment_id:
+            allowance = DeliveryAllowance.for_delivery(self.delivery)
 
-        except SupplierPaymentItem.DoesNotExist:
-            raise ValidationError(
-                f"Model {self.motorcycle_model} was not included in the original payment."
-            )
-        except Exception as e:
-            raise ValidationError(f"Error validating against payment items: {e}")
+        problem = allowance.check(self.motorcycle_model, self.delivered_quantity)
+        if problem:
+            raise ValidationError(problem[1])
 
-        total_delivered_existing_in_db = (
+    def _counted_quantity(self):
+        """(payment id, model id, quantity) this row contributes to delivered counters."""
+        return (
             SupplierDeliveryItem.objects.filter(
-                delivery__payment=current_payment,
-                motorcycle_model=self.motorcycle_model,
-                delivery__is_cancelled=False,
+                pk=self.pk, delivery__is_cancelled=False
             )
-            .exclude(pk=self.pk)
-            .aggregate(total=Sum("delivered_quantity"))["total"]
-            or 0
-        )
-
-        current_item_quantity = self.delivered_quantity
-
-        if (total_delivered_existing_in_db + current_item_quantity) > expected_qty:
-            raise ValidationError(
-                f"Total delivered quantity ({total_delivered_existing_in_db + current_item_quantity}) "
-                f"exceeds expected quantity ({expected_qty}) for model {self.motorcycle_model} "
-                f"under payment {current_payment.payment_reference}."
+            .values_list(
+                "delivery__payment_id", "motorcycle_model_id", "delivered_quantity"
             )
+            .first()
+        )
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = self._counted_quantity() if self.pk else None
+            super().save(*args, **kwargs)
+            # The allowance was loaded before this row was counted.
+            self.__dict__.pop("_delivery_allowance", None)
+
+            if previous:
+                SupplierPaymentItem.apply_delivered_delta(*previous[:2], -previous[2])
+            if not self.delivery.is_cancelled:
+                SupplierPaymentItem.apply_delivered_delta(
+                    self.delivery.payment_id,
+                    self.motorcycle_model_id,
+                    self.delivered_quantity,
+                )
 
         if self.delivery and self.delivery.payment:
             self.delivery.payment.refresh_cached_properties()
-            self.delivery.payment.update_completion_status(force_recalculate=True)
+            SupplierPayment.schedule_completion_check(self.delivery.payment_id)
 
     def delete(self, *args, **kwargs):
         payment_to_update = None
         if self.delivery and self.delivery.payment:
             payment_to_update = self.delivery.payment
 
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            previous = self._counted_quantity()
+            super().delete(*args, **kwargs)
+            if previous:
+                SupplierPaymentItem.apply_delivered_delta(*previous[:2], -previous[2])
 
         if payment_to_update:
             payment_to_update.refresh_cached_properties()
-            payment_to_update.update_completion_status(force_recalculate=True)
-
+            SupplierPayment.schedule_completion_check(payment_to_update.pk)
 
-class InventoryTransaction(models.Model):
-    """Immutable log of all inventory changes"""
 
-    TRANSACTION_TYPES = [
-        ("SUPPLIER_DELIVERY", "Supplier Delivery"),
-        ("DELIVERY_REVERSAL", "Delivery Reversal"),
-        ("SALE", "Sale"),
-        ("SALE_REVERSAL", "Sale Reversal"),
-    ]
+class OpenOrderLine(models.Model):
+    """Units and value still owed on active supplier payments, per supplier and model"""
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
-    motorcycle_model = models.ForeignKey(
-        Motorcycle, on_delete=models.CASCADE, related_name="inventory_transactions"
-    )
-    quantity = models.IntegerField(
-        help_text="Positive for additions, negative for reductions"
+    supplier = models.ForeignKey(
+        Supplier, on_delete=models.CASCADE, related_name="open_order_lines"
     )
-    transaction_date = models.DateTimeField(auto_now_add=True)
-    reference_model = models.CharField(
-        max_length=50, help_text="Model name that triggered this transaction"
+    motorcycle_model = models.ForeignKey(
+        Motorcycle, on_delete=models.CASCADE, related_name="open_order_lines"
     )
-    reference_id = models.PositiveIntegerField(
-        help_text="ID of the record that triggered this transaction"
+    quantity = models.IntegerField(default=0)
+    value = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00")
     )
-    remarks = models.TextField(blank=True)
     updated_at = models.DateTimeField(auto_now=True)
-    created_by = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        related_name="%(class)s_created",
-        editable=False,
-    )
-    updated_by = models.ForeignKey(
-        settings.AUTH_USER_MODEL,
-        on_delete=models.SET_NULL,
-        null=True,
-        blank=True,
-        related_name="%(class)s_updated",
-    )
 
     class Meta:
-        ordering = ["-transaction_date"]
-        indexes = [
-            models.Index(fields=["motorcycle_model", "transaction_date"]),
-            models.Index(fields=["reference_model", "reference_id"]),
-        ]
+        unique_together = ["supplier", "motorcycle_model"]
+        indexes = [models.Index(fields=["motorcycle_model", "quantity"])]
 
     def __str__(self):
-        sign = "+" if self.quantity >= 0 else ""
-        return (
-            f"{self.motorcycle_model}: {sign}{self.quantity} ({self.transaction_type})"
+        return f"{self.supplier} / {self.motorcycle_model}: {self.quantity} on order"
+
+    @staticmethod
+    def _outstanding(payment_ids=None):
+        """{(supplier id, model id): (units, value)} undelivered on active payments."""
+        items = SupplierPaymentItem.objects.filter(
+            payment__status=SupplierPayment.ACTIVE,
+            expected_quantity__gt=F("delivered_quantity"),
         )
+        if payment_ids is not None:
+            items = items.filter(payment_id__in=payment_ids)
 
-    def clean(self):
-        """Validate transaction data"""
-        if self.quantity == 0:
-            raise ValidationError("Transaction quantity cannot be zero")
+        undelivered = ExpressionWrapper(
+            F("expected_quantity") - F("delivered_quantity"),
+            output_field=models.IntegerField(),
+        )
+        return {
+            (supplier_id, model_id): (units, value)
+            for supplier_id, model_id, units, value in items.order_by()
+            .values("payment__supplier_id", "motorcycle_model_id")
+            .annotate(
+                units=Sum(undelivered),
+                value=Sum(undelivered * F("unit_price"), output_field=DecimalField()),
+            )
+            .values_list(
+                "payment__supplier_id", "motorcycle_model_id", "units", "value"
+            )
+        }
 
-    def save(self, *args, **kwargs):
-        if not self._state.adding:
+    @staticmethod
+    def share(supplier_id, model_id, expected, delivered, unit_price, active=True):
+        """(line key, units, value) one payment item contributes to the book."""
+        units = max(expected - delivered, 0) if active else 0
+        return (supplier_id, model_id), units, units * unit_price
+
+    @classmethod
+    def apply_changes(cls, removed=(), added=()):
+        """
+        Swap the removed item shares for the added ones. The net change of
+        every line is written in one bulk update, with one bulk insert for
+        lines that do not exist yet.
+        """
+        deltas = {}
+        for sign, shares in ((-1, removed), (1, added)):
+            for key, units, value in shares:
+                old_units, old_value = deltas.get(key, (0, Decimal("0.00")))
+                deltas[key] = (old_units + sign * units, old_value + sign * value)
+        deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+        if len(deltas) <= 1:
+            for key, (units, value) in deltas.items():
+                cls.apply_delta(*key, units, value)
+            return
+
+        cache_utils.invalidate_on_commit(cache_utils.OPEN_ORDERS)
+        now = timezone.now()
+        with transaction.atomic():
+            lines = [
+                line
+                for line in cls.objects.filter(
+                    supplier_id__in={supplier_id for supplier_id, _ in deltas},
+                    motorcycle_model_id__in={model_id for _, model_id in deltas},
+                ).only("supplier_id", "motorcycle_model_id")
+                if (line.supplier_id, line.motorcycle_model_id) in deltas
+            ]
+            for line in lines:
+                units, value = deltas.pop((line.supplier_id, line.motorcycle_model_id))
+                line.quantity = F("quantity") + units
+                line.value = F("value") + value
+                line.updated_at = now
+            cls.objects.bulk_update(lines, ["quantity", "value", "updated_at"])
+            if not deltas:
+                return
+
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(
+                        cls(
+                            supplier_id=supplier_id,
+                            motorcycle_model_id=model_id,
+                            quantity=units,
+                            value=value,
+                        )
+                        for (supplier_id, model_id), (units, value) in deltas.items()
+                    )
+            except IntegrityError:
+                # Another transaction opened one of the lines first.
+                for key, (units, value) in deltas.items():
+                    cls.apply_delta(*key, units, value)
+
+    @classmethod
+    def payments_changed(cls, changes):
+        """
+        Move the open quantities of payments whose supplier or active status
+        changed. ``changes`` maps a payment id to its ``(supplier id, active)``
+        pair before and after the change.
+        """
+        changes = {
+            pk: change for pk, change in changes.items() if change[0] != change[1]
+        }
+        if not changes:
+            return
+        removed, added = [], []
+        for (
+            payment_id,
+            model_id,
+            expected,
+            delivered,
+            unit_price,
+        ) in SupplierPaymentItem.objects.filter(
+            payment_id__in=changes, expected_quantity__gt=F("delivered_quantity")
+        ).values_list(
+            "payment_id",
+            "motorcycle_model_id",
+            "expected_quantity",
+            "delivered_quantity",
+            "unit_price",
+        ):
+            (old_supplier, was_active), (new_supplier, is_active) = changes[payment_id]
+            removed.append(
+                cls.share(
+                    old_supplier, model_id, expected, delivered, unit_price, was_active
+                )
+            )
+            added.append(
+                cls.share(
+                    new_supplier, model_id, expected, delivered, unit_price, is_active
+                )
+            )
+        cls.apply_changes(removed, added)
+
+    @classmethod
+    def apply_delta(cls, supplier, motorcycle_model, quantity, value):
+        if not quantity and not value:
+            return
+        supplier_id = getattr(supplier, "pk", supplier)
+        model_id = getattr(motorcycle_model, "pk", motorcycle_model)
+        cache_utils.invalidate_on_commit(cache_utils.OPEN_ORDERS)
+
+        updated = cls.objects.filter(
+            supplier_id=supplier_id, motorcycle_model_id=model_id
+        ).update(
+            quantity=F("quantity") + quantity,
+            value=F("value") + value,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    supplier_id=supplier_id,
+                    motorcycle_model_id=model_id,
+                    quantity=quantity,
+                    value=value,
+                )
+        except IntegrityError:
+            cls.apply_delta(supplier_id, model_id, quantity, value)
+
+    @classmethod
+    def has_open_orders(cls, motorcycle_model):
+        return cls.objects.filter(
+            motorcycle_model=motorcycle_model, quantity__gt=0
+        ).exists()
+
+    @classmethod
+    def totals(cls, supplier=None):
+        """Units and value on order, from every supplier or just one."""
+        lines = cls.objects.filter(quantity__gt=0)
+        if supplier is not None:
+            lines = lines.filter(supplier=supplier)
+        return lines.aggregate(
+            units=Coalesce(Sum("quantity"), 0),
+            value=Coalesce(Sum("value"), Value(Decimal("0.00"))),
+        )
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every line from the payment items. Returns the number of
+        lines that were missing or wrong.
+        """
+        with transaction.atomic():
+            outstanding = cls._outstanding()
+            recorded = {
+                (line.supplier_id, line.motorcycle_model_id): line
+                for line in cls.objects.select_for_update()
+            }
+
+            missing, drifted = [], []
+            for key in set(outstanding) | set(recorded):
+                units, value = outstanding.get(key, (0, Decimal("0.00")))
+                line = recorded.get(key)
+                if line is None:
+                    missing.append(
+                        cls(
+                            supplier_id=key[0],
+                            motorcycle_model_id=key[1],
+                            quantity=units,
+                            value=value,
+                        )
+                    )
+                elif (line.quantity, line.value) != (units, value):
+                    line.quantity, line.value = units, value
+                    line.updated_at = timezone.now()
+                    drifted.append(line)
+
+            cls.objects.bulk_create(missing)
+            cls.objects.bulk_update(drifted, ["quantity", "value", "updated_at"])
+            cache_utils.invalidate_on_commit(cache_utils.OPEN_ORDERS)
+        return len(missing) + len(drifted)
+
+
+class PurchasePrice(models.Model):
+    """Price history of every non-cancelled payment line, indexed for per-model lookups"""
+
+    payment_item = models.OneToOneField(
+        SupplierPaymentItem, on_delete=models.CASCADE, related_name="price_record"
+    )
+    motorcycle_model = models.ForeignKey(
+        Motorcycle, on_delete=models.CASCADE, related_name="purchase_prices"
+    )
+    supplier = models.ForeignKey(
+        Supplier, on_delete=models.CASCADE, related_name="purchase_prices"
+    )
+    price_date = models.DateField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["motorcycle_model", "-price_date", "-id"],
+                name="purchaseprice_latest_idx",
+            ),
+            models.Index(
+                fields=["motorcycle_model", "price_date", "unit_price"],
+                name="purchaseprice_best_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.motorcycle_model} from {self.supplier}: ₦{self.unit_price} on {self.price_date}"
+
+    # Payment fields copied into (or deciding) a payment's history rows
+    PAYMENT_FIELDS = ("supplier_id", "payment_date", "status")
+
+    @staticmethod
+    def payment_changed(previous, payment):
+        """Whether a payment save moved anything its history rows depend on."""
+        return (
+            previous["supplier_id"] != payment.supplier_id
+            or previous["payment_date"] != payment.payment_date
+            or (previous["status"] == SupplierPayment.CANCELLED)
+            != (payment.status == SupplierPayment.CANCELLED)
+        )
+
+    @classmethod
+    def sync_item(cls, item):
+        """Write, update or drop the history row of a single payment line."""
+        payment = (
+            SupplierPayment.objects.filter(pk=item.payment_id)
+            .values(*cls.PAYMENT_FIELDS)
+            .first()
+        )
+        if not payment or payment["status"] == SupplierPayment.CANCELLED:
+            cls.objects.filter(payment_item_id=item.pk).delete()
+            return
+        cls.objects.update_or_create(
+            payment_item_id=item.pk,
+            defaults={
+                "motorcycle_model_id": item.motorcycle_model_id,
+                "supplier_id": payment["supplier_id"],
+                "price_date": timezone.localtime(payment["payment_date"]).date(),
+                "unit_price": item.unit_price,
+            },
+        )
+
+    @classmethod
+    def sync_payments(cls, payment_ids):
+        """Rewrite the history rows of the given payments from their current lines."""
+        payment_ids = [payment_id for payment_id in payment_ids if payment_id]
+        if not payment_ids:
+            return
+        items = SupplierPaymentItem.objects.filter(payment_id__in=payment_ids).exclude(
+            payment__status=SupplierPayment.CANCELLED
+        )
+        with transaction.atomic():
+            cls.objects.filter(payment_item__payment_id__in=payment_ids).delete()
+            cls.objects.bulk_create(
+                cls(
+                    payment_item_id=item_id,
+                    motorcycle_model_id=model_id,
+                    supplier_id=supplier_id,
+                    price_date=timezone.localtime(paid_at).date(),
+                    unit_price=unit_price,
+                )
+                for item_id, model_id, supplier_id, paid_at, unit_price in items.values_list(
+                    "pk",
+                    "motorcycle_model_id",
+                    "payment__supplier_id",
+                    "payment__payment_date",
+                    "unit_price",
+                )
+            )
+
+    @classmethod
+    def rebuild(cls):
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.sync_payments(SupplierPayment.objects.values_list("pk", flat=True))
+        return cls.objects.count()
+
+    @classmethod
+    def _ranked(cls, model_ids, order_by, since=None, supplier=None):
+        """The first history row per model under `order_by`."""
+        prices = cls.objects.filter(motorcycle_model_id__in=model_ids)
+        if since is not None:
+            prices = prices.filter(price_date__gte=since)
+        if supplier is not None:
+            prices = prices.filter(supplier=supplier)
+        ranked = prices.annotate(
+            rank=Window(
+                RowNumber(), partition_by=F("motorcycle_model_id"), order_by=order_by
+            )
+        ).filter(rank=1)
+        return {
+            price.motorcycle_model_id: price
+            for price in ranked.select_related("supplier")
+        }
+
+    @classmethod
+    def latest_for_models(cls, model_ids, supplier=None):
+        """Most recent price paid per model id, optionally from one supplier."""
+        return cls._ranked(
+            model_ids, [F("price_date").desc(), F("id").desc()], supplier=supplier
+        )
+
+    @classmethod
+    def best_for_models(cls, model_ids, days=90):
+        """Cheapest price per model id paid in the last `days` days."""
+        since = timezone.localdate() - datetime.timedelta(days=days)
+        return cls._ranked(
+            model_ids,
+            [F("unit_price").asc(), F("price_date").desc(), F("id").desc()],
+            since=since,
+        )
+
+    @classmethod
+    def latest(cls, motorcycle_model, supplier=None):
+        model_id = getattr(motorcycle_model, "pk", motorcycle_model)
+        prices = cls.objects.filter(motorcycle_model_id=model_id)
+        if supplier is not None:
+            prices = prices.filter(supplier=supplier)
+        return prices.order_by("-price_date", "-id").first()
+
+    @classmethod
+    def best(cls, motorcycle_model, days=90):
+        model_id = getattr(motorcycle_model, "pk", motorcycle_model)
+        since = timezone.localdate() - datetime.timedelta(days=days)
+        return (
+            cls.objects.filter(motorcycle_model_id=model_id, price_date__gte=since)
+            .order_by("unit_price", "-price_date", "-id")
+            .first()
+        )
+
+
+class SupplierScorecard(models.Model):
+    """Delivery performance per supplier, refreshed in batch by refresh_supplier_scorecards"""
+
+    # Rows committed late can carry an updated_at just before the previous
+    # run started, so each refresh looks back a little past its watermark.
+    WATERMARK_OVERLAP = datetime.timedelta(minutes=5)
+    BATCH_SIZE = 200
+
+    supplier = models.OneToOneField(
+        Supplier, on_delete=models.CASCADE, related_name="scorecard"
+    )
+    expected_units = models.PositiveIntegerField(default=0)
+    delivered_units = models.PositiveIntegerField(default=0)
+    fill_rate = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        default=Decimal("0.00"),
+        help_text="Percentage of ordered units delivered on non-cancelled payments",
+    )
+    average_lead_time_days = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Mean days from payment to each non-cancelled delivery",
+    )
+    deliveries_count = models.PositiveIntegerField(default=0)
+    partial_deliveries = models.PositiveIntegerField(
+        default=0,
+        help_text="Deliveries that left their payment with units still outstanding",
+    )
+    cancelled_deliveries = models.PositiveIntegerField(default=0)
+    cancelled_delivery_rate = models.DecimalField(
+        max_digits=5, decimal_places=2, default=Decimal("0.00")
+    )
+    price_trends = models.JSONField(default=list, blank=True)
+    source_updated_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Watermark: source rows changed after this are not reflected yet",
+    )
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Scorecard for {self.supplier}"
+
+    @staticmethod
+    def _percentage(part, whole):
+        if not whole:
+            return Decimal("0.00")
+        return (Decimal(part) * 100 / Decimal(whole)).quantize(Decimal("0.01"))
+
+    @classmethod
+    def mark_stale(cls, **supplier_lookup):
+        """
+        Clear the watermark of the matching suppliers' scorecards so the
+        next refresh recomputes them. A deleted row leaves no updated_at
+        behind for the watermark to find, so deletes mark their supplier.
+        """
+        cls.objects.filter(
+            **{
+                f"supplier__{lookup}": value
+                for lookup, value in supplier_lookup.items()
+            }
+        ).update(source_updated_at=None)
+
+    @staticmethod
+    def _changed_supplier_ids(since):
+        """Suppliers with a payment, payment item, delivery or delivery item touched after `since`."""
+        sources = [
+            SupplierPayment.objects.filter(updated_at__gt=since).values_list(
+                "supplier_id", flat=True
+            ),
+            SupplierPaymentItem.objects.filter(updated_at__gt=since).values_list(
+                "payment__supplier_id", flat=True
+            ),
+            SupplierDelivery.objects.filter(updated_at__gt=since).values_list(
+                "payment__supplier_id", flat=True
+            ),
+            SupplierDeliveryItem.objects.filter(updated_at__gt=since).values_list(
+                "delivery__payment__supplier_id", flat=True
+            ),
+        ]
+        changed = set()
+        for source in sources:
+            changed.update(source.order_by().distinct())
+        return changed
+
+    @classmethod
+    def _compute(cls, supplier_ids):
+        """Scorecard field values for each supplier id, from three reads."""
+        stats = {
+            supplier_id: {
+                "expected_units": 0,
+                "delivered_units": 0,
+                "lead_days": [],
+                "deliveries_count": 0,
+                "partial_deliveries": 0,
+                "cancelled_deliveries": 0,
+                "price_trends": {},
+            }
+            for supplier_id in supplier_ids
+        }
+
+        ordered = {}
+        for supplier_id, payment_id, expected, delivered in (
+            SupplierPaymentItem.objects.filter(payment__supplier_id__in=supplier_ids)
+            .exclude(payment__status=SupplierPayment.CANCELLED)
+            .order_by()
+            .values("payment_id")
+            .annotate(
+                expected=Sum("expected_quantity"), delivered=Sum("delivered_quantity")
+            )
+            .values_list("payment__supplier_id", "payment_id", "expected", "delivered")
+        ):
+            entry = stats[supplier_id]
+            entry["expected_units"] += expected
+            entry["delivered_units"] += delivered
+            ordered[payment_id] = expected
+
+        # Deliveries in the order they arrived, so each one can be checked
+        # against what its payment had received by then.
+        received = defaultdict(int)
+        for (
+            supplier_id,
+            payment_id,
+            delivery_date,
+            payment_date,
+            is_cancelled,
+            units,
+        ) in (
+            SupplierDelivery.objects.filter(payment__supplier_id__in=supplier_ids)
+            .exclude(payment__status=SupplierPayment.CANCELLED)
+            .order_by("payment_id", "delivery_date", "pk")
+            .annotate(units=Coalesce(Sum("delivery_items__delivered_quantity"), 0))
+            .values_list(
+                "payment__supplier_id",
+                "payment_id",
+                "delivery_date",
+                "payment__payment_date",
+                "is_cancelled",
+                "units",
+            )
+            .iterator()
+        ):
+            entry = stats[supplier_id]
+            if is_cancelled:
+                entry["cancelled_deliveries"] += 1
+                continue
+            entry["deliveries_count"] += 1
+            received[payment_id] += units
+            if received[payment_id] < ordered.get(payment_id, 0):
+                entry["partial_deliveries"] += 1
+            paid_on = timezone.localtime(payment_date).date()
+            entry["lead_days"].append(max((delivery_date - paid_on).days, 0))
+
+        for supplier_id, model_id, brand, name, paid_at, unit_price in (
+            SupplierPaymentItem.objects.filter(payment__supplier_id__in=supplier_ids)
+            .exclude(payment__status=SupplierPayment.CANCELLED)
+            .order_by("payment__payment_date", "payment_id")
+            .values_list(
+                "payment__supplier_id",
+                "motorcycle_model_id",
+                "motorcycle_model__brand",
+                "motorcycle_model__name",
+                "payment__payment_date",
+                "unit_price",
+            )
+            .iterator()
+        ):
+            paid_on = timezone.localtime(paid_at).date()
+            trend = stats[supplier_id]["price_trends"].setdefault(
+                model_id,
+                {
+                    "motorcycle_model_id": model_id,
+                    "motorcycle_model": f"{brand} {name}",
+                    "orders": 0,
+                    "first_price": str(unit_price),
+                    "first_ordered": paid_on.isoformat(),
+                },
+            )
+            trend["orders"] += 1
+            trend["latest_price"] = str(unit_price)
+            trend["latest_ordered"] = paid_on.isoformat()
+            trend["change_percent"] = str(
+                cls._percentage(
+                    unit_price - Decimal(trend["first_price"]),
+                    Decimal(trend["first_price"]),
+                )
+            )
+
+        results = {}
+        for supplier_id, entry in stats.items():
+            total_deliveries = entry["deliveries_count"] + entry["cancelled_deliveries"]
+            lead_days = entry["lead_days"]
+            results[supplier_id] = {
+                "expected_units": entry["expected_units"],
+                "delivered_units": entry["delivered_units"],
+                "fill_rate": cls._percentage(
+                    entry["delivered_units"], entry["expected_units"]
+                ),
+                "average_lead_time_days": (
+                    (Decimal(sum(lead_days)) / len(lead_days)).quantize(Decimal("0.01"))
+                    if lead_days
+                    else None
+                ),
+                "deliveries_count": entry["deliveries_count"],
+                "partial_deliveries": entry["partial_deliveries"],
+                "cancelled_deliveries": entry["cancelled_deliveries"],
+                "cancelled_delivery_rate": cls._percentage(
+                    entry["cancelled_deliveries"], total_deliveries
+                ),
+                "price_trends": sorted(
+                    entry["price_trends"].values(),
+                    key=lambda trend: trend["motorcycle_model"],
+                ),
+            }
+        return results
+
+    @classmethod
+    def refresh(cls, full=False):
+        """
+        Recompute scorecards for suppliers whose payments or deliveries have
+        changed since the last run (or for every supplier with full=True).
+        Returns the number of scorecards written.
+        """
+        started = timezone.now()
+        since = (
+            None
+            if full
+            else cls.objects.aggregate(watermark=Max("source_updated_at"))["watermark"]
+        )
+
+        if since is None:
+            supplier_ids = set(Supplier.objects.values_list("pk", flat=True))
+        else:
+            supplier_ids = cls._changed_supplier_ids(since - cls.WATERMARK_OVERLAP)
+            supplier_ids.update(
+                Supplier.objects.filter(
+                    Q(scorecard__isnull=True)
+                    | Q(scorecard__source_updated_at__isnull=True)
+                ).values_list("pk", flat=True)
+            )
+
+        supplier_ids = sorted(supplier_ids)
+        fields = [
+            field.name
+            for field in cls._meta.concrete_fields
+            if field.name not in ("id", "supplier")
+        ]
+        for offset in range(0, len(supplier_ids), cls.BATCH_SIZE):
+            batch = supplier_ids[offset : offset + cls.BATCH_SIZE]
+            with transaction.atomic():
+                cls.objects.bulk_create(
+                    [
+                        cls(
+                            supplier_id=supplier_id,
+                            source_updated_at=started,
+                            computed_at=timezone.now(),
+                            **values,
+                        )
+                        for supplier_id, values in cls._compute(batch).items()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["supplier"],
+                    update_fields=fields,
+                )
+        return len(supplier_ids)
+
+
+class InventoryTransaction(models.Model):
+    """Immutable log of all inventory changes"""
+
+    TRANSACTION_TYPES = [
+        ("SUPPLIER_DELIVERY", "Supplier Delivery"),
+        ("DELIVERY_REVERSAL", "Delivery Reversal"),
+        ("SALE", "Sale"),
+        ("SALE_REVERSAL", "Sale Reversal"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    transaction_type = models.CharField(max_length=20, choices=TRANSACTION_TYPES)
+    motorcycle_model = models.ForeignKey(
+        Motorcycle, on_delete=models.CASCADE, related_name="inventory_transactions"
+    )
+    quantity = models.IntegerField(
+        help_text="Positive for additions, negative for reductions"
+    )
+    transaction_date = models.DateTimeField(auto_now_add=True)
+    reference_model = models.CharField(
+        max_length=50, help_text="Model name that triggered this transaction"
+    )
+    reference_id = models.PositiveIntegerField(
+        help_text="ID of the record that triggered this transaction"
+    )
+    remarks = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="%(class)s_created",
+        editable=False,
+    )
+    updated_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="%(class)s_updated",
+    )
+
+    class Meta:
+        ordering = ["-transaction_date"]
+        indexes = [
+            models.Index(fields=["motorcycle_model", "transaction_date"]),
+            models.Index(fields=["reference_model", "reference_id"]),
+            models.Index(fields=["transaction_date"]),
+        ]
+
+    def __str__(self):
+        sign = "+" if self.quantity >= 0 else ""
+        return (
+            f"{self.motorcycle_model}: {sign}{self.quantity} ({self.transaction_type})"
+        )
+
+    def clean(self):
+        """Validate transaction data"""
+        if self.quantity == 0:
+            raise ValidationError("Transaction quantity cannot be zero")
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
             raise ValidationError(
                 "Inventory transactions are immutable and cannot be updated."
             )
 
         self.full_clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
         raise ValidationError("Inventory transactions cannot be deleted")
 
+    @classmethod
+    def ledger_with_balance(cls, motorcycle_model):
+        """
+        A model's ledger with each row annotated with `running_balance`, the
+        stock level right after that movement. The window only sees rows that
+        survive any later filter, so a filter that drops older rows must add
+        their total back (see `balance_through`).
+        """
+        return cls.objects.filter(motorcycle_model=motorcycle_model).annotate(
+            running_balance=Window(
+                Sum("quantity"),
+                order_by=[F("transaction_date").asc(), F("id").asc()],
+                frame=RowRange(start=None, end=0),
+            )
+        )
+
+    @classmethod
+    def balance_through(cls, motorcycle_model, transaction_date, transaction_id):
+        """Stock level right after the given ledger row."""
+        return (
+            cls.objects.filter(motorcycle_model=motorcycle_model)
+            .filter(
+                Q(transaction_date__lt=transaction_date)
+                | Q(transaction_date=transaction_date, id__lte=transaction_id)
+            )
+            .aggregate(total=Coalesce(Sum("quantity"), Value(0)))["total"]
+        )
+
+    @classmethod
+    def post_batch(cls, transactions):
+        """
+        Insert several new ledger rows with one bulk insert and apply their
+        net movement to each affected Inventory row once.
+        """
+        transactions = list(transactions)
+        for entry in transactions:
+            if not entry._state.adding:
+                raise ValidationError(
+                    "Inventory transactions are immutable and cannot be updated."
+                )
+            entry.clean_fields(exclude=["motorcycle_model", "created_by", "updated_by"])
+            entry.clean()
+
+        if not transactions:
+            return []
+
+        net_movement = defaultdict(int)
+        for entry in transactions:
+            net_movement[entry.motorcycle_model_id] += entry.quantity
+
+        with transaction.atomic():
+            created = cls.objects.bulk_create(transactions)
+            ActivityEvent.record_many(created)
+            for model_id, delta in net_movement.items():
+                if delta:
+                    Inventory.apply_delta(model_id, delta)
+
+        return created
+
 
 class Inventory(models.Model):
     """Current stock levels by motorcycle model"""
@@ -839,26 +2083,105 @@ class Inventory(models.Model):
         return f"{self.motorcycle_model}: {self.current_quantity} units"
 
     @classmethod
-    def update_inventory(cls, motorcycle_model):
-        """Update inventory quantity based on transactions."""
-        total_quantity = (
+    def apply_delta(cls, motorcycle_model, delta):
+        """
+        Apply a single ledger movement to the stock level with an atomic
+        current_quantity = current_quantity + delta update.
+        """
+        model_id = getattr(motorcycle_model, "pk", motorcycle_model)
+        cache_utils.invalidate_on_commit(cache_utils.INVENTORY)
+
+        with transaction.atomic():
+            updated_count = cls.objects.filter(motorcycle_model_id=model_id).update(
+                current_quantity=F("current_quantity") + delta,
+                last_updated=timezone.now(),
+            )
+            if updated_count:
+                return updated_count
+
+            # First movement for this model: seed the row from the ledger, which
+            # already contains the transaction being applied.
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        motorcycle_model_id=model_id,
+                        current_quantity=cls._ledger_total(model_id),
+                    )
+            except IntegrityError:
+                cls.objects.filter(motorcycle_model_id=model_id).update(
+                    current_quantity=F("current_quantity") + delta,
+                    last_updated=timezone.now(),
+                )
+        return 1
+
+    @staticmethod
+    def _ledger_total(motorcycle_model):
+        return (
             InventoryTransaction.objects.filter(
                 motorcycle_model=motorcycle_model
             ).aggregate(total=Sum("quantity"))["total"]
             or 0
         )
 
-        updated_count = cls.objects.filter(motorcycle_model=motorcycle_model).update(
-            current_quantity=total_quantity, last_updated=timezone.now()
+    @classmethod
+    def update_inventory(cls, motorcycle_model):
+        """Re-derive inventory quantity from the full transaction ledger."""
+        cache_utils.invalidate_on_commit(cache_utils.INVENTORY)
+        with transaction.atomic():
+            list(
+                cls.objects.select_for_update().filter(
+                    motorcycle_model=motorcycle_model
+                )
+            )
+            total_quantity = cls._ledger_total(motorcycle_model)
+
+            updated_count = cls.objects.filter(
+                motorcycle_model=motorcycle_model
+            ).update(current_quantity=total_quantity, last_updated=timezone.now())
+
+            if updated_count == 0:
+                inventory = cls.objects.create(
+                    motorcycle_model_id=getattr(
+                        motorcycle_model, "pk", motorcycle_model
+                    ),
+                    current_quantity=total_quantity,
+                )
+                return inventory
+            else:
+                return cls.objects.get(motorcycle_model=motorcycle_model)
+
+    @classmethod
+    def reconcile(cls, fix=False):
+        """
+        Compare every stored stock level against the ledger.
+        Returns a list of drifted models; corrects them when fix=True.
+        """
+        ledger_totals = dict(
+            InventoryTransaction.objects.order_by()
+            .values("motorcycle_model")
+            .annotate(total=Sum("quantity"))
+            .values_list("motorcycle_model", "total")
         )
+        recorded = dict(cls.objects.values_list("motorcycle_model", "current_quantity"))
+
+        drift = []
+        for model_id in sorted(set(ledger_totals) | set(recorded)):
+            ledger_quantity = ledger_totals.get(model_id) or 0
+            recorded_quantity = recorded.get(model_id)
+            if recorded_quantity != ledger_quantity:
+                drift.append(
+                    {
+                        "motorcycle_model_id": model_id,
+                        "recorded_quantity": recorded_quantity,
+                        "ledger_quantity": ledger_quantity,
+                    }
+                )
 
-        if updated_count == 0:
-            inventory = cls.objects.create(
-                motorcycle_model=motorcycle_model, current_quantity=total_quantity
-            )
-            return inventory
-        else:
-            return cls.objects.get(motorcycle_model=motorcycle_model)
+        if fix:
+            for entry in drift:
+                cls.update_inventory(entry["motorcycle_model_id"])
+
+        return drift
 
     def save(self, *args, **kwargs):
         if self.pk:
@@ -871,6 +2194,426 @@ class Inventory(models.Model):
         super().save(*args, **kwargs)
 
 
+class InventorySnapshot(models.Model):
+    """Checkpointed stock levels, used to answer point-in-time stock queries"""
+
+    motorcycle_model = models.ForeignKey(
+        Motorcycle, on_delete=models.CASCADE, related_name="inventory_snapshots"
+    )
+    as_of = models.DateTimeField(
+        db_index=True, help_text="Ledger position this quantity is valid for"
+    )
+    quantity = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-as_of"]
+        unique_together = ["motorcycle_model", "as_of"]
+
+    def __str__(self):
+        return f"{self.motorcycle_model}: {self.quantity} units as of {self.as_of:%Y-%m-%d %H:%M}"
+
+    @classmethod
+    def stock_as_of(cls, at, motorcycle_model=None):
+        """
+        Stock per motorcycle model id as of `at`: the latest checkpoint at or
+        before `at` plus the ledger movements recorded since that checkpoint.
+        """
+        snapshots = cls.objects.filter(as_of__lte=at)
+        movements = InventoryTransaction.objects.filter(transaction_date__lte=at)
+        if motorcycle_model is not None:
+            snapshots = snapshots.filter(motorcycle_model=motorcycle_model)
+            movements = movements.filter(motorcycle_model=motorcycle_model)
+
+        stock = {}
+        checkpoint = snapshots.aggregate(latest=Max("as_of"))["latest"]
+        if checkpoint is not None:
+            stock = dict(
+                snapshots.filter(as_of=checkpoint).values_list(
+                    "motorcycle_model", "quantity"
+                )
+            )
+            movements = movements.filter(transaction_date__gt=checkpoint)
+
+        deltas = (
+            movements.order_by()
+            .values("motorcycle_model")
+            .annotate(total=Sum("quantity"))
+            .values_list("motorcycle_model", "total")
+        )
+        for model_id, total in deltas:
+            stock[model_id] = stock.get(model_id, 0) + total
+
+        return stock
+
+    @classmethod
+    def take(cls, as_of=None):
+        """
+        Record a checkpoint for every model with ledger history as of `as_of`.
+        Re-taking an existing checkpoint replaces it.
+        """
+        as_of = as_of or timezone.now()
+        stock = cls.stock_as_of(as_of)
+
+        with transaction.atomic():
+            cls.objects.filter(as_of=as_of).delete()
+            return cls.objects.bulk_create(
+                [
+                    cls(motorcycle_model_id=model_id, as_of=as_of, quantity=quantity)
+                    for model_id, quantity in stock.items()
+                ]
+            )
+
+
+class InventoryCost(models.Model):
+    """Running FIFO value and weighted-average unit cost per motorcycle model"""
+
+    motorcycle_model = models.OneToOneField(
+        Motorcycle, on_delete=models.CASCADE, related_name="inventory_cost"
+    )
+    units_on_hand = models.IntegerField(
+        default=0, help_text="Units in stock, as the inventory ledger counts them"
+    )
+    fifo_value = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal("0.00")
+    )
+    average_unit_cost = models.DecimalField(
+        max_digits=14, decimal_places=4, default=Decimal("0.0000")
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.motorcycle_model}: {self.units_on_hand} units @ {self.average_unit_cost}"
+
+    @classmethod
+    def move(cls, motorcycle_model, quantity, value, revalue_average=True):
+        """
+        Apply a layered movement of `quantity` units worth `value` at FIFO cost.
+        Receipts and returns move the weighted average; sales leave it alone,
+        since under the average method units leave at the average cost.
+        """
+        model_id = getattr(motorcycle_model, "pk", motorcycle_model)
+        with transaction.atomic():
+            cls.objects.get_or_create(motorcycle_model_id=model_id)
+            record = cls.objects.select_for_update().get(motorcycle_model_id=model_id)
+
+            new_units = record.units_on_hand + quantity
+            if revalue_average and new_units > 0:
+                average_value = record.units_on_hand * record.average_unit_cost + value
+                record.average_unit_cost = max(
+                    average_value / new_units, Decimal("0")
+                ).quantize(Decimal("0.0001"))
+
+            record.units_on_hand = new_units
+            record.fifo_value = (record.fifo_value + value).quantize(Decimal("0.01"))
+            record.save(
+                update_fields=[
+                    "units_on_hand",
+                    "fifo_value",
+                    "average_unit_cost",
+                    "updated_at",
+                ]
+            )
+            return record
+
+    @classmethod
+    def valuation(cls):
+        """Stock value at FIFO and at weighted-average cost, from one row per model."""
+        return cls.objects.aggregate(
+            units=Coalesce(Sum("units_on_hand"), Value(0)),
+            fifo_value=Coalesce(
+                Sum("fifo_value"), Value(Decimal("0.00")), output_field=DecimalField()
+            ),
+            average_value=Coalesce(
+                Sum(
+                    F("units_on_hand") * F("average_unit_cost"),
+                    output_field=DecimalField(),
+                ),
+                Value(Decimal("0.00")),
+                output_field=DecimalField(),
+            ),
+        )
+
+
+class CostLayer(models.Model):
+    """FIFO cost layer opened by a supplier delivery receipt"""
+
+    motorcycle_model = models.ForeignKey(
+        Motorcycle, on_delete=models.CASCADE, related_name="cost_layers"
+    )
+    delivery_item = models.OneToOneField(
+        SupplierDeliveryItem, on_delete=models.CASCADE, related_name="cost_layer"
+    )
+    received_at = models.DateTimeField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity_received = models.PositiveIntegerField()
+    quantity_remaining = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["received_at", "id"]
+        indexes = [
+            models.Index(
+                fields=["motorcycle_model", "quantity_remaining", "received_at"]
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.motorcycle_model}: {self.quantity_remaining}/"
+            f"{self.quantity_received} @ {self.unit_cost}"
+        )
+
+    @classmethod
+    def receive(cls, delivery, delivery_items):
+        """Open one layer per delivered item, costed at the payment's unit price."""
+        delivery_items = [item for item in delivery_items if item.delivered_quantity]
+        if not delivery_items:
+            return []
+
+        prices = dict(
+            SupplierPaymentItem.objects.filter(
+                payment_id=delivery.payment_id
+            ).values_list("motorcycle_model_id", "unit_price")
+        )
+        layers = [
+            cls(
+                motorcycle_model_id=item.motorcycle_model_id,
+                delivery_item=item,
+                received_at=item.created_at or timezone.now(),
+                unit_cost=prices.get(item.motorcycle_model_id, Decimal("0.00")),
+                quantity_received=item.delivered_quantity,
+                quantity_remaining=item.delivered_quantity,
+            )
+            for item in delivery_items
+        ]
+
+        with transaction.atomic():
+            cls.objects.bulk_create(layers)
+            for layer in layers:
+                InventoryCost.move(
+                    layer.motorcycle_model_id,
+                    layer.quantity_received,
+                    layer.quantity_received * layer.unit_cost,
+                )
+        return layers
+
+    @classmethod
+    def retire(cls, delivery):
+        """
+        Take a cancelled delivery's units back out in full, as its ledger
+        reversal does. The unsold remainder closes the layers; units already
+        sold come out again at their cost and go back in when those sales
+        are cancelled (see restore).
+        """
+        with transaction.atomic():
+            layers = list(
+                cls.objects.select_for_update().filter(delivery_item__delivery=delivery)
+            )
+            cls.objects.filter(pk__in=[layer.pk for layer in layers]).update(
+                quantity_remaining=0
+            )
+            for layer in layers:
+                InventoryCost.move(
+                    layer.motorcycle_model_id,
+                    -layer.quantity_received,
+                    -layer.quantity_received * layer.unit_cost,
+                )
+
+    @classmethod
+    def consume(cls, sale, quantity=1):
+        """
+        Draw `quantity` units for a sale from the oldest open layers. Units
+        not covered by any layer (stock that predates the layers) are costed
+        at the model's current weighted average.
+        """
+        model_id = sale.motorcycle_id
+        with transaction.atomic():
+            open_layers = cls.objects.select_for_update().filter(
+                motorcycle_model_id=model_id, quantity_remaining__gt=0
+            )
+
+            consumptions = []
+            remaining = quantity
+            for layer in open_layers.order_by("received_at", "id"):
+                taken = min(remaining, layer.quantity_remaining)
+                cls.objects.filter(pk=layer.pk).update(
+                    quantity_remaining=F("quantity_remaining") - taken
+                )
+                consumptions.append(
+                    CostLayerConsumption(
+                        sale=sale,
+                        layer=layer,
+                        quantity=taken,
+                        unit_cost=layer.unit_cost,
+                    )
+                )
+                remaining -= taken
+                if not remaining:
+                    break
+
+            layered_quantity = quantity - remaining
+            layered_value = sum(
+                (c.quantity * c.unit_cost for c in consumptions), Decimal("0.00")
+            )
+            if layered_quantity:
+                InventoryCost.move(
+                    model_id, -layered_quantity, -layered_value, revalue_average=False
+                )
+
+            if remaining:
+                cost = InventoryCost.objects.filter(
+                    motorcycle_model_id=model_id
+                ).first()
+                consumptions.append(
+                    CostLayerConsumption(
+                        sale=sale,
+                        layer=None,
+                        quantity=remaining,
+                        unit_cost=cost.average_unit_cost if cost else Decimal("0.00"),
+                    )
+                )
+
+            return CostLayerConsumption.objects.bulk_create(consumptions)
+
+    @classmethod
+    def restore(cls, sale):
+        """
+        Put a cancelled sale's units back on the layers they were drawn from.
+        Units from a cancelled delivery's layer go back into stock at their
+        cost without reopening the layer, refilling what retire took out.
+        """
+        with transaction.atomic():
+            consumptions = list(
+                CostLayerConsumption.objects.select_for_update().filter(
+                    sale=sale, is_reversed=False
+                )
+            )
+            if not consumptions:
+                return
+
+            live_layer_ids = set(
+                cls.objects.filter(
+                    pk__in=[c.layer_id for c in consumptions if c.layer_id],
+                    delivery_item__delivery__is_cancelled=False,
+                ).values_list("pk", flat=True)
+            )
+            for consumption in consumptions:
+                if not consumption.layer_id:
+                    # Stock that predates the layers was never taken out.
+                    continue
+                if consumption.layer_id in live_layer_ids:
+                    cls.objects.filter(pk=consumption.layer_id).update(
+                        quantity_remaining=F("quantity_remaining")
+                        + consumption.quantity
+                    )
+                InventoryCost.move(
+                    sale.motorcycle_id,
+                    consumption.quantity,
+                    consumption.quantity * consumption.unit_cost,
+                )
+
+            CostLayerConsumption.objects.filter(
+                pk__in=[c.pk for c in consumptions]
+            ).update(is_reversed=True)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Discard all layers and replay active deliveries and sales in the
+        order the ledger recorded them. Returns (layers opened, sales costed).
+        """
+        receipts = SupplierDeliveryItem.objects.filter(
+            delivery__is_cancelled=False
+        ).select_related("delivery")
+        receipts = {item.pk: item for item in receipts}
+        sales = {sale.pk: sale for sale in Sale.objects.filter(status="ACTIVE")}
+
+        events = []
+        for transaction_type, reference_id in (
+            InventoryTransaction.objects.filter(
+                Q(
+                    transaction_type="SUPPLIER_DELIVERY",
+                    reference_model="SupplierDeliveryItem",
+                )
+                | Q(transaction_type="SALE", reference_model="Sale")
+            )
+            .order_by("transaction_date", "id")
+            .values_list("transaction_type", "reference_id")
+        ):
+            source = receipts if transaction_type == "SUPPLIER_DELIVERY" else sales
+            if reference_id in source:
+                events.append((transaction_type, source.pop(reference_id)))
+
+        with transaction.atomic():
+            CostLayerConsumption.objects.all().delete()
+            cls.objects.all().delete()
+            InventoryCost.objects.all().delete()
+
+            layer_count = sale_count = 0
+            for transaction_type, obj in events:
+                if transaction_type == "SUPPLIER_DELIVERY":
+                    layer_count += len(cls.receive(obj.delivery, [obj]))
+                else:
+                    cls.consume(obj)
+                    sale_count += 1
+
+        return layer_count, sale_count
+
+
+class CostLayerConsumption(models.Model):
+    """Units a sale drew from a cost layer, kept for cost of goods sold"""
+
+    sale = models.ForeignKey(
+        "Sale", on_delete=models.CASCADE, related_name="cost_consumptions"
+    )
+    layer = models.ForeignKey(
+        CostLayer,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="consumptions",
+        help_text="Empty when the units were not covered by any layer",
+    )
+    quantity = models.PositiveIntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    is_reversed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sale_id}: {self.quantity} @ {self.unit_cost}"
+
+    @classmethod
+    def margin_summary(cls, start=None, end=None):
+        """Revenue, FIFO cost of goods sold and gross margin for active sales."""
+        sales = Sale.objects.filter(status="ACTIVE")
+        if start is not None:
+            sales = sales.filter(sale_date__gte=start)
+        if end is not None:
+            sales = sales.filter(sale_date__lt=end)
+
+        revenue = sales.aggregate(
+            total=Coalesce(Sum("final_price"), Value(Decimal("0.00")))
+        )["total"]
+        cost_of_goods_sold = cls.objects.filter(
+            sale__in=sales, is_reversed=False
+        ).aggregate(
+            total=Coalesce(
+                Sum(F("quantity") * F("unit_cost"), output_field=DecimalField()),
+                Value(Decimal("0.00")),
+                output_field=DecimalField(),
+            )
+        )[
+            "total"
+        ]
+
+        return {
+            "revenue": revenue,
+            "cost_of_goods_sold": cost_of_goods_sold,
+            "gross_margin": revenue - cost_of_goods_sold,
+        }
+
+
 class Sale(models.Model):
     PAYMENT_TYPE_CHOICES = [
         ("DEPOSIT", "Deposit"),
@@ -932,6 +2675,7 @@ class Sale(models.Model):
 
     class Meta:
         ordering = ["-sale_date"]
+        indexes = [models.Index(fields=["status", "sale_date"])]
         verbose_name = "Sale Record"
         verbose_name_plural = "Sale Records"
 
@@ -942,6 +2686,30 @@ class Sale(models.Model):
     def get_absolute_url(self):
         return reverse("sale_detail", kwargs={"pk": self.pk})
 
+    def save(self, *args, **kwargs):
+        previous = None
+        if self.pk:
+            previous = (
+                Sale.objects.filter(pk=self.pk)
+                .values(*DailySalesFact.SOURCE_FIELDS)
+                .first()
+            )
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            DailySalesFact.record_change(previous, self)
+
+    def delete(self, *args, **kwargs):
+        previous = (
+            Sale.objects.filter(pk=self.pk)
+            .values(*DailySalesFact.SOURCE_FIELDS)
+            .first()
+        )
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            DailySalesFact.record_change(previous, None)
+            return result
+
     def clean(self):
         super().clean()
         if self.final_price is not None and self.final_price <= Decimal("0.00"):
@@ -961,29 +2729,225 @@ class Sale(models.Model):
                     raise ValidationError(
                         "Cancelled sales cannot be reactivated. Please create a new sale."
                     )
-                if (
-                    original.engine_no != self.engine_no
-                    or original.chassis_no != self.chassis_no
-                    or original.sale_date != self.sale_date
+                if (
+                    original.engine_no != self.engine_no
+                    or original.chassis_no != self.chassis_no
+                    or original.sale_date != self.sale_date
+                ):
+                    raise ValidationError(
+                        "Cannot modify engine/chassis number or sale date for a cancelled sale. Remarks may be an exception."
+                    )
+
+            restricted_fields = [
+                "customer",
+                "motorcycle",
+                "payment_type",
+                "final_price",
+            ]
+            for field_name in restricted_fields:
+                if getattr(self, field_name) != getattr(original, field_name):
+                    raise ValidationError(
+                        {
+                            field_name: f"{field_name.replace('_', ' ').title()} cannot be changed after creation. "
+                            f"Please cancel this sale and create a new one if these details need to change."
+                        }
+                    )
+
+
+class DailySalesFact(models.Model):
+    """Sales rolled up per day, model, payment type and status, kept in step with Sale"""
+
+    SOURCE_FIELDS = (
+        "sale_date",
+        "motorcycle_id",
+        "payment_type",
+        "status",
+        "final_price",
+    )
+
+    day = models.DateField()
+    motorcycle_model = models.ForeignKey(
+        Motorcycle, on_delete=models.CASCADE, related_name="daily_sales"
+    )
+    payment_type = models.CharField(max_length=20, choices=Sale.PAYMENT_TYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=Sale.STATUS_CHOICES)
+    sales_count = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(
+        max_digits=16, decimal_places=2, default=Decimal("0.00")
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("day", "motorcycle_model", "payment_type", "status")
+        indexes = [models.Index(fields=["status", "day"])]
+
+    def __str__(self):
+        return f"{self.day} {self.motorcycle_model} {self.payment_type}/{self.status}: {self.sales_count} sold"
+
+    @staticmethod
+    def _key(values):
+        return (
+            timezone.localtime(values["sale_date"]).date(),
+            values["motorcycle_id"],
+            values["payment_type"],
+            values["status"],
+        )
+
+    @classmethod
+    def record_change(cls, previous, sale):
+        """Move a sale's contribution from its previous row to its current one."""
+        deltas = defaultdict(lambda: [0, Decimal("0.00")])
+        if previous:
+            delta = deltas[cls._key(previous)]
+            delta[0] -= 1
+            delta[1] -= previous["final_price"]
+        if sale is not None:
+            delta = deltas[
+                cls._key({field: getattr(sale, field) for field in cls.SOURCE_FIELDS})
+            ]
+            delta[0] += 1
+            delta[1] += Decimal(sale.final_price)
+        for key, (count, revenue) in deltas.items():
+            cls.apply_delta(*key, count, revenue)
+
+    @classmethod
+    def apply_delta(cls, day, motorcycle_model, payment_type, status, count, revenue):
+        if not count and not revenue:
+            return
+        model_id = getattr(motorcycle_model, "pk", motorcycle_model)
+        key = dict(
+            day=day,
+            motorcycle_model_id=model_id,
+            payment_type=payment_type,
+            status=status,
+        )
+
+        updated = cls.objects.filter(**key).update(
+            sales_count=F("sales_count") + count,
+            units=F("units") + count,
+            revenue=F("revenue") + revenue,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            if count < 0:
+                cls.objects.filter(**key, sales_count=0).delete()
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    **key, sales_count=count, units=count, revenue=revenue
+                )
+        except IntegrityError:
+            cls.apply_delta(day, model_id, payment_type, status, count, revenue)
+
+    @classmethod
+    def _from_sales(cls):
+        rows = (
+            Sale.objects.order_by()
+            .annotate(day=TruncDate("sale_date"))
+            .values("day", "motorcycle_id", "payment_type", "status")
+            .annotate(sales_count=Count("id"), revenue=Sum("final_price"))
+        )
+        return {
+            (row["day"], row["motorcycle_id"], row["payment_type"], row["status"]): (
+                row["sales_count"],
+                row["revenue"],
+            )
+            for row in rows
+        }
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recompute every row from the sales. Returns the number of rows that
+        were missing, wrong or stale.
+        """
+        with transaction.atomic():
+            expected = cls._from_sales()
+            recorded = {
+                (
+                    fact.day,
+                    fact.motorcycle_model_id,
+                    fact.payment_type,
+                    fact.status,
+                ): fact
+                for fact in cls.objects.select_for_update()
+            }
+
+            missing, drifted, stale = [], [], []
+            for key in set(expected) | set(recorded):
+                fact = recorded.get(key)
+                if key not in expected:
+                    stale.append(fact.pk)
+                    continue
+                count, revenue = expected[key]
+                if fact is None:
+                    missing.append(
+                        cls(
+                            day=key[0],
+                            motorcycle_model_id=key[1],
+                            payment_type=key[2],
+                            status=key[3],
+                            sales_count=count,
+                            units=count,
+                            revenue=revenue,
+                        )
+                    )
+                elif (fact.sales_count, fact.units, fact.revenue) != (
+                    count,
+                    count,
+                    revenue,
                 ):
-                    raise ValidationError(
-                        "Cannot modify engine/chassis number or sale date for a cancelled sale. Remarks may be an exception."
-                    )
+                    fact.sales_count = fact.units = count
+                    fact.revenue = revenue
+                    fact.updated_at = timezone.now()
+                    drifted.append(fact)
+
+            cls.objects.filter(pk__in=stale).delete()
+            cls.objects.bulk_create(missing)
+            cls.objects.bulk_update(
+                drifted, ["sales_count", "units", "revenue", "updated_at"]
+            )
+            cache_utils.invalidate_on_commit(cache_utils.LEDGER, cache_utils.REPORTS)
+        return len(missing) + len(drifted) + len(stale)
 
-            restricted_fields = [
-                "customer",
-                "motorcycle",
-                "payment_type",
-                "final_price",
-            ]
-            for field_name in restricted_fields:
-                if getattr(self, field_name) != getattr(original, field_name):
-                    raise ValidationError(
-                        {
-                            field_name: f"{field_name.replace('_', ' ').title()} cannot be changed after creation. "
-                            f"Please cancel this sale and create a new one if these details need to change."
-                        }
-                    )
+    @classmethod
+    def rollup(cls, *fields, start=None, end=None, status="ACTIVE"):
+        """
+        Count, units and revenue grouped by `fields` for days in
+        [start, end), read from the rollup rather than the sales.
+        """
+        facts = cls.objects.filter(status=status)
+        if start is not None:
+            facts = facts.filter(day__gte=start)
+        if end is not None:
+            facts = facts.filter(day__lt=end)
+        return (
+            facts.order_by()
+            .values(*fields)
+            .annotate(
+                sales_count=Coalesce(Sum("sales_count"), 0),
+                units=Coalesce(Sum("units"), 0),
+                revenue=Coalesce(Sum("revenue"), Value(Decimal("0.00"))),
+            )
+        )
+
+
+class DepositQuerySet(models.QuerySet):
+    def with_balances(self):
+        """
+        Annotate `total_withdrawn` and `annotated_remaining_balance` in SQL so
+        a page of deposits does not run one aggregate per row.
+        """
+        return self.annotate(
+            total_withdrawn=Deposit.total_withdrawn_expression()
+        ).annotate(
+            annotated_remaining_balance=ExpressionWrapper(
+                F("deposit_amount") - F("total_withdrawn"),
+                output_field=DecimalField(),
+            )
+        )
 
 
 class Deposit(models.Model):
@@ -1026,6 +2990,8 @@ class Deposit(models.Model):
         related_name="%(class)s_updated",
     )
 
+    objects = DepositQuerySet.as_manager()
+
     def __str__(self):
         ref = self.deposit_reference if self.deposit_reference else f"DEP-{self.id}"
         return f"{ref} - {self.customer} - ₦{self.deposit_amount} on {self.deposit_date.strftime('%Y-%m-%d')}"
@@ -1035,14 +3001,20 @@ class Deposit(models.Model):
             raise ValidationError("Deposit amount must be greater than zero.")
 
     def clear_withdrawal_cache(self):
-        """Clear the cached total withdrawn amount"""
-        if hasattr(self, "_cached_total_withdrawn"):
-            delattr(self, "_cached_total_withdrawn")
+        """Clear the cached total withdrawn amount, including any queryset annotations"""
+        for attr in (
+            "_cached_total_withdrawn",
+            "total_withdrawn",
+            "annotated_remaining_balance",
+        ):
+            self.__dict__.pop(attr, None)
 
     def get_total_withdrawn(self, force_refresh=False):
         """Get total withdrawn amount with optional cache refresh"""
         if force_refresh:
             self.clear_withdrawal_cache()
+        elif "total_withdrawn" in self.__dict__:
+            return self.total_withdrawn
 
         if not hasattr(self, "_cached_total_withdrawn"):
             total = self.withdrawal_set.filter(withdrawal_status="completed").aggregate(
@@ -1053,7 +3025,9 @@ class Deposit(models.Model):
 
     @property
     def remaining_balance(self):
-        """Get remaining balance (always fresh calculation)"""
+        """Remaining balance, from with_balances() when annotated, else freshly calculated"""
+        if "annotated_remaining_balance" in self.__dict__:
+            return self.annotated_remaining_balance
         return self.deposit_amount - self.get_total_withdrawn(force_refresh=True)
 
     def update_status_based_on_withdrawals(self):
@@ -1086,46 +3060,183 @@ class Deposit(models.Model):
         return False
 
     @classmethod
-    def sync_all_deposit_statuses(cls):
+    def draw_down(cls, customer, amount, sale=None, remarks="", user=None):
         """
-        Utility method to sync all deposit statuses.
-        Useful for data migrations or bulk corrections.
+        Withdraw `amount` from the customer's active deposits, oldest first.
+        Balances are read in one locked, annotated query; the withdrawals are
+        bulk inserted and exhausted deposits completed in a single update.
+        Raises ValidationError if the deposits cannot cover the amount.
         """
-        updated_count = 0
-        for deposit in cls.objects.exclude(deposit_status="cancelled"):
-            if deposit.update_status_based_on_withdrawals():
-                updated_count += 1
-        return updated_count
+        with transaction.atomic():
+            deposits = list(
+                cls.objects.select_for_update()
+                .filter(customer=customer, deposit_status="active")
+                .annotate(total_withdrawn=cls.total_withdrawn_expression())
+                .order_by("deposit_date", "pk")
+            )
 
-    def save(self, *args, **kwargs):
-        if not self.pk and not self.deposit_reference:
-            today_date_str = timezone.now().strftime("%Y%m%d")
-            prefix = f"DEP-{today_date_str}-"
+            available = sum(
+                (
+                    max(d.deposit_amount - d.total_withdrawn, Decimal("0.00"))
+                    for d in deposits
+                ),
+                Decimal("0.00"),
+            )
+            if available < amount:
+                raise ValidationError(
+                    f"Insufficient total deposit balance. Need {amount}, have {available}."
+                )
 
-            with transaction.atomic():
-                last_deposit_with_prefix = (
-                    Deposit.objects.filter(deposit_reference__startswith=prefix)
-                    .order_by("-deposit_reference")
-                    .first()
+            now = timezone.now()
+            withdrawals = []
+            exhausted_ids = []
+            to_cover = amount
+            for deposit in deposits:
+                if to_cover <= Decimal("0.00"):
+                    break
+                balance = deposit.deposit_amount - deposit.total_withdrawn
+                if balance <= Decimal("0.00"):
+                    continue
+
+                taken = min(balance, to_cover)
+                withdrawals.append(
+                    Withdrawal(
+                        deposit=deposit,
+                        withdrawal_amount=taken,
+                        withdrawal_date=now,
+                        remarks=remarks,
+                        withdrawal_status="completed",
+                        sale=sale,
+                        created_by=user,
+                        updated_by=user,
+                    )
+                )
+                if taken == balance:
+                    exhausted_ids.append(deposit.pk)
+                to_cover -= taken
+
+            Withdrawal.objects.bulk_create(withdrawals)
+            ActivityEvent.record_many(withdrawals)
+            CustomerBalance.apply_delta(customer, withdrawals=amount)
+            cache_utils.invalidate_on_commit(cache_utils.LEDGER)
+            if exhausted_ids:
+                cls.objects.filter(pk__in=exhausted_ids).update(
+                    deposit_status="completed",
+                    transaction_note=f"This deposit has been fully withdrawn on {now:%Y-%m-%d %H:%M}",
+                    updated_at=now,
                 )
+                ActivityEvent.record_many(
+                    cls.objects.filter(pk__in=exhausted_ids),
+                    ActivityEvent.STATUS_CHANGED,
+                )
+            return withdrawals
+
+    @staticmethod
+    def total_withdrawn_expression():
+        """Annotation for a deposit's completed withdrawals, as one grouped subquery."""
+        withdrawn = (
+            Withdrawal.objects.filter(
+                deposit=OuterRef("pk"), withdrawal_status="completed"
+            )
+            .order_by()
+            .values("deposit")
+            .annotate(total=Sum("withdrawal_amount"))
+            .values("total")
+        )
+        return Coalesce(
+            Subquery(withdrawn, output_field=DecimalField()),
+            Value(Decimal("0.00")),
+            output_field=DecimalField(),
+        )
 
-                next_sequence = 1
-                if last_deposit_with_prefix:
-                    try:
-                        last_sequence_str = (
-                            last_deposit_with_prefix.deposit_reference.split("-")[-1]
-                        )
-                        last_sequence = int(last_sequence_str)
-                        next_sequence = last_sequence + 1
-                    except (ValueError, IndexError):
-                        next_sequence = 1
+    @classmethod
+    def sync_all_deposit_statuses(cls, dry_run=False):
+        """
+        Bring every non-cancelled deposit's status in line with its withdrawals
+        using set-based queries and at most two UPDATEs. Returns the
+        references moved to "completed" and back to "active"; with
+        dry_run=True nothing is written.
+        """
+        deposits = cls.objects.exclude(deposit_status="cancelled").annotate(
+            total_withdrawn=cls.total_withdrawn_expression()
+        )
+        to_complete = deposits.filter(
+            deposit_status="active", total_withdrawn__gte=F("deposit_amount")
+        )
+        to_reactivate = deposits.filter(
+            deposit_status="completed", total_withdrawn__lt=F("deposit_amount")
+        )
+
+        with transaction.atomic():
+            completed = dict(to_complete.values_list("pk", "deposit_reference"))
+            reactivated = dict(to_reactivate.values_list("pk", "deposit_reference"))
+
+            if not dry_run:
+                now = timezone.now()
+                if completed:
+                    to_complete.update(
+                        deposit_status="completed",
+                        transaction_note=f"This deposit has been fully withdrawn on {now:%Y-%m-%d %H:%M}",
+                        updated_at=now,
+                    )
+                if reactivated:
+                    to_reactivate.update(deposit_status="active", updated_at=now)
+                if completed or reactivated:
+                    ActivityEvent.record_many(
+                        cls.objects.filter(pk__in=[*completed, *reactivated]),
+                        ActivityEvent.STATUS_CHANGED,
+                    )
+                    cache_utils.invalidate_on_commit(cache_utils.LEDGER)
+
+        return {
+            "completed": sorted(completed.values()),
+            "reactivated": sorted(reactivated.values()),
+        }
 
-                self.deposit_reference = f"{prefix}{next_sequence:04d}"
+    def save(self, *args, **kwargs):
+        if not self.pk and not self.deposit_reference:
+            self.deposit_reference = ReferenceSequence.next_reference(
+                "DEP", Deposit, "deposit_reference"
+            )
 
         self.clear_withdrawal_cache()
 
+        previous = None
+        if self.pk:
+            previous = (
+                Deposit.objects.filter(pk=self.pk)
+                .values("customer_id", "deposit_status", "deposit_amount")
+                .first()
+            )
+
         self.full_clean()
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            counted = CustomerBalance.deposit_amount_counted
+            deltas = defaultdict(Decimal)
+            if previous:
+                deltas[previous["customer_id"]] -= counted(
+                    previous["deposit_status"], previous["deposit_amount"]
+                )
+            deltas[self.customer_id] += counted(
+                self.deposit_status, self.deposit_amount
+            )
+            for customer_id, delta in deltas.items():
+                CustomerBalance.apply_delta(customer_id, deposits=delta)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            withdrawn = self.get_total_withdrawn(force_refresh=True)
+            result = super().delete(*args, **kwargs)
+            CustomerBalance.apply_delta(
+                self.customer_id,
+                deposits=-CustomerBalance.deposit_amount_counted(
+                    self.deposit_status, self.deposit_amount
+                ),
+                withdrawals=-withdrawn,
+            )
+            return result
 
     def get_absolute_url(self):
         return reverse("deposit_detail", kwargs={"pk": self.pk})
@@ -1180,14 +3291,30 @@ class Withdrawal(models.Model):
     def save(self, *args, **kwargs):
         """Enhanced save method that triggers deposit status update"""
         old_deposit_id = None
+        old_withdrawal = None
         if self.pk:
             try:
-                old_withdrawal = Withdrawal.objects.get(pk=self.pk)
+                old_withdrawal = Withdrawal.objects.select_related("deposit").get(
+                    pk=self.pk
+                )
                 old_deposit_id = old_withdrawal.deposit_id
             except Withdrawal.DoesNotExist:
                 pass
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            counted = CustomerBalance.withdrawal_amount_counted
+            deltas = defaultdict(Decimal)
+            if old_withdrawal:
+                deltas[old_withdrawal.deposit.customer_id] -= counted(
+                    old_withdrawal.withdrawal_status, old_withdrawal.withdrawal_amount
+                )
+            deltas[self.deposit.customer_id] += counted(
+                self.withdrawal_status, self.withdrawal_amount
+            )
+            for customer_id, delta in deltas.items():
+                CustomerBalance.apply_delta(customer_id, withdrawals=delta)
 
         if self.deposit:
             self.deposit.update_status_based_on_withdrawals()
@@ -1201,7 +3328,14 @@ class Withdrawal(models.Model):
 
     def delete(self, *args, **kwargs):
         deposit = self.deposit
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            super().delete(*args, **kwargs)
+            CustomerBalance.apply_delta(
+                deposit.customer_id,
+                withdrawals=-CustomerBalance.withdrawal_amount_counted(
+                    self.withdrawal_status, self.withdrawal_amount
+                ),
+            )
         if deposit:
             deposit.update_status_based_on_withdrawals()
 
@@ -1210,21 +3344,154 @@ class Withdrawal(models.Model):
 
     @classmethod
     def get_customer_balance(cls, customer):
-        total_deposits = (
-            Deposit.objects.filter(
-                customer=customer, deposit_status__in=["active", "completed"]
-            ).aggregate(total=Sum("deposit_amount"))["total"]
-            or 0
+        return CustomerBalance.for_customer(customer)
+
+
+class CustomerBalance(models.Model):
+    """Running deposit balance per customer, kept in step with every deposit and withdrawal"""
+
+    customer = models.OneToOneField(
+        Customer, on_delete=models.CASCADE, related_name="deposit_balance"
+    )
+    total_deposits = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00")
+    )
+    total_withdrawals = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00")
+    )
+    balance = models.DecimalField(
+        max_digits=14, decimal_places=2, default=Decimal("0.00"), db_index=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.customer}: ₦{self.balance}"
+
+    @staticmethod
+    def deposit_amount_counted(status, amount):
+        """Deposits count towards the balance unless cancelled."""
+        return amount if status in ("active", "completed") else Decimal("0.00")
+
+    @staticmethod
+    def withdrawal_amount_counted(status, amount):
+        return amount if status == "completed" else Decimal("0.00")
+
+    @classmethod
+    def apply_delta(
+        cls, customer, deposits=Decimal("0.00"), withdrawals=Decimal("0.00")
+    ):
+        """
+        Shift a customer's totals in place. A missing record is created from
+        the customer's full history, which already includes this change.
+        """
+        customer_id = getattr(customer, "pk", customer)
+        if not deposits and not withdrawals:
+            return
+
+        updated = cls.objects.filter(customer_id=customer_id).update(
+            total_deposits=F("total_deposits") + deposits,
+            total_withdrawals=F("total_withdrawals") + withdrawals,
+            balance=F("balance") + deposits - withdrawals,
+            updated_at=timezone.now(),
         )
+        if updated:
+            return
 
-        total_withdrawals = (
-            cls.objects.filter(
-                deposit__customer=customer, withdrawal_status="completed"
-            ).aggregate(total=Sum("withdrawal_amount"))["total"]
-            or 0
+        totals = cls._ledger_totals([customer_id]).get(
+            customer_id, (Decimal("0.00"), Decimal("0.00"))
+        )
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    customer_id=customer_id,
+                    total_deposits=totals[0],
+                    total_withdrawals=totals[1],
+                    balance=totals[0] - totals[1],
+                )
+        except IntegrityError:
+            cls.apply_delta(customer_id, deposits, withdrawals)
+
+    @classmethod
+    def for_customer(cls, customer):
+        customer_id = getattr(customer, "pk", customer)
+        balance = (
+            cls.objects.filter(customer_id=customer_id)
+            .values_list("balance", flat=True)
+            .first()
         )
+        if balance is None:
+            total_deposits, total_withdrawals = cls._ledger_totals([customer_id]).get(
+                customer_id, (Decimal("0.00"), Decimal("0.00"))
+            )
+            balance = total_deposits - total_withdrawals
+        return balance
+
+    @staticmethod
+    def _ledger_totals(customer_ids=None):
+        """(deposits, withdrawals) per customer id, one grouped query per table."""
+        deposits = Deposit.objects.filter(deposit_status__in=["active", "completed"])
+        withdrawals = Withdrawal.objects.filter(withdrawal_status="completed")
+        if customer_ids is not None:
+            deposits = deposits.filter(customer_id__in=customer_ids)
+            withdrawals = withdrawals.filter(deposit__customer_id__in=customer_ids)
+
+        totals = defaultdict(lambda: [Decimal("0.00"), Decimal("0.00")])
+        for customer_id, total in (
+            deposits.order_by()
+            .values("customer_id")
+            .annotate(total=Sum("deposit_amount"))
+            .values_list("customer_id", "total")
+        ):
+            totals[customer_id][0] = total
+        for customer_id, total in (
+            withdrawals.order_by()
+            .values("deposit__customer_id")
+            .annotate(total=Sum("withdrawal_amount"))
+            .values_list("deposit__customer_id", "total")
+        ):
+            totals[customer_id][1] = total
+        return {customer_id: tuple(pair) for customer_id, pair in totals.items()}
+
+    @classmethod
+    def reconcile(cls, fix=False):
+        """
+        Compare every stored balance with the deposit and withdrawal tables.
+        Returns the drifted customers; with fix=True their records are rewritten.
+        """
+        totals = cls._ledger_totals()
+        recorded = {record.customer_id: record for record in cls.objects.all()}
+
+        drift = []
+        for customer_id in set(totals) | set(recorded):
+            total_deposits, total_withdrawals = totals.get(
+                customer_id, (Decimal("0.00"), Decimal("0.00"))
+            )
+            record = recorded.get(customer_id)
+            if (
+                record is not None
+                and record.total_deposits == total_deposits
+                and record.total_withdrawals == total_withdrawals
+                and record.balance == total_deposits - total_withdrawals
+            ):
+                continue
+            drift.append(
+                {
+                    "customer_id": customer_id,
+                    "recorded_balance": record.balance if record else None,
+                    "ledger_balance": total_deposits - total_withdrawals,
+                }
+            )
+            if fix:
+                cls.objects.update_or_create(
+                    customer_id=customer_id,
+                    defaults={
+                        "total_deposits": total_deposits,
+                        "total_withdrawals": total_withdrawals,
+                        "balance": total_deposits - total_withdrawals,
+                    },
+                )
 
-        return total_deposits - total_withdrawals
+        return drift
 
 
 class Loan(models.Model):
@@ -1279,25 +3546,9 @@ class Loan(models.Model):
         if not self.pk:
             self.balance = self.loan_amount
             if not self.loan_reference:
-                today_date_str = timezone.now().strftime("%Y%m%d")
-                prefix = f"LOAN-{today_date_str}-"
-                with transaction.atomic():
-                    last_loan_with_prefix = (
-                        Loan.objects.filter(loan_reference__startswith=prefix)
-                        .order_by("-loan_reference")
-                        .first()
-                    )
-                    next_sequence = 1
-                    if last_loan_with_prefix and last_loan_with_prefix.loan_reference:
-                        try:
-                            last_sequence_str = (
-                                last_loan_with_prefix.loan_reference.split("-")[-1]
-                            )
-                            last_sequence = int(last_sequence_str)
-                            next_sequence = last_sequence + 1
-                        except (ValueError, IndexError):
-                            next_sequence = 1
-                    self.loan_reference = f"{prefix}{next_sequence:04d}"
+                self.loan_reference = ReferenceSequence.next_reference(
+                    "LOAN", Loan, "loan_reference"
+                )
         else:
             try:
                 original_loan = Loan.objects.get(pk=self.pk)
@@ -1381,3 +3632,526 @@ class LoanRepayment(models.Model):
 
     def get_absolute_url(self):
         return reverse("loan_repayment_detail", kwargs={"pk": self.pk})
+
+
+class ActivityEvent(models.Model):
+    """Append-only log of business records being created or changing status"""
+
+    SALE = "SALE"
+    SUPPLIER_PAYMENT = "SUPPLIER_PAYMENT"
+    DELIVERY = "DELIVERY"
+    DEPOSIT = "DEPOSIT"
+    WITHDRAWAL = "WITHDRAWAL"
+    LOAN = "LOAN"
+    LOAN_REPAYMENT = "LOAN_REPAYMENT"
+    INVENTORY = "INVENTORY"
+    MOTORCYCLE = "MOTORCYCLE"
+    SUPPLIER = "SUPPLIER"
+    EVENT_TYPES = [
+        (SALE, "Sale"),
+        (SUPPLIER_PAYMENT, "Supplier Payment"),
+        (DELIVERY, "Delivery"),
+        (DEPOSIT, "Deposit"),
+        (WITHDRAWAL, "Withdrawal"),
+        (LOAN, "Loan"),
+        (LOAN_REPAYMENT, "Loan Repayment"),
+        (INVENTORY, "Inventory Update"),
+        (MOTORCYCLE, "Motorcycle Model"),
+        (SUPPLIER, "Supplier"),
+    ]
+
+    CREATED = "CREATED"
+    STATUS_CHANGED = "STATUS_CHANGED"
+    ACTIONS = [
+        (CREATED, "Created"),
+        (STATUS_CHANGED, "Status Changed"),
+    ]
+
+    # Model name -> (event type, field holding its status, if any)
+    TRACKED_MODELS = {
+        "Sale": (SALE, "status"),
+        "SupplierPayment": (SUPPLIER_PAYMENT, "status"),
+        "SupplierDelivery": (DELIVERY, "is_cancelled"),
+        "Deposit": (DEPOSIT, "deposit_status"),
+        "Withdrawal": (WITHDRAWAL, "withdrawal_status"),
+        "Loan": (LOAN, "loan_status"),
+        "LoanRepayment": (LOAN_REPAYMENT, None),
+        "InventoryTransaction": (INVENTORY, None),
+        "Motorcycle": (MOTORCYCLE, "status"),
+        "Supplier": (SUPPLIER, None),
+    }
+
+    # Relations the summaries read, loaded up front for batches and backfills
+    SUMMARY_RELATED = {
+        "Sale": ["customer"],
+        "SupplierPayment": ["supplier"],
+        "SupplierDelivery": ["payment__supplier"],
+        "Deposit": ["customer"],
+        "Withdrawal": ["deposit__customer"],
+        "Loan": ["customer"],
+        "LoanRepayment": ["loan__customer"],
+        "InventoryTransaction": ["motorcycle_model"],
+    }
+
+    occurred_at = models.DateTimeField()
+    event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
+    action = models.CharField(max_length=20, choices=ACTIONS, default=CREATED)
+    reference_model = models.CharField(max_length=50)
+    reference_id = models.CharField(max_length=40)
+    description = models.TextField(help_text="Rendered HTML summary of the event")
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="activity_events",
+    )
+    recorded_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-occurred_at", "-id"]
+        indexes = [
+            models.Index(fields=["occurred_at", "id"]),
+            models.Index(fields=["event_type", "occurred_at", "id"]),
+            models.Index(fields=["reference_model", "reference_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.title} at {self.occurred_at:%Y-%m-%d %H:%M}"
+
+    @property
+    def title(self):
+        label = self.get_event_type_display()
+        if self.action == self.CREATED:
+            return label if self.event_type == self.INVENTORY else f"New {label}"
+        return f"{label} Status Changed"
+
+    @staticmethod
+    def _money(amount):
+        return f"₦{amount:,.2f}"
+
+    @staticmethod
+    def _occurred_at(value):
+        """Business dates become the start of that day so they sort with datetimes."""
+        if isinstance(value, datetime.datetime):
+            return value
+        return timezone.make_aware(datetime.datetime.combine(value, datetime.time.min))
+
+    @classmethod
+    def _describe(cls, instance):
+        """(occurred_at, HTML summary) of a tracked record."""
+        name = type(instance).__name__
+        if name == "Sale":
+            return instance.sale_date, format_html(
+                "Sale <a href='{}'>{}</a> to {} for {}",
+                instance.get_absolute_url(),
+                instance.sale_reference,
+                instance.customer.name,
+                cls._money(instance.final_price),
+            )
+        if name == "SupplierPayment":
+            return instance.payment_date, format_html(
+                "Payment <a href='{}'>{}</a> of {} to {}",
+                reverse("payment_detail", args=[instance.pk]),
+                instance.payment_reference,
+                cls._money(instance.amount_paid),
+                instance.supplier.name,
+            )
+        if name == "SupplierDelivery":
+            return instance.delivery_date, format_html(
+                "Delivery <a href='{}'>{}</a> received from {}",
+                instance.get_absolute_url(),
+                instance.delivery_reference,
+                instance.payment.supplier.name,
+            )
+        if name == "Deposit":
+            return instance.deposit_date, format_html(
+                "Deposit <a href='{}'>{}</a> of {} from {}",
+                instance.get_absolute_url(),
+                instance.deposit_reference,
+                cls._money(instance.deposit_amount),
+                instance.customer.name,
+            )
+        if name == "Withdrawal":
+            return instance.withdrawal_date, format_html(
+                "Withdrawal of {} from {}'s account (<a href='{}'>Details</a>)",
+                cls._money(instance.withdrawal_amount),
+                instance.deposit.customer.name,
+                instance.get_absolute_url(),
+            )
+        if name == "Loan":
+            return instance.loan_date, format_html(
+                "Loan <a href='{}'>{}</a> of {} issued to {}",
+                instance.get_absolute_url(),
+                instance.loan_reference,
+                cls._money(instance.loan_amount),
+                instance.customer.name,
+            )
+        if name == "LoanRepayment":
+            return instance.repayment_date, format_html(
+                "Repayment of {} for loan {} by {} (<a href='{}'>Details</a>)",
+                cls._money(instance.repayment_amount),
+                instance.loan.loan_reference,
+                instance.loan.customer.name,
+                instance.get_absolute_url(),
+            )
+        if name == "InventoryTransaction":
+            return instance.transaction_date, format_html(
+                "{}: {} units of {}. Remarks: {}",
+                instance.get_transaction_type_display(),
+                instance.quantity,
+                instance.motorcycle_model,
+                instance.remarks,
+            )
+        if name == "Motorcycle":
+            return instance.created_at, format_html(
+                "Model <a href='{}'>{}</a>", instance.get_absolute_url(), instance
+            )
+        return instance.created_at, format_html(
+            "Supplier <a href='{}'>{}</a>",
+            reverse("supplier_detail", args=[instance.pk]),
+            instance.name,
+        )
+
+    @classmethod
+    def status_of(cls, instance):
+        """The display value of a tracked record's status, or None if it has none."""
+        _, field = cls.TRACKED_MODELS[type(instance).__name__]
+        if field is None:
+            return None
+        if field == "is_cancelled":
+            return "Cancelled" if instance.is_cancelled else "Active"
+        return getattr(instance, f"get_{field}_display")()
+
+    @classmethod
+    def build(cls, instance, action=CREATED, usernames=None):
+        """An unsaved event for `instance`; `usernames` maps user ids to names."""
+        event_type, _ = cls.TRACKED_MODELS[type(instance).__name__]
+        occurred_at, summary = cls._describe(instance)
+
+        actor_field = "created_by"
+        if action != cls.CREATED and instance.updated_by_id:
+            actor_field = "updated_by"
+        actor_id = getattr(instance, f"{actor_field}_id")
+        if usernames is not None:
+            username = usernames.get(actor_id)
+        elif actor_id is None:
+            username = None
+        elif instance._meta.get_field(actor_field).is_cached(instance):
+            # Views assign request.user, so the actor is usually at hand.
+            username = getattr(instance, actor_field).username
+        else:
+            username = (
+                get_user_model()
+                .objects.filter(pk=actor_id)
+                .values_list("username", flat=True)
+                .first()
+            )
+        username = username or "a system user"
+
+        if action == cls.CREATED:
+            description = format_html(
+                "{} was created by <strong>{}</strong>", summary, username
+            )
+        else:
+            occurred_at = timezone.now()
+            description = format_html(
+                "{} is now <strong>{}</strong>, changed by <strong>{}</strong>",
+                summary,
+                cls.status_of(instance),
+                username,
+            )
+
+        return cls(
+            occurred_at=cls._occurred_at(occurred_at),
+            event_type=event_type,
+            action=action,
+            reference_model=type(instance).__name__,
+            reference_id=str(instance.pk),
+            description=description,
+            actor_id=actor_id,
+        )
+
+    @classmethod
+    def record(cls, instance, action=CREATED):
+        event = cls.build(instance, action)
+        event.save()
+        return event
+
+    @classmethod
+    def record_many(cls, instances, action=CREATED):
+        """
+        Log a batch written with bulk_create or changed with update(), looking
+        up all actors at once.
+        """
+        instances = list(instances)
+        if not instances:
+            return []
+        prefetch_related_objects(
+            instances, *cls.SUMMARY_RELATED.get(type(instances[0]).__name__, [])
+        )
+        actor_ids = {instance.created_by_id for instance in instances}
+        if action != cls.CREATED:
+            actor_ids |= {instance.updated_by_id for instance in instances}
+        actor_ids -= {None}
+        usernames = dict(
+            get_user_model()
+            .objects.filter(pk__in=actor_ids)
+            .values_list("pk", "username")
+        )
+        cache_utils.invalidate_on_commit(cache_utils.ACTIVITY)
+        return cls.objects.bulk_create(
+            [cls.build(instance, action, usernames=usernames) for instance in instances]
+        )
+
+    def save(self, *args, **kwargs):
+        if self.pk:
+            raise ValidationError("Activity events cannot be changed once recorded.")
+        super().save(*args, **kwargs)
+        cache_utils.invalidate_on_commit(cache_utils.ACTIVITY)
+
+    @classmethod
+    def backfill(cls, batch_size=500):
+        """
+        Record a creation event for every tracked record that lacks one.
+        Returns the number of events written.
+
+        This is a command rather than a data migration: the summaries are
+        rendered with the live models' URLs and display methods, which the
+        historical models a migration gets do not have.
+        """
+        written = 0
+        for name in cls.TRACKED_MODELS:
+            model = apps.get_model("mcms_app", name)
+            logged_ids = set(
+                cls.objects.filter(
+                    reference_model=name, action=cls.CREATED
+                ).values_list("reference_id", flat=True)
+            )
+            records = model.objects.select_related(
+                *cls.SUMMARY_RELATED.get(name, [])
+            ).order_by("pk")
+            batch = []
+            for instance in records.iterator(chunk_size=batch_size):
+                if str(instance.pk) in logged_ids:
+                    continue
+                batch.append(instance)
+                if len(batch) == batch_size:
+                    written += len(cls.record_many(batch))
+                    batch = []
+            written += len(cls.record_many(batch))
+        return written
+
+
+class ReportJob(models.Model):
+    """
+    A report queued to run outside the request cycle. The run_report_worker
+    command claims queued jobs and renders them in a process pool; the
+    finished HTML is kept on the row so later requests for the same
+    parameters can reuse it.
+    """
+
+    ACTIVITY_LOG = "activity_log"
+    PERIOD_REPORT = "period_report"
+    CUSTOMER_STATEMENT = "customer_statement"
+    INVENTORY_VALUATION = "inventory_valuation"
+    REPORT_TYPES = [
+        (ACTIVITY_LOG, "Detailed Activity Log"),
+        (PERIOD_REPORT, "Period Report"),
+        (CUSTOMER_STATEMENT, "Customer Statement"),
+        (INVENTORY_VALUATION, "Inventory Valuation"),
+    ]
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    # A running job that has not reported progress for this long is assumed
+    # to have lost its worker and may be claimed again.
+    STALE_AFTER = datetime.timedelta(minutes=30)
+
+    report_type = models.CharField(max_length=30, choices=REPORT_TYPES)
+    params = models.JSONField(default=dict)
+    params_key = models.CharField(max_length=64, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0)
+    progress_message = models.CharField(max_length=200, blank=True)
+    title = models.CharField(max_length=200, blank=True)
+    output = models.TextField(blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="report_jobs",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Set when a record the job may have read is deleted; such a job's
+    # output is never handed out again.
+    invalidated_at = models.DateTimeField(null=True, blank=True)
+    # Issued afresh on every claim; a worker only records progress and
+    # results while the job still carries the token it was given.
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["params_key", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_type_display()} #{self.pk} ({self.status})"
+
+    def get_absolute_url(self):
+        return reverse("report_job_detail", kwargs={"pk": self.pk})
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def error_summary(self):
+        """Last line of the recorded traceback, which names the exception."""
+        lines = self.error.strip().splitlines()
+        return lines[-1] if lines else ""
+
+    @staticmethod
+    def make_key(report_type, params):
+        """Stable digest of a report type and its (JSON-ready) parameters."""
+        payload = json.dumps([report_type, params], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.params_key = self.make_key(self.report_type, self.params)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def claimable(cls):
+        stale = timezone.now() - cls.STALE_AFTER
+        return cls.objects.filter(
+            Q(status=cls.QUEUED) | Q(status=cls.RUNNING, updated_at__lt=stale)
+        )
+
+    @classmethod
+    def claim(cls, limit):
+        """
+        Mark up to `limit` of the oldest claimable jobs as running and return
+        their (id, claim token) pairs. Each job is taken with a conditional
+        update, so two workers polling at once never run the same job, and a
+        stale job claimed again gets a new token that shuts out its old run.
+        """
+        claimed = []
+        candidates = (
+            cls.claimable().order_by("created_at").values_list("pk", flat=True)[:limit]
+        )
+        for pk in candidates:
+            now = timezone.now()
+            token = uuid.uuid4()
+            taken = (
+                cls.claimable()
+                .filter(pk=pk)
+                .update(
+                    status=cls.RUNNING,
+                    progress=0,
+                    progress_message="Starting",
+                    error="",
+                    started_at=now,
+                    invalidated_at=None,
+                    claim_token=token,
+                    updated_at=now,
+                )
+            )
+            if taken:
+                claimed.append((pk, token))
+        return claimed
+
+    @classmethod
+    def invalidate(cls, report_types):
+        """
+        Retire running and finished jobs of these types. A deleted row leaves
+        no updated_at behind for the change checks to find, so deletes from
+        a report's sources retire its jobs outright.
+        """
+        cls.objects.filter(
+            report_type__in=report_types,
+            status__in=[cls.RUNNING, cls.DONE],
+            invalidated_at__isnull=True,
+        ).update(invalidated_at=timezone.now())
+
+    def _update_claimed(self, **fields):
+        """Write fields if this run still holds the job; report whether it did."""
+        return bool(
+            ReportJob.objects.filter(pk=self.pk, claim_token=self.claim_token).update(
+                **fields, updated_at=timezone.now()
+            )
+        )
+
+    def set_progress(self, percent, message=""):
+        """Record progress, writing only when the percentage or message moves."""
+        percent = max(0, min(100, int(percent)))
+        if percent == self.progress and message == self.progress_message:
+            return
+        self.progress = percent
+        self.progress_message = message[:200]
+        self._update_claimed(
+            progress=self.progress, progress_message=self.progress_message
+        )
+
+    def finish(self, title, output):
+        """
+        Store the output and mark the job done. Returns False, writing
+        nothing, if the job was claimed again while this run was going.
+        """
+        self.status = self.DONE
+        self.title = title[:200]
+        self.output = output
+        self.progress = 100
+        self.progress_message = "Finished"
+        self.finished_at = timezone.now()
+        # Named fields, so an invalidation made during the run is kept.
+        return self._update_claimed(
+            status=self.status,
+            title=self.title,
+            output=self.output,
+            progress=self.progress,
+            progress_message=self.progress_message,
+            finished_at=self.finished_at,
+        )
+
+    def fail(self, error):
+        """Record the error and mark the job failed, as finish() does."""
+        self.status = self.FAILED
+        self.error = error
+        self.progress_message = "Failed"
+        self.finished_at = timezone.now()
+        return self._update_claimed(
+            status=self.status,
+            error=self.error,
+            progress_message=self.progress_message,
+            finished_at=self.finished_at,
+        )
+
+
+class CacheVersion(models.Model):
+    """
+    Current version of a cache namespace. Kept in the database so every
+    process sees a bump and concurrent bumps are never lost.
+    """
+
+    namespace = models.CharField(max_length=50, unique=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.namespace} v{self.version}"
@@ -0,0 +1,136 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset, newest first"""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def next_querystring(self, params):
+        return self._querystring(params, "after", self.next_cursor)
+
+    def previous_querystring(self, params):
+        return self._querystring(params, "before", self.previous_cursor)
+
+    @staticmethod
+    def _querystring(params, direction, cursor):
+        params = params.copy()
+        params.pop("after", None)
+        params.pop("before", None)
+        params[direction] = cursor
+        return f"?{params.urlencode()}"
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a pair of ordering fields, e.g. (date, id), walking
+    from newest to oldest. Unlike Paginator it never counts or offsets, so a
+    deep page costs the same as the first one.
+    """
+
+    def __init__(self, queryset, per_page, keys=("transaction_date", "id")):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keys = keys
+
+    @staticmethod
+    def encode_cursor(values):
+        raw = json.dumps([str(value) for value in values])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """
+        Return the cursor's key values, parsed by their model fields, or None
+        if it is missing or malformed.
+        """
+        if not cursor:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(values, list) or len(values) != 2:
+            return None
+        opts = self.queryset.model._meta
+        try:
+            return [
+                opts.get_field(key).to_python(value)
+                for key, value in zip(self.keys, values)
+            ]
+        except ValidationError:
+            return None
+
+    def _cursor_for(self, obj):
+        return self.encode_cursor(getattr(obj, key) for key in self.keys)
+
+    def older_than(self, values):
+        first, second = self.keys
+        return Q(**{f"{first}__lt": values[0]}) | Q(
+            **{first: values[0], f"{second}__lt": values[1]}
+        )
+
+    def newer_than(self, values):
+        first, second = self.keys
+        return Q(**{f"{first}__gt": values[0]}) | Q(
+            **{first: values[0], f"{second}__gt": values[1]}
+        )
+
+    def get_page(self, after=None, before=None):
+        """
+        `after` continues towards older rows, `before` goes back towards newer
+        ones. Invalid cursors fall back to the first page.
+        """
+        first, second = self.keys
+        after_values = self.decode_cursor(after)
+        before_values = None if after_values else self.decode_cursor(before)
+
+        if before_values:
+            rows = list(
+                self.queryset.filter(self.newer_than(before_values)).order_by(
+                    first, second
+                )[: self.per_page + 1]
+            )
+            has_newer = len(rows) > self.per_page
+            rows = rows[: self.per_page][::-1]
+            has_older = True
+        else:
+            queryset = self.queryset
+            if after_values:
+                queryset = queryset.filter(self.older_than(after_values))
+            rows = list(
+                queryset.order_by(f"-{first}", f"-{second}")[: self.per_page + 1]
+            )
+            has_older = len(rows) > self.per_page
+            rows = rows[: self.per_page]
+            has_newer = after_values is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=self._cursor_for(rows[-1]) if rows and has_older else None,
+            previous_cursor=self._cursor_for(rows[0]) if rows and has_newer else None,
+        )
@@ -0,0 +1,135 @@
+"""
+Reorder planning: per-model sales velocity against stock on hand and on
+order, turned into suggested purchase quantities for a target days-of-cover.
+The whole catalog is computed in one vectorised pass and cached until stock
+or open orders change.
+"""
+
+import datetime
+import math
+
+import numpy as np
+import pandas as pd
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import cache_utils
+from .models import Inventory, Motorcycle, OpenOrderLine, Sale
+
+DEFAULT_WINDOWS = (7, 30, 90)
+DEFAULT_TARGET_DAYS = 30
+
+
+def _sales_frame(as_of, longest_window):
+    since = as_of - datetime.timedelta(days=longest_window)
+    rows = (
+        Sale.objects.exclude(status="CANCELLED")
+        .filter(sale_date__gt=since, sale_date__lte=as_of)
+        .values_list("motorcycle_id", "sale_date")
+    )
+    return pd.DataFrame(list(rows), columns=["model_id", "sale_date"])
+
+
+def compute_reorder_plan(
+    windows=DEFAULT_WINDOWS, target_days=DEFAULT_TARGET_DAYS, as_of=None
+):
+    """
+    One row per active model, most urgent first. Velocity is the mean of the
+    daily sales rates over each window, so a recent spike raises it without a
+    single slow week dominating.
+    """
+    as_of = as_of or timezone.now()
+    windows = sorted(set(windows))
+
+    catalog = pd.DataFrame(
+        list(
+            Motorcycle.objects.filter(status=Motorcycle.ACTIVE).values_list(
+                "id", "brand", "name"
+            )
+        ),
+        columns=["model_id", "brand", "name"],
+    ).set_index("model_id")
+    if catalog.empty:
+        return []
+
+    on_hand = pd.Series(
+        dict(Inventory.objects.values_list("motorcycle_model_id", "current_quantity")),
+        dtype="float64",
+    )
+    on_order = pd.Series(
+        dict(
+            OpenOrderLine.objects.filter(quantity__gt=0)
+            .values("motorcycle_model_id")
+            .annotate(units=Sum("quantity"))
+            .values_list("motorcycle_model_id", "units")
+        ),
+        dtype="float64",
+    )
+    plan = catalog.assign(
+        on_hand=on_hand.reindex(catalog.index).fillna(0).clip(lower=0),
+        on_order=on_order.reindex(catalog.index).fillna(0),
+    )
+
+    sales = _sales_frame(as_of, windows[-1])
+    if sales.empty:
+        age_days = np.array([])
+    else:
+        age_days = (as_of - sales["sale_date"]).dt.total_seconds().to_numpy() / 86400
+
+    rate_columns = []
+    for window in windows:
+        column = f"rate_{window}d"
+        counts = (
+            sales.loc[age_days < window, "model_id"].value_counts()
+            if len(age_days)
+            else pd.Series(dtype="float64")
+        )
+        plan[column] = counts.reindex(plan.index).fillna(0) / window
+        rate_columns.append(column)
+
+    plan["velocity"] = plan[rate_columns].mean(axis=1)
+    available = plan["on_hand"] + plan["on_order"]
+    plan["days_of_cover"] = np.where(
+        plan["velocity"] > 0, available / plan["velocity"].replace(0, np.nan), np.inf
+    )
+    plan["target_stock"] = np.ceil(plan["velocity"] * target_days)
+    plan["suggested_quantity"] = (plan["target_stock"] - available).clip(lower=0)
+
+    plan = plan.sort_values(
+        ["suggested_quantity", "days_of_cover"], ascending=[False, True]
+    )
+    return [
+        {
+            "motorcycle_model_id": int(model_id),
+            "motorcycle_model": f"{row['brand']} {row['name']}",
+            "on_hand": int(row.on_hand),
+            "on_order": int(row.on_order),
+            "rates": [
+                (window, round(float(row[f"rate_{window}d"]), 3)) for window in windows
+            ],
+            "velocity": round(float(row.velocity), 3),
+            "days_of_cover": (
+                None
+                if math.isinf(row.days_of_cover)
+                else round(float(row.days_of_cover), 1)
+            ),
+            "suggested_quantity": int(row.suggested_quantity),
+        }
+        for model_id, row in plan.iterrows()
+    ]
+
+
+def reorder_plan(windows=DEFAULT_WINDOWS, target_days=DEFAULT_TARGET_DAYS):
+    """The cached plan for today; recomputed after any stock or open order change."""
+    windows = tuple(sorted(set(windows)))
+    return cache_utils.get_or_compute(
+        [cache_utils.INVENTORY, cache_utils.OPEN_ORDERS],
+        [
+            "reorder-plan",
+            timezone.localdate().isoformat(),
+            ",".join(map(str, windows)),
+            target_days,
+        ],
+        lambda: compute_reorder_plan(windows, target_days),
+        timeout=60 * 60 * 24,
+    )
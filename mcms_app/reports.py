@@ -0,0 +1,262 @@
+"""
+Period reports: sales, deposits, withdrawals, loans, repayments and supplier
+payments over any date range, bucketed by day, week, month or year, with an
+optional comparison against the same range a year earlier. Each source is
+read with one grouped query of daily totals and pivoted into buckets with
+pandas. Reports on ranges that have already closed are cached until a
+back-dated change touches them.
+"""
+
+import datetime
+from decimal import Decimal
+
+import pandas as pd
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import cache_utils
+from .activity import day_bounds
+from .models import (
+    DailySalesFact,
+    Deposit,
+    Loan,
+    LoanRepayment,
+    Sale,
+    SupplierPayment,
+    Withdrawal,
+)
+
+GRANULARITY_CHOICES = [
+    ("daily", "Daily"),
+    ("weekly", "Weekly"),
+    ("monthly", "Monthly"),
+    ("yearly", "Yearly"),
+]
+# pandas period frequencies; weeks run Monday to Sunday
+FREQUENCIES = {"daily": "D", "weekly": "W-SUN", "monthly": "M", "yearly": "Y"}
+LABEL_FORMATS = {
+    "daily": "%b %d, %Y",
+    "weekly": "Week of %b %d, %Y",
+    "monthly": "%B %Y",
+    "yearly": "%Y",
+}
+MAX_BUCKETS = 750
+ZERO = Decimal("0.00")
+CENTS = Decimal("0.01")
+
+# Key, label, model, date field, amount field and the rows left out
+REPORT_SOURCES = [
+    ("sales", "Sales", Sale, "sale_date", "final_price", {"status": "CANCELLED"}),
+    (
+        "deposits",
+        "Deposits",
+        Deposit,
+        "deposit_date",
+        "deposit_amount",
+        {"deposit_status": "cancelled"},
+    ),
+    (
+        "withdrawals",
+        "Withdrawals",
+        Withdrawal,
+        "withdrawal_date",
+        "withdrawal_amount",
+        {"withdrawal_status": "cancelled"},
+    ),
+    (
+        "loans",
+        "Loans Issued",
+        Loan,
+        "loan_date",
+        "loan_amount",
+        {"loan_status": "cancelled"},
+    ),
+    (
+        "repayments",
+        "Loan Repayments",
+        LoanRepayment,
+        "repayment_date",
+        "repayment_amount",
+        {},
+    ),
+    (
+        "supplier_payments",
+        "Supplier Payments",
+        SupplierPayment,
+        "payment_date",
+        "amount_paid",
+        {"status": SupplierPayment.CANCELLED},
+    ),
+]
+
+
+def bucket_count(start_date, end_date, granularity):
+    return len(pd.period_range(start_date, end_date, freq=FREQUENCIES[granularity]))
+
+
+def _daily_totals(model, date_field, amount_field, excluded, start_date, end_date):
+    if model is Sale:
+        # Sales are already rolled up per day.
+        return list(
+            DailySalesFact.objects.filter(
+                status="ACTIVE", day__gte=start_date, day__lte=end_date
+            )
+            .order_by()
+            .values_list("day")
+            .annotate(Sum("sales_count"), Sum("revenue"))
+        )
+
+    start, end = day_bounds(start_date, end_date)
+    return list(
+        model.objects.filter(**{f"{date_field}__gte": start, f"{date_field}__lt": end})
+        .exclude(**excluded)
+        .order_by()
+        .annotate(day=TruncDate(date_field))
+        .values_list("day")
+        .annotate(Count("pk"), Sum(amount_field))
+    )
+
+
+def _load(start_date, end_date):
+    """Daily count and amount of every source, as one long frame."""
+    frames = [
+        pd.DataFrame(
+            _daily_totals(
+                model, date_field, amount_field, excluded, start_date, end_date
+            ),
+            columns=["day", "count", "amount"],
+        ).assign(source=key)
+        for key, _, model, date_field, amount_field, excluded in REPORT_SOURCES
+    ]
+    daily = pd.concat(frames, ignore_index=True)
+    daily["day"] = pd.to_datetime(daily["day"])
+    daily["count"] = daily["count"].astype("int64")
+    # Amounts stay Decimal (object dtype) so sums match the ledger to the cent.
+    daily["amount"] = daily["amount"].map(Decimal).astype(object)
+    return daily
+
+
+def _pivot(daily, periods, freq):
+    """Sum each source's daily figures into the report's buckets."""
+    keys = [key for key, *_ in REPORT_SOURCES]
+    if daily.empty:
+        return (
+            pd.DataFrame(0, index=periods, columns=keys),
+            pd.DataFrame(ZERO, index=periods, columns=keys),
+        )
+    buckets = daily.assign(period=daily["day"].dt.to_period(freq))
+    # Grouped sums add the Decimal amounts exactly, where pivot_table would
+    # coerce them to floats.
+    totals = buckets.groupby(["period", "source"])[["count", "amount"]].sum()
+    counts = (
+        totals["count"]
+        .unstack("source", fill_value=0)
+        .reindex(index=periods, columns=keys, fill_value=0)
+    )
+    amounts = (
+        totals["amount"]
+        .unstack("source", fill_value=ZERO)
+        .reindex(index=periods, columns=keys, fill_value=ZERO)
+    )
+    return counts, amounts
+
+
+def _money(value):
+    return Decimal(value).quantize(CENTS)
+
+
+def _cell(count, amount, previous=None):
+    cell = {"count": int(count), "amount": _money(amount)}
+    if previous is not None:
+        cell["previous_amount"] = _money(previous)
+        cell["change"] = (
+            round(float((amount - previous) / previous * 100), 1) if previous else None
+        )
+    return cell
+
+
+def compute_period_report(start_date, end_date, granularity, compare=False):
+    """
+    One row per bucket between start_date and end_date inclusive, each with
+    a cell per source, plus a totals row. With `compare`, each cell also
+    carries the amount for the same days a year earlier and the change.
+    """
+    freq = FREQUENCIES[granularity]
+    periods = pd.period_range(start_date, end_date, freq=freq)
+    year = pd.DateOffset(years=1)
+
+    load_from = (pd.Timestamp(start_date) - year).date() if compare else start_date
+    daily = _load(load_from, end_date)
+
+    current = daily[daily["day"] >= pd.Timestamp(start_date)]
+    counts, amounts = _pivot(current, periods, freq)
+    previous_amounts = None
+    if compare:
+        # Shift last year's days forward so they land in this year's buckets.
+        previous = daily[daily["day"] <= pd.Timestamp(end_date) - year]
+        previous = previous.assign(day=previous["day"] + year)
+        _, previous_amounts = _pivot(previous, periods, freq)
+
+    label_format = LABEL_FORMATS[granularity]
+    rows = []
+    for period in periods:
+        bucket_start = max(period.start_time.date(), start_date)
+        bucket_end = min(period.end_time.date(), end_date)
+        rows.append(
+            {
+                "label": period.start_time.strftime(label_format),
+                "start": bucket_start,
+                "end": bucket_end,
+                "cells": [
+                    _cell(
+                        counts.at[period, key],
+                        amounts.at[period, key],
+                        (
+                            None
+                            if previous_amounts is None
+                            else previous_amounts.at[period, key]
+                        ),
+                    )
+                    for key, *_ in REPORT_SOURCES
+                ],
+            }
+        )
+
+    totals = [
+        _cell(
+            counts[key].sum(),
+            amounts[key].sum(),
+            None if previous_amounts is None else previous_amounts[key].sum(),
+        )
+        for key, *_ in REPORT_SOURCES
+    ]
+    return {
+        "sources": [(key, label) for key, label, *_ in REPORT_SOURCES],
+        "rows": rows,
+        "totals": totals,
+    }
+
+
+def period_report(start_date, end_date, granularity, compare=False):
+    """
+    The cached report. A range that ended before today only changes through
+    back-dated edits, so it is kept until one happens; an open range is also
+    recomputed after any ledger change and at least daily.
+    """
+    parts = ["period-report", start_date, end_date, granularity, compare]
+    if end_date < timezone.localdate():
+        namespaces, timeout = [cache_utils.REPORTS], None
+    else:
+        namespaces = [cache_utils.REPORTS, cache_utils.LEDGER]
+        parts.append(timezone.localdate())
+        timeout = 60 * 60 * 24
+    return cache_utils.get_or_compute(
+        namespaces,
+        [
+            part.isoformat() if isinstance(part, datetime.date) else part
+            for part in parts
+        ],
+        lambda: compute_period_report(start_date, end_date, granularity, compare),
+        timeout=timeout,
+    )
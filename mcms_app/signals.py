@@ -1,15 +1,24 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
 from django.dispatch import receiver
 from .models import *
+from . import cache_utils
+from .jobs import REPORT_SOURCE_MODELS
+from .reports import REPORT_SOURCES
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+import datetime
+
+REPORT_DATE_FIELDS = {
+    model: date_field for _, _, model, date_field, *_ in REPORT_SOURCES
+}
 
 
 # Signal for InventoryTransaction: Update Inventory when a transaction is created
 @receiver(post_save, sender=InventoryTransaction)
 def update_inventory_on_transaction(sender, instance, created, **kwargs):
     if created:
-        Inventory.update_inventory(instance.motorcycle_model)
+        Inventory.apply_delta(instance.motorcycle_model_id, instance.quantity)
 
 
 # Signal for SupplierDeliveryItem: Create InventoryTransaction when a new item is saved
@@ -17,17 +26,165 @@ def update_inventory_on_transaction(sender, instance, created, **kwargs):
 def create_inventory_transaction_on_delivery_item_save(
     sender, instance, created, **kwargs
 ):
-    if created:
-        try:
-            InventoryTransaction.objects.create(
-                transaction_type="SUPPLIER_DELIVERY",
-                motorcycle_model=instance.motorcycle_model,
-                quantity=instance.delivered_quantity,
-                reference_model="SupplierDeliveryItem",
-                reference_id=instance.pk,
-                remarks=f"Delivery from {instance.delivery.payment.supplier.name} - {instance.delivery.delivery_reference}",
-            )
-        except Exception as e:
-            print(
-                f"ERROR: Failed to create InventoryTransaction for SupplierDeliveryItem {instance.pk}: {e}"
+    # A receipt that cannot be posted must fail the delivery with it.
+    if created and not getattr(instance, "defer_inventory_posting", False):
+        InventoryTransaction.objects.create(
+            transaction_type="SUPPLIER_DELIVERY",
+            motorcycle_model=instance.motorcycle_model,
+            quantity=instance.delivered_quantity,
+            reference_model="SupplierDeliveryItem",
+            reference_id=instance.pk,
+            remarks=f"Delivery from {instance.delivery.payment.supplier.name} - {instance.delivery.delivery_reference}",
+        )
+        CostLayer.receive(instance.delivery, [instance])
+
+
+# Deleting a payment, directly or through its supplier, takes its items off
+# the open order book before they are cascaded away
+@receiver(pre_delete, sender=SupplierPayment)
+def close_open_orders_on_payment_delete(sender, instance, **kwargs):
+    OpenOrderLine.payments_changed(
+        {
+            instance.pk: (
+                (instance.supplier_id, instance.status == SupplierPayment.ACTIVE),
+                (instance.supplier_id, False),
             )
+        }
+    )
+
+
+# Supplier scorecards refresh from an updated_at watermark, which cannot see
+# deletes, so deleting any of their source rows marks the supplier instead.
+# Lookup from Supplier to the deleted row, and the row's value for it.
+SCORECARD_SUPPLIER_LOOKUPS = {
+    SupplierPayment: ("pk", "supplier_id"),
+    SupplierPaymentItem: ("payments", "payment_id"),
+    SupplierDelivery: ("payments", "payment_id"),
+    SupplierDeliveryItem: ("payments__deliveries", "delivery_id"),
+}
+
+
+def mark_scorecard_stale(sender, instance, **kwargs):
+    lookup, attname = SCORECARD_SUPPLIER_LOOKUPS[sender]
+    SupplierScorecard.mark_stale(**{lookup: getattr(instance, attname)})
+
+
+for model in SCORECARD_SUPPLIER_LOOKUPS:
+    pre_delete.connect(
+        mark_scorecard_stale,
+        sender=model,
+        dispatch_uid=f"scorecards_{model.__name__}",
+    )
+
+
+# Ledger changes retire cached dashboard figures once the transaction commits
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+@receiver(post_save, sender=Deposit)
+@receiver(post_delete, sender=Deposit)
+@receiver(post_save, sender=Withdrawal)
+@receiver(post_delete, sender=Withdrawal)
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+@receiver(post_save, sender=LoanRepayment)
+@receiver(post_delete, sender=LoanRepayment)
+@receiver(post_save, sender=SupplierPayment)
+@receiver(post_delete, sender=SupplierPayment)
+@receiver(post_save, sender=SupplierDelivery)
+@receiver(post_delete, sender=SupplierDelivery)
+@receiver(post_save, sender=InventoryTransaction)
+@receiver(post_delete, sender=InventoryTransaction)
+def invalidate_ledger_cache(sender, instance, **kwargs):
+    cache_utils.invalidate_on_commit(cache_utils.LEDGER)
+
+
+# Closed-period reports only go stale when a change lands before today
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+@receiver(post_save, sender=Deposit)
+@receiver(post_delete, sender=Deposit)
+@receiver(post_save, sender=Withdrawal)
+@receiver(post_delete, sender=Withdrawal)
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+@receiver(post_save, sender=LoanRepayment)
+@receiver(post_delete, sender=LoanRepayment)
+@receiver(post_save, sender=SupplierPayment)
+@receiver(post_delete, sender=SupplierPayment)
+def invalidate_closed_reports(sender, instance, created=False, **kwargs):
+    date_field = REPORT_DATE_FIELDS[sender]
+    start_of_today = timezone.make_aware(
+        datetime.datetime.combine(timezone.localdate(), datetime.time.min)
+    )
+    if created and getattr(instance, date_field) >= start_of_today:
+        return
+    cache_utils.invalidate_on_commit(cache_utils.REPORTS)
+
+
+# Background reports: deleting a row any report type reads retires that
+# type's finished jobs once the delete commits
+REPORT_TYPES_BY_SOURCE = {}
+for report_type, sources in REPORT_SOURCE_MODELS.items():
+    for model in sources:
+        REPORT_TYPES_BY_SOURCE.setdefault(model, []).append(report_type)
+
+
+def invalidate_report_jobs(sender, instance, **kwargs):
+    report_types = REPORT_TYPES_BY_SOURCE[sender]
+    transaction.on_commit(lambda: ReportJob.invalidate(report_types))
+
+
+for model in REPORT_TYPES_BY_SOURCE:
+    post_delete.connect(
+        invalidate_report_jobs,
+        sender=model,
+        dispatch_uid=f"report_jobs_{model.__name__}",
+    )
+
+
+# Activity log: record creations and status changes of the tracked models.
+# The status a record was loaded (or last saved) with is kept on the instance,
+# so a save compares against it instead of reading the row back first.
+def remember_activity_status(sender, instance, **kwargs):
+    _, field = ActivityEvent.TRACKED_MODELS[sender.__name__]
+    if field:
+        # Deferred fields are absent from __dict__; those loads are not tracked.
+        instance._activity_status = instance.__dict__.get(field)
+
+
+def record_activity_event(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    _, field = ActivityEvent.TRACKED_MODELS[sender.__name__]
+    if created:
+        ActivityEvent.record(instance)
+    elif field:
+        previous = getattr(instance, "_activity_status", None)
+        if previous is not None and previous != getattr(instance, field):
+            ActivityEvent.record(instance, ActivityEvent.STATUS_CHANGED)
+    if field:
+        instance._activity_status = getattr(instance, field)
+
+
+for model in (
+    Sale,
+    SupplierPayment,
+    SupplierDelivery,
+    Deposit,
+    Withdrawal,
+    Loan,
+    LoanRepayment,
+    InventoryTransaction,
+    Motorcycle,
+    Supplier,
+):
+    post_init.connect(
+        remember_activity_status,
+        sender=model,
+        dispatch_uid=f"activity_status_{model.__name__}",
+    )
+    post_save.connect(
+        record_activity_event,
+        sender=model,
+        dispatch_uid=f"activity_event_{model.__name__}",
+    )
@@ -1,3 +1,1460 @@
-from django.test import TestCase
+import csv
+import datetime
+import zipfile
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import activity, cache_utils, jobs, kpis, reorder, reports
+from .forms import SupplierDeliveryItemFormSetHelper
+from .models import (
+    ActivityEvent,
+    CostLayer,
+    CostLayerConsumption,
+    Customer,
+    CustomerBalance,
+    DailySalesFact,
+    Deposit,
+    Inventory,
+    InventoryCost,
+    InventorySnapshot,
+    InventoryTransaction,
+    CacheVersion,
+    Motorcycle,
+    OpenOrderLine,
+    PurchasePrice,
+    ReferenceSequence,
+    ReportJob,
+    Sale,
+    Supplier,
+    SupplierDelivery,
+    SupplierDeliveryItem,
+    SupplierPayment,
+    SupplierPaymentItem,
+    SupplierScorecard,
+    Withdrawal,
+)
+from .pagination import KeysetPaginator
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+)
+class LedgerTestCase(TestCase):
+    """
+    Drives the app through its views, then checks that each figure kept up
+    to date incrementally matches a full recompute from the source records.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        cls.supplier = Supplier.objects.create(name="Acme Motors")
+        cls.customer = Customer.objects.create(
+            firstname="Ada", lastname="Obi", phone="08000000000", address="Lagos"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # Earlier tests roll back without running their commit hooks, which
+        # would leave their cache invalidations pending into this one.
+        cache_utils._pending.namespaces = set()
+
+    def today(self):
+        return timezone.localdate().isoformat()
+
+    def create_payment(self, items):
+        data = {
+            "supplier": self.supplier.pk,
+            "payment_date": self.today(),
+            "payment_method": "CASH",
+            "amount_paid": sum(quantity * price for _, quantity, price in items),
+            "remarks": "",
+            "items-TOTAL_FORMS": len(items),
+            "items-INITIAL_FORMS": 0,
+            "items-MIN_NUM_FORMS": 0,
+            "items-MAX_NUM_FORMS": 1000,
+        }
+        for i, (model, quantity, price) in enumerate(items):
+            data.update(
+                {
+                    f"items-{i}-motorcycle_model": model.pk,
+                    f"items-{i}-expected_quantity": quantity,
+                    f"items-{i}-unit_price": price,
+                    f"items-{i}-remarks": "",
+                }
+            )
+        response = self.client.post("/payments/create/", data)
+        self.assertEqual(response.status_code, 302)
+        return SupplierPayment.objects.latest("pk")
+
+    def create_delivery(self, payment, items):
+        data = {
+            "payment": payment.pk,
+            "delivery_date": self.today(),
+            "remarks": "",
+            "delivery_items-TOTAL_FORMS": len(items),
+            "delivery_items-INITIAL_FORMS": 0,
+            "delivery_items-MIN_NUM_FORMS": 1,
+            "delivery_items-MAX_NUM_FORMS": 1000,
+        }
+        for i, (model, quantity) in enumerate(items):
+            data.update(
+                {
+                    f"delivery_items-{i}-motorcycle_model": model.pk,
+                    f"delivery_items-{i}-delivered_quantity": quantity,
+                    f"delivery_items-{i}-delivery_remarks": "",
+                }
+            )
+        response = self.client.post("/deliveries/create/", data)
+        self.assertEqual(response.status_code, 302)
+        return SupplierDelivery.objects.latest("pk")
+
+    def create_sale(self, model, engine_no, payment_type="CASH", price="100000"):
+        response = self.client.post(
+            "/sales/create/",
+            {
+                "customer": self.customer.pk,
+                "motorcycle": model.pk,
+                "sale_date": self.today(),
+                "payment_type": payment_type,
+                "final_price": price,
+                "engine_no": engine_no,
+                "chassis_no": f"CH-{engine_no}",
+                "remarks": "",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        return Sale.objects.get(engine_no=engine_no)
+
+    def cancel_delivery(self, delivery):
+        response = self.client.post(f"/deliveries/{delivery.pk}/cancel/")
+        self.assertEqual(response.status_code, 302)
+
+    def cancel_sale(self, sale):
+        response = self.client.post(f"/sales/{sale.pk}/cancel/")
+        self.assertEqual(response.status_code, 302)
+
+    def create_deposit(self, amount):
+        return Deposit.objects.create(
+            customer=self.customer,
+            deposit_amount=Decimal(amount),
+            deposit_date=timezone.now(),
+        )
+
+
+class InventoryTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+
+    def post(self, quantity, transaction_type="SUPPLIER_DELIVERY"):
+        return InventoryTransaction.objects.create(
+            transaction_type=transaction_type,
+            motorcycle_model=self.model,
+            quantity=quantity,
+            reference_model="Sale",
+            reference_id=1,
+        )
+
+    def test_movements_apply_deltas_without_summing_the_ledger(self):
+        self.post(5)
+        for _ in range(3):
+            self.post(-1, "SALE")
+
+        with CaptureQueriesContext(connection) as context:
+            self.post(2)
+
+        self.assertFalse(
+            any("SUM(" in query["sql"] for query in context.captured_queries)
+        )
+        inventory = Inventory.objects.get(motorcycle_model=self.model)
+        self.assertEqual(inventory.current_quantity, 4)
+        self.assertEqual(Inventory.reconcile(), [])
+
+    def test_sales_and_cancellations_match_ledger(self):
+        payment = self.create_payment([(self.model, 4, Decimal("100000"))])
+        self.create_delivery(payment, [(self.model, 4)])
+        sold = self.create_sale(self.model, "E1")
+        self.create_sale(self.model, "E2")
+        self.cancel_sale(sold)
+
+        inventory = Inventory.objects.get(motorcycle_model=self.model)
+        self.assertEqual(inventory.current_quantity, 3)
+        self.assertEqual(Inventory.reconcile(), [])
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.post(5)
+        Inventory.objects.filter(motorcycle_model=self.model).update(current_quantity=7)
+
+        self.assertEqual(
+            Inventory.reconcile(fix=True),
+            [
+                {
+                    "motorcycle_model_id": self.model.pk,
+                    "recorded_quantity": 7,
+                    "ledger_quantity": 5,
+                }
+            ],
+        )
+        self.assertEqual(Inventory.reconcile(), [])
+
+    def ledger_inserts(self, context):
+        table = InventoryTransaction._meta.db_table
+        return [
+            query
+            for query in context.captured_queries
+            if query["sql"].startswith(f'INSERT INTO "{table}"')
+        ]
+
+    def test_deliveries_and_reversals_post_one_ledger_batch(self):
+        models = [self.model] + [
+            Motorcycle.objects.create(name=f"Model {i}", brand="Bajaj")
+            for i in range(4)
+        ]
+        payment = self.create_payment([(model, 2, 100000) for model in models])
+
+        with CaptureQueriesContext(connection) as context:
+            delivery = self.create_delivery(payment, [(model, 2) for model in models])
+        self.assertEqual(len(self.ledger_inserts(context)), 1)
+
+        with CaptureQueriesContext(connection) as context:
+            self.cancel_delivery(delivery)
+        self.assertEqual(len(self.ledger_inserts(context)), 1)
+
+        self.assertEqual(
+            InventoryTransaction.objects.filter(
+                transaction_type="DELIVERY_REVERSAL"
+            ).count(),
+            len(models),
+        )
+        self.assertEqual(
+            set(Inventory.objects.values_list("current_quantity", flat=True)), {0}
+        )
+        self.assertEqual(Inventory.reconcile(), [])
+
+    def test_batch_posting_rejects_saved_rows(self):
+        movement = self.post(5)
+
+        with self.assertRaises(ValidationError):
+            InventoryTransaction.post_batch([movement])
+        self.assertEqual(InventoryTransaction.objects.count(), 1)
+
+
+class InventorySnapshotTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        self.start = timezone.now() - datetime.timedelta(days=3)
+
+    def post(self, quantity, days):
+        movement = InventoryTransaction.objects.create(
+            transaction_type="SUPPLIER_DELIVERY" if quantity > 0 else "SALE",
+            motorcycle_model=self.model,
+            quantity=quantity,
+            reference_model="Sale",
+            reference_id=1,
+        )
+        InventoryTransaction.objects.filter(pk=movement.pk).update(
+            transaction_date=self.start + datetime.timedelta(days=days)
+        )
+
+    def test_stock_as_of_replays_only_movements_after_the_checkpoint(self):
+        self.post(5, days=0)
+        self.post(-2, days=1)
+        checkpoint = self.start + datetime.timedelta(days=1, hours=12)
+        InventorySnapshot.take(checkpoint)
+        self.post(3, days=2)
+
+        # The checkpoint, not the ledger before it, is the source of truth.
+        InventorySnapshot.objects.filter(as_of=checkpoint).update(quantity=10)
+        self.assertEqual(InventorySnapshot.stock_as_of(self.start), {self.model.pk: 5})
+        self.assertEqual(InventorySnapshot.stock_as_of(checkpoint), {self.model.pk: 10})
+        self.assertEqual(
+            InventorySnapshot.stock_as_of(
+                timezone.now(), motorcycle_model=self.model.pk
+            ),
+            {self.model.pk: 13},
+        )
+
+    def test_commands_take_and_read_checkpoints(self):
+        self.post(4, days=0)
+        day = timezone.localtime(self.start).date()
+
+        call_command("snapshot_inventory", day=day.isoformat(), stdout=StringIO())
+        self.assertEqual(
+            list(InventorySnapshot.objects.values_list("motorcycle_model", "quantity")),
+            [(self.model.pk, 4)],
+        )
+        out = StringIO()
+        call_command("stock_as_of", day.isoformat(), stdout=out)
+        self.assertIn(f"{self.model}: 4", out.getvalue())
+
+        tomorrow = timezone.localdate() + datetime.timedelta(days=1)
+        with self.assertRaises(CommandError):
+            call_command("snapshot_inventory", day=tomorrow.isoformat())
+
+
+class InventoryLedgerTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        self.quantities = [3 if i % 3 else -1 for i in range(45)]
+        for quantity in self.quantities:
+            InventoryTransaction.objects.create(
+                transaction_type="SUPPLIER_DELIVERY" if quantity > 0 else "SALE",
+                motorcycle_model=self.model,
+                quantity=quantity,
+                reference_model="Sale",
+                reference_id=1,
+            )
+        self.url = f"/inventory/{self.model.inventory.pk}/"
+
+    def balances(self, query=""):
+        response = self.client.get(f"{self.url}{query}")
+        self.assertEqual(response.status_code, 200)
+        return response.context, [
+            row.running_balance for row in response.context["transactions"]
+        ]
+
+    def test_pages_walk_the_ledger_with_running_balances(self):
+        running = [sum(self.quantities[: i + 1]) for i in range(45)][::-1]
+
+        first, newest = self.balances()
+        second, middle = self.balances(first["older_url"])
+        third, oldest = self.balances(second["older_url"])
+        self.assertEqual(newest + middle + oldest, running)
+        self.assertNotIn("older_url", third)
+
+        # Walking back towards newer rows restores the balance carried in.
+        _, back = self.balances(third["newer_url"])
+        self.assertEqual(back, middle)
+
+    def test_malformed_cursor_shows_the_first_page(self):
+        _, newest = self.balances()
+
+        self.assertEqual(self.balances("?after=bm90LWEtY3Vyc29y")[1], newest)
+        cursor = KeysetPaginator.encode_cursor(["not-a-date", "x"])
+        self.assertEqual(self.balances(f"?before={cursor}")[1], newest)
+
+    def test_csv_export_streams_the_whole_ledger(self):
+        response = self.client.get(f"{self.url}?export=csv")
+        rows = list(csv.reader(StringIO(b"".join(response.streaming_content).decode())))
+
+        self.assertEqual(rows[0][:4], ["Date", "Type", "Quantity", "Balance"])
+        self.assertEqual(len(rows), 46)
+        self.assertEqual(rows[-1][3], str(sum(self.quantities)))
+
+
+class DepositDrawDownTests(LedgerTestCase):
+    def test_draw_down_spans_deposits_oldest_first(self):
+        first = self.create_deposit("100.00")
+        second = self.create_deposit("100.00")
+
+        withdrawals = Deposit.draw_down(self.customer, Decimal("150.00"))
+
+        self.assertEqual(
+            [(w.deposit_id, w.withdrawal_amount) for w in withdrawals],
+            [(first.pk, Decimal("100.00")), (second.pk, Decimal("50.00"))],
+        )
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.deposit_status, "completed")
+        self.assertEqual(second.deposit_status, "active")
+        self.assertEqual(CustomerBalance.for_customer(self.customer), Decimal("50.00"))
+        self.assertEqual(CustomerBalance.reconcile(), [])
+        self.assertEqual(
+            Deposit.sync_all_deposit_statuses(dry_run=True),
+            {"completed": [], "reactivated": []},
+        )
+
+    def test_shortfall_writes_nothing(self):
+        self.create_deposit("100.00")
+
+        with self.assertRaises(ValidationError):
+            Deposit.draw_down(self.customer, Decimal("100.01"))
+
+        self.assertFalse(Withdrawal.objects.exists())
+        self.assertEqual(CustomerBalance.for_customer(self.customer), Decimal("100.00"))
+
+    def test_cancelled_deposit_sale_restores_balance(self):
+        model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        payment = self.create_payment([(model, 3, Decimal("80000"))])
+        self.create_delivery(payment, [(model, 1)])
+        self.create_deposit("60000.00")
+        self.create_deposit("60000.00")
+
+        sale = self.create_sale(model, "E1", payment_type="DEPOSIT")
+        self.assertEqual(
+            CustomerBalance.for_customer(self.customer), Decimal("20000.00")
+        )
+        self.cancel_sale(sale)
+
+        self.assertEqual(
+            CustomerBalance.for_customer(self.customer), Decimal("120000.00")
+        )
+        self.assertEqual(CustomerBalance.reconcile(), [])
+        self.assertEqual(
+            list(Deposit.objects.values_list("deposit_status", flat=True)),
+            ["active", "active"],
+        )
+
+
+class DepositBalanceTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(3):
+            self.create_deposit("100.00")
+        first, second = Deposit.draw_down(self.customer, Decimal("150.00"))
+        Deposit.draw_down(self.customer, Decimal("20.00"))
+        second.withdrawal_status = "cancelled"
+        second.save()
+
+    def test_annotated_balances_match_the_computed_ones(self):
+        expected = {
+            deposit.pk: deposit.remaining_balance for deposit in Deposit.objects.all()
+        }
+
+        deposits = list(Deposit.objects.with_balances())
+        with self.assertNumQueries(0):
+            annotated = {deposit.pk: deposit.remaining_balance for deposit in deposits}
+        self.assertEqual(annotated, expected)
+        self.assertEqual(
+            sorted(expected.values()),
+            [Decimal("0.00"), Decimal("80.00"), Decimal("100.00")],
+        )
+
+    def test_deposit_list_cost_does_not_grow_with_the_page(self):
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get("/deposits/").status_code, 200)
+        for _ in range(5):
+            self.create_deposit("100.00")
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get("/deposits/")
+
+        self.assertEqual(len(response.context["object_list"]), 8)
+        self.assertEqual(len(many), len(few))
+
+
+class CustomerBalanceTests(LedgerTestCase):
+    def assertBalance(self, expected):
+        self.assertEqual(CustomerBalance.for_customer(self.customer), Decimal(expected))
+        self.assertEqual(CustomerBalance.reconcile(), [])
+
+    def test_balance_follows_deposit_and_withdrawal_changes(self):
+        deposit = self.create_deposit("100.00")
+        self.assertBalance("100.00")
+
+        deposit.deposit_amount = Decimal("150.00")
+        deposit.save()
+        self.assertBalance("150.00")
+
+        withdrawal = Withdrawal.objects.create(
+            deposit=deposit,
+            withdrawal_amount=Decimal("40.00"),
+            withdrawal_date=timezone.now(),
+            withdrawal_status="completed",
+        )
+        self.assertBalance("110.00")
+
+        withdrawal.withdrawal_status = "cancelled"
+        withdrawal.save()
+        self.assertBalance("150.00")
+
+        deposit.deposit_status = "cancelled"
+        deposit.save()
+        self.assertBalance("0.00")
+
+    def test_customer_list_sorts_by_balance(self):
+        richer = Customer.objects.create(
+            firstname="Bola", lastname="Ade", phone="08000000001", address="Ibadan"
+        )
+        self.create_deposit("100.00")
+        Deposit.objects.create(
+            customer=richer,
+            deposit_amount=Decimal("500.00"),
+            deposit_date=timezone.now(),
+        )
+
+        response = self.client.get("/customers/", {"sort": "-balance"})
+
+        self.assertEqual(
+            [
+                (customer.pk, customer.current_balance)
+                for customer in response.context["customers"]
+            ],
+            [(richer.pk, Decimal("500.00")), (self.customer.pk, Decimal("100.00"))],
+        )
+
+    def test_reconcile_command_fixes_drift(self):
+        self.create_deposit("100.00")
+        CustomerBalance.objects.update(balance=Decimal("1.00"))
+
+        out = StringIO()
+        call_command("reconcile_customer_balances", "--fix", stdout=out)
+
+        self.assertIn("Corrected 1 customer balance(s).", out.getvalue())
+        self.assertBalance("100.00")
+
+
+class DepositStatusSyncTests(LedgerTestCase):
+    def make_drift(self, count):
+        """Deposits whose stored status disagrees with their withdrawals."""
+        drawn, undrawn = [], []
+        for _ in range(count):
+            drawn.append(self.create_deposit("100.00"))
+            undrawn.append(self.create_deposit("100.00"))
+        # bulk_create and update() skip the per-row status bookkeeping.
+        Withdrawal.objects.bulk_create(
+            Withdrawal(
+                deposit=deposit,
+                withdrawal_amount=Decimal("100.00"),
+                withdrawal_date=timezone.now(),
+                withdrawal_status="completed",
+            )
+            for deposit in drawn
+        )
+        Deposit.objects.filter(pk__in=[d.pk for d in undrawn]).update(
+            deposit_status="completed"
+        )
+        return drawn, undrawn
+
+    def statuses(self, deposits):
+        return list(
+            Deposit.objects.filter(pk__in=[d.pk for d in deposits])
+            .order_by("pk")
+            .values_list("deposit_status", flat=True)
+        )
+
+    def test_dry_run_reports_without_writing(self):
+        drawn, undrawn = self.make_drift(2)
+
+        report = Deposit.sync_all_deposit_statuses(dry_run=True)
+
+        self.assertEqual(
+            report,
+            {
+                "completed": sorted(d.deposit_reference for d in drawn),
+                "reactivated": sorted(d.deposit_reference for d in undrawn),
+            },
+        )
+        self.assertEqual(self.statuses(drawn), ["active", "active"])
+        self.assertEqual(self.statuses(undrawn), ["completed", "completed"])
+
+    def test_sync_cost_does_not_grow_with_deposits(self):
+        self.make_drift(2)
+        with CaptureQueriesContext(connection) as few:
+            Deposit.sync_all_deposit_statuses()
+
+        drawn, undrawn = self.make_drift(6)
+        with CaptureQueriesContext(connection) as many:
+            Deposit.sync_all_deposit_statuses()
+
+        self.assertEqual(len(many), len(few))
+        self.assertEqual(self.statuses(drawn), ["completed"] * 6)
+        self.assertEqual(self.statuses(undrawn), ["active"] * 6)
+
+    def test_command_reports_changes(self):
+        self.make_drift(1)
+
+        out = StringIO()
+        call_command("sync_deposit_statuses", stdout=out)
+        self.assertIn("Updated 2 deposit(s).", out.getvalue())
+
+        out = StringIO()
+        call_command("sync_deposit_statuses", "--dry-run", stdout=out)
+        self.assertIn("All deposit statuses are consistent.", out.getvalue())
+
+
+class StockAndCostTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        cheap = self.create_payment([(self.model, 2, Decimal("100000"))])
+        self.cheap_delivery = self.create_delivery(cheap, [(self.model, 2)])
+        dear = self.create_payment([(self.model, 2, Decimal("120000"))])
+        self.create_delivery(dear, [(self.model, 2)])
+
+    def cost_state(self):
+        cost = InventoryCost.objects.get(motorcycle_model=self.model)
+        return {
+            "units_on_hand": cost.units_on_hand,
+            "fifo_value": cost.fifo_value,
+            "remaining": list(
+                CostLayer.objects.filter(quantity_remaining__gt=0)
+                .order_by("received_at", "pk")
+                .values_list("unit_cost", "quantity_remaining")
+            ),
+            "cost_of_sales": sum(
+                consumption.quantity * consumption.unit_cost
+                for consumption in CostLayerConsumption.objects.filter(
+                    is_reversed=False
+                )
+            ),
+        }
+
+    def test_fifo_cancel_and_restore_match_rebuild(self):
+        first = self.create_sale(self.model, "E1")
+        self.create_sale(self.model, "E2")
+        self.create_sale(self.model, "E3")
+        self.cancel_sale(first)
+        # The cancelled unit goes back on the cheaper layer and is sold next.
+        self.assertEqual(self.cost_state()["remaining"][0][1], 1)
+        self.create_sale(self.model, "E4")
+
+        incremental = self.cost_state()
+        self.assertEqual(incremental["units_on_hand"], 1)
+        self.assertEqual(incremental["fifo_value"], Decimal("120000.00"))
+        self.assertEqual(incremental["cost_of_sales"], Decimal("320000.00"))
+
+        CostLayer.rebuild()
+        self.assertEqual(self.cost_state(), incremental)
+
+    def assertStockAtCost(self):
+        inventory = Inventory.objects.get(motorcycle_model=self.model)
+        cost = InventoryCost.objects.get(motorcycle_model=self.model)
+        self.assertEqual(cost.units_on_hand, inventory.current_quantity)
+
+    def test_sale_from_cancelled_delivery_restores_at_cost(self):
+        sale = self.create_sale(self.model, "E1")
+        self.cancel_delivery(self.cheap_delivery)
+        self.assertStockAtCost()
+
+        self.cancel_sale(sale)
+        self.assertStockAtCost()
+        incremental = self.cost_state()
+        self.assertEqual(incremental["units_on_hand"], 2)
+        self.assertEqual(incremental["fifo_value"], Decimal("240000.00"))
+
+        CostLayer.rebuild()
+        self.assertEqual(self.cost_state(), incremental)
+
+    def test_failed_receipt_fails_the_delivery(self):
+        payment = self.create_payment([(self.model, 2, Decimal("100000"))])
+        delivery = SupplierDelivery.objects.create(payment=payment)
+
+        with mock.patch.object(CostLayer, "receive", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                SupplierDeliveryItem.objects.create(
+                    delivery=delivery, motorcycle_model=self.model, delivered_quantity=1
+                )
+
+        self.assertFalse(delivery.delivery_items.exists())
+        self.assertEqual(Inventory.reconcile(), [])
+
+
+class DeliveredQuantityTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.boxer = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        self.cruiser = Motorcycle.objects.create(name="Cruiser", brand="Bajaj")
+        self.payment = self.create_payment(
+            [(self.boxer, 3, 100000), (self.cruiser, 2, 100000)]
+        )
+
+    def delivered(self):
+        return dict(
+            self.payment.payment_items.values_list(
+                "motorcycle_model", "delivered_quantity"
+            )
+        )
+
+    def test_counters_follow_deliveries_and_cancellations(self):
+        self.create_delivery(self.payment, [(self.boxer, 2)])
+        second = self.create_delivery(
+            self.payment, [(self.boxer, 1), (self.cruiser, 2)]
+        )
+        self.assertEqual(self.delivered(), {self.boxer.pk: 3, self.cruiser.pk: 2})
+
+        self.cancel_delivery(second)
+        self.assertEqual(self.delivered(), {self.boxer.pk: 2, self.cruiser.pk: 0})
+        self.assertEqual(SupplierPaymentItem.rebuild_delivered_quantities(), 0)
+
+    def test_rebuild_command_corrects_drift(self):
+        self.create_delivery(self.payment, [(self.boxer, 2)])
+        self.payment.payment_items.update(delivered_quantity=1)
+
+        out = StringIO()
+        call_command("rebuild_delivered_quantities", stdout=out)
+
+        self.assertIn("Corrected 2 payment item(s).", out.getvalue())
+        self.assertEqual(self.delivered(), {self.boxer.pk: 2, self.cruiser.pk: 0})
+
+
+class DeliveryValidationTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.models = [
+            Motorcycle.objects.create(name=f"Model {i}", brand="Bajaj")
+            for i in range(10)
+        ]
+        self.payment = self.create_payment(
+            [(model, 3, 100000) for model in self.models]
+        )
+
+    def formset(self, items):
+        data = {
+            "delivery_items-TOTAL_FORMS": len(items),
+            "delivery_items-INITIAL_FORMS": 0,
+            "delivery_items-MIN_NUM_FORMS": 1,
+            "delivery_items-MAX_NUM_FORMS": 1000,
+        }
+        for i, (model, quantity) in enumerate(items):
+            data[f"delivery_items-{i}-motorcycle_model"] = model.pk
+            data[f"delivery_items-{i}-delivered_quantity"] = quantity
+        return SupplierDeliveryItemFormSetHelper().get_formset(
+            data, instance=SupplierDelivery(payment=self.payment)
+        )
+
+    def item_queries(self, items):
+        tables = (
+            SupplierPaymentItem._meta.db_table,
+            SupplierDeliveryItem._meta.db_table,
+        )
+        formset = self.formset(items)
+        with CaptureQueriesContext(connection) as context:
+            self.assertTrue(formset.is_valid(), formset.errors)
+        return [
+            query
+            for query in context.captured_queries
+            if any(f'FROM "{table}"' in query["sql"] for table in tables)
+        ]
+
+    def test_rows_are_checked_against_one_snapshot(self):
+        few = self.item_queries([(model, 1) for model in self.models[:2]])
+        many = self.item_queries([(model, 1) for model in self.models])
+
+        self.assertEqual(len(few), 1)
+        self.assertEqual(len(many), 1)
+
+    def test_over_delivery_and_unordered_models_are_rejected(self):
+        self.create_delivery(self.payment, [(self.models[0], 2)])
+        other = Motorcycle.objects.create(name="Cruiser", brand="Bajaj")
+
+        formset = self.formset([(self.models[0], 2), (other, 1)])
+
+        self.assertFalse(formset.is_valid())
+        self.assertIn("exceeds expected quantity (3)", str(formset.errors[0]))
+        self.assertIn("not included in the original payment", str(formset.errors[1]))
+
+
+class PaymentCompletionTests(LedgerTestCase):
+    def deliver_in_full(self, item_count):
+        """
+        Record a delivery covering a whole payment and return the payment and
+        the queries its commit-time callbacks ran.
+        """
+        models = [
+            Motorcycle.objects.create(name=f"Model {item_count}-{i}", brand="Bajaj")
+            for i in range(item_count)
+        ]
+        payment = self.create_payment(
+            [(model, 1, Decimal("300000")) for model in models]
+        )
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.create_delivery(payment, [(model, 1) for model in models])
+
+        with CaptureQueriesContext(connection) as context:
+            for callback in callbacks:
+                callback()
+        payment.refresh_from_db()
+        return payment, context.captured_queries
+
+    def test_completion_cost_does_not_grow_with_items(self):
+        with mock.patch.object(
+            SupplierPayment,
+            "recompute_completion",
+            wraps=SupplierPayment.recompute_completion,
+        ) as recompute:
+            small, small_queries = self.deliver_in_full(1)
+            large, large_queries = self.deliver_in_full(30)
+
+        self.assertEqual(small.status, SupplierPayment.COMPLETED)
+        self.assertEqual(large.status, SupplierPayment.COMPLETED)
+        # Each delivery's payment is checked once, at commit, and a 30-item
+        # delivery costs exactly what a 1-item one does.
+        self.assertEqual(
+            [set(call.args[0]) for call in recompute.call_args_list],
+            [{small.pk}, {large.pk}],
+        )
+        self.assertEqual(len(large_queries), len(small_queries))
+
+    def test_checks_are_coalesced_per_transaction(self):
+        model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        payment = self.create_payment([(model, 1, Decimal("300000"))])
+
+        with mock.patch.object(
+            SupplierPayment, "recompute_completion"
+        ) as recompute, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for _ in range(5):
+                    SupplierPayment.schedule_completion_check(payment)
+                recompute.assert_not_called()
+
+        recompute.assert_called_once_with({payment.pk})
+
+    def test_rolled_back_checks_do_not_block_later_ones(self):
+        model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        payment = self.create_payment([(model, 1, Decimal("300000"))])
+
+        with mock.patch.object(SupplierPayment, "recompute_completion") as recompute:
+            with self.assertRaises(ValueError), transaction.atomic():
+                SupplierPayment.schedule_completion_check(payment)
+                raise ValueError
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    SupplierPayment.schedule_completion_check(payment)
+
+        recompute.assert_called_once_with({payment.pk})
+
+
+class OpenOrderBookTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.boxer = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        self.crypton = Motorcycle.objects.create(name="Crypton", brand="Yamaha")
+        self.payment = self.create_payment(
+            [(self.boxer, 3, 100000), (self.crypton, 2, 150000)]
+        )
+
+    def assertOnOrder(self, units, value):
+        self.assertEqual(
+            OpenOrderLine.totals(), {"units": units, "value": Decimal(value)}
+        )
+        self.assertEqual(OpenOrderLine.rebuild(), 0)
+
+    def test_deliveries_apply_deltas_without_rereading_the_payment(self):
+        self.assertOnOrder(5, "600000")
+
+        with mock.patch.object(
+            OpenOrderLine, "_outstanding", side_effect=AssertionError
+        ):
+            delivery = self.create_delivery(self.payment, [(self.boxer, 2)])
+        self.assertOnOrder(3, "400000")
+
+        with mock.patch.object(
+            OpenOrderLine, "_outstanding", side_effect=AssertionError
+        ):
+            self.cancel_delivery(delivery)
+        self.assertOnOrder(5, "600000")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_delivery(self.payment, [(self.boxer, 3), (self.crypton, 2)])
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, SupplierPayment.COMPLETED)
+        self.assertOnOrder(0, "0")
+
+    def test_item_edits_and_cancellation_move_the_book(self):
+        boxer_item = self.payment.payment_items.get(motorcycle_model=self.boxer)
+        crypton_item = self.payment.payment_items.get(motorcycle_model=self.crypton)
+        boxer_item.expected_quantity = 4
+        boxer_item.unit_price = Decimal("90000")
+
+        SupplierPaymentItem.save_batch(
+            self.payment, [boxer_item], deleted=[crypton_item], user=self.user
+        )
+        self.assertOnOrder(4, "360000")
+
+        response = self.client.post(f"/payments/{self.payment.pk}/cancel/")
+        self.assertEqual(response.status_code, 302)
+        self.assertOnOrder(0, "0")
+
+    def test_deleting_a_payment_closes_its_lines(self):
+        self.create_delivery(self.payment, [(self.boxer, 1)])
+
+        self.payment.delete()
+        self.assertOnOrder(0, "0")
+
+
+class ReorderPlanTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.boxer = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        self.crypton = Motorcycle.objects.create(name="Crypton", brand="Yamaha")
+        for model in (self.boxer, self.crypton):
+            InventoryTransaction.objects.create(
+                transaction_type="SUPPLIER_DELIVERY",
+                motorcycle_model=model,
+                quantity=10,
+                reference_model="SupplierDelivery",
+                reference_id=1,
+            )
+        for i in range(3):
+            self.create_sale(self.boxer, f"ENG-{i}")
+
+    def test_suggests_enough_stock_to_cover_the_target(self):
+        plan = reorder.compute_reorder_plan(windows=(7, 30), target_days=30)
+
+        boxer, crypton = plan
+        self.assertEqual(boxer["motorcycle_model_id"], self.boxer.pk)
+        self.assertEqual(boxer["rates"], [(7, 0.429), (30, 0.1)])
+        # 30 days at 0.264 a day needs 8 units; 7 are on hand.
+        self.assertEqual(boxer["on_hand"], 7)
+        self.assertEqual(boxer["suggested_quantity"], 1)
+        self.assertEqual(crypton["suggested_quantity"], 0)
+        self.assertIsNone(crypton["days_of_cover"])
+
+    def test_open_orders_count_towards_cover(self):
+        self.create_payment([(self.boxer, 2, 150000)])
+
+        boxer = reorder.compute_reorder_plan(windows=(7, 30), target_days=30)[0]
+        self.assertEqual(boxer["on_order"], 2)
+        self.assertEqual(boxer["suggested_quantity"], 0)
+
+    def test_plan_is_cached_until_stock_changes(self):
+        with mock.patch.object(
+            reorder, "compute_reorder_plan", wraps=reorder.compute_reorder_plan
+        ) as compute:
+            first = reorder.reorder_plan()
+            self.assertEqual(reorder.reorder_plan(), first)
+            self.assertEqual(compute.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.create_sale(self.boxer, "ENG-3")
+            reorder.reorder_plan()
+            self.assertEqual(compute.call_count, 2)
+
+
+class CacheVersionTests(TestCase):
+    def test_bumps_are_counted_in_the_database(self):
+        version = cache_utils.get_version(cache_utils.INVENTORY)
+
+        cache_utils.bump_version(cache_utils.INVENTORY)
+        cache_utils.bump_version(cache_utils.INVENTORY)
+        self.assertEqual(cache_utils.get_version(cache_utils.INVENTORY), version + 2)
+        self.assertEqual(
+            CacheVersion.objects.get(namespace=cache_utils.INVENTORY).version,
+            version + 2,
+        )
+
+    def test_bumping_an_unread_namespace_stores_nothing(self):
+        cache_utils.bump_version(cache_utils.REPORTS)
+        self.assertFalse(CacheVersion.objects.exists())
+
+    def test_invalidations_are_bumped_once_per_transaction(self):
+        cache_utils._pending.namespaces = set()
+        versions = cache_utils.get_versions([cache_utils.LEDGER, cache_utils.ACTIVITY])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for _ in range(3):
+                cache_utils.invalidate_on_commit(cache_utils.LEDGER)
+            cache_utils.invalidate_on_commit(cache_utils.LEDGER, cache_utils.ACTIVITY)
+
+        self.assertEqual(
+            cache_utils.get_versions([cache_utils.LEDGER, cache_utils.ACTIVITY]),
+            {namespace: version + 1 for namespace, version in versions.items()},
+        )
+
+
+class ReportJobTests(LedgerTestCase):
+    def statement(self):
+        return jobs.enqueue(
+            ReportJob.CUSTOMER_STATEMENT, {"customer": self.customer.pk}, self.user
+        )
+
+    def run_queued(self):
+        return [jobs.execute_job(pk, token) for pk, token in ReportJob.claim(5)]
+
+    def test_each_job_is_claimed_once(self):
+        first, _ = self.statement()
+        second, _ = jobs.enqueue(ReportJob.INVENTORY_VALUATION, {}, self.user)
+
+        claimed = ReportJob.claim(5)
+        self.assertEqual([pk for pk, _ in claimed], [first.pk, second.pk])
+        self.assertEqual(ReportJob.claim(5), [])
+        self.assertEqual(
+            [jobs.execute_job(pk, token) for pk, token in claimed],
+            [ReportJob.DONE, ReportJob.DONE],
+        )
+
+    def test_finished_job_is_reused_until_its_records_change(self):
+        deposit = self.create_deposit("5000")
+        job, created = self.statement()
+        self.assertTrue(created)
+        self.assertEqual(self.statement(), (job, False))
+
+        self.run_queued()
+        self.assertEqual(self.statement(), (job, False))
+
+        deposit.deposit_amount = Decimal("6000")
+        deposit.save()
+        rerun, created = self.statement()
+        self.assertTrue(created)
+
+        self.run_queued()
+        with self.captureOnCommitCallbacks(execute=True):
+            deposit.delete()
+        rerun.refresh_from_db()
+        self.assertIsNotNone(rerun.invalidated_at)
+        self.assertTrue(self.statement()[1])
+
+    def test_stale_job_is_reclaimed_and_its_first_run_dropped(self):
+        job, _ = self.statement()
+        [(pk, first_token)] = ReportJob.claim(5)
+        first_run = ReportJob.objects.get(pk=pk)
+        self.assertEqual(ReportJob.claim(5), [])
+
+        ReportJob.objects.filter(pk=pk).update(
+            updated_at=timezone.now() - ReportJob.STALE_AFTER * 2
+        )
+        [(pk, second_token)] = ReportJob.claim(5)
+        self.assertNotEqual(first_token, second_token)
+
+        self.assertFalse(first_run.finish("Stale", "<p>stale</p>"))
+        self.assertIsNone(jobs.execute_job(pk, first_token))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.RUNNING)
+
+        self.assertEqual(jobs.execute_job(pk, second_token), ReportJob.DONE)
+        job.refresh_from_db()
+        self.assertNotIn("stale", job.output)
+
+
+class ExportTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.customer.address = '=HYPERLINK("http://example.com")'
+        self.customer.save()
+        self.create_deposit("100.5")
+
+    def export(self, path, export_format):
+        response = self.client.get(path, {"export": export_format})
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv_quotes_formulas_and_prints_cents(self):
+        customers = list(
+            csv.DictReader(StringIO(self.export("/customers/", "csv").decode()))
+        )
+        self.assertEqual(customers[0]["Address"], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(customers[0]["Deposit Balance"], "100.50")
+
+        [deposit] = csv.DictReader(StringIO(self.export("/deposits/", "csv").decode()))
+        self.assertEqual(deposit["Amount"], "100.50")
+        self.assertEqual(deposit["Remaining"], "100.50")
+
+    def test_xlsx_keeps_text_as_typed(self):
+        with zipfile.ZipFile(BytesIO(self.export("/customers/", "xlsx"))) as archive:
+            sheet = archive.read("xl/worksheets/sheet1.xml").decode()
+        self.assertIn('<t xml:space="preserve">=HYPERLINK(', sheet)
+        self.assertIn("<v>100.50</v>", sheet)
+
+
+class PeriodReportTests(LedgerTestCase):
+    def deposit(self, day, amount):
+        Deposit.objects.create(
+            customer=self.customer,
+            deposit_amount=Decimal(amount),
+            deposit_date=timezone.make_aware(
+                datetime.datetime.combine(day, datetime.time(12))
+            ),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.deposit(datetime.date(2025, 3, 11), "0.20")
+        self.deposit(datetime.date(2026, 3, 10), "0.10")
+        self.deposit(datetime.date(2026, 3, 11), "0.20")
+        self.deposits = [key for key, *_ in reports.REPORT_SOURCES].index("deposits")
+
+    def report(self, **kwargs):
+        return reports.compute_period_report(
+            datetime.date(2026, 3, 1), datetime.date(2026, 3, 31), "weekly", **kwargs
+        )
+
+    def test_weekly_buckets_sum_to_the_cent(self):
+        report = self.report()
+
+        self.assertEqual(len(report["rows"]), 6)
+        self.assertEqual(report["rows"][0]["start"], datetime.date(2026, 3, 1))
+        self.assertEqual(report["rows"][-1]["end"], datetime.date(2026, 3, 31))
+        self.assertEqual(
+            report["rows"][2]["cells"][self.deposits],
+            {"count": 2, "amount": Decimal("0.30")},
+        )
+        self.assertEqual(
+            report["totals"][self.deposits], {"count": 2, "amount": Decimal("0.30")}
+        )
+        # Amounts are summed as Decimals all the way, never as floats.
+        daily = reports._load(datetime.date(2026, 3, 1), datetime.date(2026, 3, 31))
+        self.assertEqual(sorted(daily["amount"]), [Decimal("0.10"), Decimal("0.20")])
+        self.assertTrue(all(type(amount) is Decimal for amount in daily["amount"]))
+
+    def test_comparison_lines_up_the_same_days_last_year(self):
+        cell = self.report(compare=True)["rows"][2]["cells"][self.deposits]
+
+        self.assertEqual(cell["previous_amount"], Decimal("0.20"))
+        self.assertEqual(cell["change"], 50.0)
+
+
+class PaymentItemBatchTests(LedgerTestCase):
+    def create_order(self, line_count):
+        models = [
+            Motorcycle.objects.create(name=f"Model {line_count}-{i}", brand="Bajaj")
+            for i in range(line_count)
+        ]
+        return self.create_payment([(model, 1, 300000) for model in models])
+
+    def edit_payment(self, payment, quantity):
+        """Post the payment's edit form with every line set to `quantity`."""
+        items = list(payment.payment_items.order_by("pk"))
+        data = {
+            "supplier": payment.supplier_id,
+            "payment_date": self.today(),
+            "payment_method": "CASH",
+            "amount_paid": quantity * 300000 * len(items),
+            "remarks": "",
+            "items-TOTAL_FORMS": len(items),
+            "items-INITIAL_FORMS": len(items),
+            "items-MIN_NUM_FORMS": 0,
+            "items-MAX_NUM_FORMS": 1000,
+        }
+        for i, item in enumerate(items):
+            data.update(
+                {
+                    f"items-{i}-id": item.pk,
+                    f"items-{i}-payment": payment.pk,
+                    f"items-{i}-motorcycle_model": item.motorcycle_model_id,
+                    f"items-{i}-expected_quantity": quantity,
+                    f"items-{i}-unit_price": 300000,
+                    f"items-{i}-remarks": "",
+                }
+            )
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(f"/payments/{payment.pk}/edit/", data)
+        self.assertEqual(response.status_code, 302)
+        return len(context.captured_queries)
+
+    def test_edit_cost_does_not_grow_with_lines(self):
+        small, large = self.create_order(2), self.create_order(50)
+
+        small_queries = self.edit_payment(small, 2)
+        large_queries = self.edit_payment(large, 2)
+
+        self.assertEqual(large_queries, small_queries)
+        self.assertEqual(
+            list(large.payment_items.values_list("expected_quantity", flat=True)),
+            [2] * 50,
+        )
+        self.assertEqual(OpenOrderLine.totals()["units"], 104)
+        self.assertEqual(OpenOrderLine.rebuild(), 0)
+
+    def test_duplicate_models_are_rejected_in_one_check(self):
+        payment = self.create_order(2)
+        first, second = payment.payment_items.order_by("pk")
+        second.motorcycle_model_id = first.motorcycle_model_id
+
+        with self.assertRaisesMessage(ValidationError, "only appear once"):
+            SupplierPaymentItem.save_batch(payment, [second], user=self.user)
+
+
+class SupplierScorecardTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.boxer = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        # Delivered in full over two deliveries, one more cancelled between
+        self.finished = self.create_payment([(self.boxer, 4, 100000)])
+        self.create_delivery(self.finished, [(self.boxer, 1)])
+        self.cancelled = self.create_delivery(self.finished, [(self.boxer, 1)])
+        self.cancel_delivery(self.cancelled)
+        self.create_delivery(self.finished, [(self.boxer, 3)])
+        # Still waiting on one of three units after its only delivery
+        waiting = self.create_payment([(self.boxer, 3, 100000)])
+        self.create_delivery(waiting, [(self.boxer, 2)])
+
+    def scorecard(self):
+        return SupplierScorecard.objects.get(supplier=self.supplier)
+
+    def test_partial_deliveries_follow_delivered_units(self):
+        SupplierScorecard.refresh()
+
+        scorecard = self.scorecard()
+        self.assertEqual(scorecard.expected_units, 7)
+        self.assertEqual(scorecard.delivered_units, 6)
+        self.assertEqual(scorecard.fill_rate, Decimal("85.71"))
+        self.assertEqual(scorecard.deliveries_count, 3)
+        self.assertEqual(scorecard.partial_deliveries, 2)
+        self.assertEqual(scorecard.cancelled_deliveries, 1)
+        self.assertEqual(scorecard.cancelled_delivery_rate, Decimal("25.00"))
+
+    def test_deletes_are_picked_up_by_the_next_refresh(self):
+        Supplier.objects.create(name="Other Motors")
+        # Far enough ahead that no row falls inside the watermark overlap
+        later = timezone.now() + SupplierScorecard.WATERMARK_OVERLAP * 2
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            self.assertEqual(SupplierScorecard.refresh(), 2)
+            self.assertEqual(SupplierScorecard.refresh(), 0)
+
+            self.cancelled.delete()
+            self.assertIsNone(self.scorecard().source_updated_at)
+            self.assertEqual(SupplierScorecard.refresh(), 1)
+
+        self.assertEqual(self.scorecard().cancelled_deliveries, 0)
+        self.assertEqual(self.scorecard().source_updated_at, later)
+
+
+class PurchasePriceTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        self.other_supplier = Supplier.objects.create(name="Bolt Imports")
+        self.recent = self.paid(self.supplier, 100000, days_ago=40)
+        self.old = self.paid(self.other_supplier, 90000, days_ago=120)
+        self.latest = self.paid(self.supplier, 110000, days_ago=0)
+
+    def paid(self, supplier, price, days_ago):
+        payment = self.create_payment([(self.model, 3, price)])
+        payment.supplier = supplier
+        payment.payment_date = timezone.now() - datetime.timedelta(days=days_ago)
+        payment.save()
+        return payment
+
+    def test_latest_and_best_prices_follow_payment_changes(self):
+        self.assertEqual(PurchasePrice.latest(self.model).unit_price, 110000)
+        self.assertEqual(PurchasePrice.best(self.model).unit_price, 100000)
+        self.assertEqual(PurchasePrice.best(self.model, days=180).unit_price, 90000)
+        self.assertEqual(
+            PurchasePrice.latest(self.model, supplier=self.other_supplier).unit_price,
+            90000,
+        )
+
+        self.latest.status = SupplierPayment.CANCELLED
+        self.latest.save()
+        self.assertEqual(PurchasePrice.latest(self.model).unit_price, 100000)
+        self.assertEqual(PurchasePrice.rebuild(), 2)
+
+    def test_lookup_endpoint_answers_every_requested_model(self):
+        missing = Motorcycle.objects.create(name="Cruiser", brand="Bajaj")
+
+        response = self.client.get(
+            "/ajax/purchase-prices/",
+            {
+                "models": f"{self.model.pk},{missing.pk}",
+                "supplier": self.other_supplier.pk,
+            },
+        )
+
+        prices = response.json()["prices"]
+        self.assertEqual(
+            prices[str(self.model.pk)]["latest"]["unit_price"], "110000.00"
+        )
+        self.assertEqual(prices[str(self.model.pk)]["best"]["unit_price"], "100000.00")
+        self.assertEqual(
+            prices[str(self.model.pk)]["latest_from_supplier"]["supplier"]["name"],
+            "Bolt Imports",
+        )
+        self.assertEqual(
+            prices[str(missing.pk)],
+            {"latest": None, "latest_from_supplier": None, "best": None},
+        )
+
+
+class DashboardKpiTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        payment = self.create_payment([(self.model, 4, 100000)])
+        self.create_delivery(payment, [(self.model, 4)])
+
+    def test_sales_windows_count_active_sales_in_range(self):
+        self.create_sale(self.model, "E1", price="150000")
+        self.cancel_sale(self.create_sale(self.model, "E2"))
+        old = self.create_sale(self.model, "E3")
+        old.sale_date = timezone.now() - datetime.timedelta(days=400)
+        old.save()
+
+        figures = kpis.compute_dashboard_kpis()
+
+        for window in kpis.SALES_WINDOWS:
+            self.assertEqual(figures[f"sales_this_{window}_count"], 1)
+            self.assertEqual(figures[f"sales_this_{window}_value"], Decimal("150000"))
+        self.assertEqual(figures["total_inventory_units"], 2)
+        self.assertEqual(
+            figures["sales_by_payment_type_month"],
+            [{"payment_type": "CASH", "count": 1, "total_value": Decimal("150000")}],
+        )
+
+    def test_figures_are_cached_until_a_sale_commits(self):
+        kpis.dashboard_kpis()
+        with self.assertNumQueries(1):
+            figures = kpis.dashboard_kpis()
+        self.assertEqual(figures["sales_this_month_count"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_sale(self.model, "E1")
+
+        self.assertEqual(kpis.dashboard_kpis()["sales_this_month_count"], 1)
+
+
+class DailySalesFactTests(LedgerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.model = Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        payment = self.create_payment([(self.model, 4, 100000)])
+        self.create_delivery(payment, [(self.model, 4)])
+
+    def facts(self):
+        return set(
+            DailySalesFact.objects.values_list(
+                "payment_type", "status", "sales_count", "revenue"
+            )
+        )
+
+    def test_rollup_follows_sales_and_cancellations(self):
+        self.create_sale(self.model, "E1", price="150000")
+        self.create_sale(self.model, "E2", payment_type="TRANSFER")
+        self.cancel_sale(self.create_sale(self.model, "E3"))
+
+        self.assertEqual(
+            self.facts(),
+            {
+                ("CASH", "ACTIVE", 1, Decimal("150000")),
+                ("TRANSFER", "ACTIVE", 1, Decimal("100000")),
+                ("CASH", "CANCELLED", 1, Decimal("100000")),
+            },
+        )
+        self.assertEqual(DailySalesFact.rebuild(), 0)
+
+    def test_rebuild_command_corrects_drift(self):
+        self.create_sale(self.model, "E1")
+        DailySalesFact.objects.update(sales_count=5)
+
+        out = StringIO()
+        call_command("rebuild_daily_sales", stdout=out)
+
+        self.assertIn("Corrected 1 daily sales row(s).", out.getvalue())
+        self.assertEqual(self.facts(), {("CASH", "ACTIVE", 1, Decimal("100000"))})
+
+
+class ActivitySummaryTests(LedgerTestCase):
+    def deposit(self, amount, days_ago):
+        return Deposit.objects.create(
+            customer=self.customer,
+            deposit_amount=Decimal(amount),
+            deposit_date=timezone.now() - datetime.timedelta(days=days_ago),
+        )
+
+    def test_custom_range_is_summarised_with_one_query_per_table(self):
+        self.deposit("100.00", days_ago=10)
+        self.deposit("50.00", days_ago=9)
+        self.deposit("70.00", days_ago=0)
+        today = timezone.localdate()
+        start = today - datetime.timedelta(days=12)
+        end = today - datetime.timedelta(days=5)
+
+        with self.assertNumQueries(len(activity.SUMMARY_SOURCES)):
+            activity.compute_activity_summary(start, end)
+        response = self.client.get(
+            "/reports/activity-log/",
+            {
+                "period": "today",
+                "view_type": "summary",
+                "date_from": start.isoformat(),
+                "date_to": end.isoformat(),
+            },
+        )
+
+        self.assertEqual(
+            response.context["summary_data"],
+            {"New Deposits": {"count": 2, "total_amount": Decimal("150.00")}},
+        )
+
+    def test_summary_is_cached_until_activity_is_recorded(self):
+        today = timezone.localdate()
+        activity.activity_summary(today, today)
+        with self.assertNumQueries(1):
+            summary = activity.activity_summary(today, today)
+        self.assertNotIn("New Deposits", summary)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_deposit("100.00")
+
+        self.assertEqual(
+            activity.activity_summary(today, today)["New Deposits"]["count"], 1
+        )
+
+
+class ReferenceSequenceTests(LedgerTestCase):
+    def day_prefix(self):
+        return f"DEP-{timezone.localdate():%Y%m%d}-"
+
+    def test_references_count_up_within_the_day(self):
+        first, second = self.create_deposit("100"), self.create_deposit("100")
+
+        self.assertEqual(first.deposit_reference, f"{self.day_prefix()}0001")
+        self.assertEqual(second.deposit_reference, f"{self.day_prefix()}0002")
+
+    def test_first_reference_follows_the_highest_stored_one(self):
+        for suffix in ("0041", "9999", "10000", "10000-OLD", "X123"):
+            Deposit.objects.create(
+                customer=self.customer,
+                deposit_amount=Decimal("100"),
+                deposit_reference=f"{self.day_prefix()}{suffix}",
+            )
+
+        with self.assertNumQueries(1):
+            highest = ReferenceSequence._highest_issued(
+                Deposit, "deposit_reference", self.day_prefix()
+            )
+        self.assertEqual(highest, 10000)
+        self.assertEqual(
+            self.create_deposit("100").deposit_reference, f"{self.day_prefix()}10001"
+        )
+
+
+class ActivityEventTests(LedgerTestCase):
+    def events(self, action, instance):
+        return ActivityEvent.objects.filter(
+            action=action,
+            reference_model=type(instance).__name__,
+            reference_id=str(instance.pk),
+        )
+
+    def test_creation_uses_the_assigned_actor(self):
+        with CaptureQueriesContext(connection) as context:
+            model = Motorcycle.objects.create(
+                name="Boxer", brand="Bajaj", created_by=self.user
+            )
+
+        self.assertFalse(
+            any("auth_user" in query["sql"] for query in context.captured_queries)
+        )
+        event = self.events(ActivityEvent.CREATED, model).get()
+        self.assertIn("<strong>admin</strong>", event.description)
+        self.assertEqual(event.actor, self.user)
+
+    def test_status_change_compares_against_the_loaded_status(self):
+        Motorcycle.objects.create(name="Boxer", brand="Bajaj")
+        model = Motorcycle.objects.get(name="Boxer")
+        model.status = Motorcycle.DISCONTINUED
+        model.updated_by = self.user
+
+        with CaptureQueriesContext(connection) as context:
+            model.save()
+        model.save()
+
+        table = Motorcycle._meta.db_table
+        self.assertFalse(
+            any(
+                query["sql"].startswith("SELECT") and f'FROM "{table}"' in query["sql"]
+                for query in context.captured_queries
+            )
+        )
+        event = self.events(ActivityEvent.STATUS_CHANGED, model).get()
+        self.assertIn("<strong>Discontinued</strong>", event.description)
+
+    def test_exhausted_deposit_logs_status_change(self):
+        deposit = self.create_deposit("100.00")
+
+        Deposit.draw_down(self.customer, Decimal("100.00"), user=self.user)
+
+        self.assertTrue(self.events(ActivityEvent.STATUS_CHANGED, deposit).exists())
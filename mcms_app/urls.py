@@ -5,6 +5,20 @@ from . import views
 
 urlpatterns = [
     path("reports/activity-log/", views.ActivityLogView.as_view(), name="activity_log"),
+    path("reports/periods/", views.PeriodReportView.as_view(), name="period_report"),
+    path("reports/jobs/", views.ReportJobListView.as_view(), name="report_job_list"),
+    path("reports/jobs/new/", views.report_job_create, name="report_job_create"),
+    path("reports/jobs/<int:pk>/", views.report_job_detail, name="report_job_detail"),
+    path(
+        "reports/jobs/<int:pk>/status/",
+        views.report_job_status,
+        name="report_job_status",
+    ),
+    path(
+        "reports/jobs/<int:pk>/output/",
+        views.report_job_output,
+        name="report_job_output",
+    ),
     # Deposits
     path("deposits/", views.DepositListView.as_view(), name="deposit_list"),
     path("deposits/create/", views.add_deposit, name="deposit_create"),
@@ -121,6 +135,7 @@ urlpatterns = [
     path("deliveries/<int:pk>/cancel/", views.delivery_cancel, name="delivery_cancel"),
     # Inventory URLs
     path("inventory/", views.InventoryListView.as_view(), name="inventory_list"),
+    path("inventory/reorder/", views.ReorderPlanView.as_view(), name="reorder_plan"),
     path(
         "inventory/<int:pk>/",
         views.InventoryDetailView.as_view(),
@@ -132,6 +147,11 @@ urlpatterns = [
         views.get_payment_items,
         name="get_payment_items",
     ),
+    path(
+        "ajax/purchase-prices/",
+        views.purchase_price_lookup,
+        name="purchase_price_lookup",
+    ),
     path(
         "ajax/validate-payment-total/",
         views.validate_payment_total,
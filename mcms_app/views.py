@@ -17,8 +17,7 @@ from django.db.models import (
 )
 from django.urls import reverse
 from django.db import transaction, IntegrityError
-from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.generic import ListView, DetailView, TemplateView
 from django.views.decorators.http import require_http_methods
 from decimal import Decimal, InvalidOperation
@@ -29,11 +28,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 import datetime
 from django.utils.safestring import mark_safe
 import json
-from operator import itemgetter
 from django.core.exceptions import ValidationError
-
-
-LOW_STOCK_THRESHOLD = 2
+from .exports import ExportMixin, stream_csv
+from .pagination import KeysetPaginator
+from .activity import activity_summary, day_bounds
+from .kpis import dashboard_kpis
+from .reorder import DEFAULT_TARGET_DAYS, DEFAULT_WINDOWS, reorder_plan
+from .reports import period_report
+from .jobs import enqueue
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -41,224 +43,28 @@ class DashboardView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        today = now().date()
-
-        start_of_this_week = today - datetime.timedelta(days=today.weekday())
-        start_of_this_month = today.replace(day=1)
-        start_of_this_year = today.replace(month=1, day=1)
-
-        context["today_date"] = today
-
-        active_sales_this_week_qs = Sale.objects.filter(
-            sale_date__date__gte=start_of_this_week, status="ACTIVE"
-        )
-        context["sales_this_week_count"] = active_sales_this_week_qs.count()
-        context["sales_this_week_value"] = active_sales_this_week_qs.aggregate(
-            total=Coalesce(Sum("final_price"), Value(Decimal("0.00")))
-        )["total"]
-
-        active_sales_this_month_qs = Sale.objects.filter(
-            sale_date__date__gte=start_of_this_month, status="ACTIVE"
-        )
-        context["sales_this_month_count"] = active_sales_this_month_qs.count()
-        context["sales_this_month_value"] = active_sales_this_month_qs.aggregate(
-            total=Coalesce(Sum("final_price"), Value(Decimal("0.00")))
-        )["total"]
-
-        active_sales_this_year_qs = Sale.objects.filter(
-            sale_date__date__gte=start_of_this_year, status="ACTIVE"
-        )
-        context["sales_this_year_count"] = active_sales_this_year_qs.count()
-        context["sales_this_year_value"] = active_sales_this_year_qs.aggregate(
-            total=Coalesce(Sum("final_price"), Value(Decimal("0.00")))
-        )["total"]
-
-        context["recent_sales"] = (
-            Sale.objects.filter(status="ACTIVE")
-            .select_related("customer", "motorcycle")
-            .order_by("-sale_date")[:6]
-        )
-
-        context["top_selling_models_year_qty"] = (
-            Sale.objects.filter(
-                sale_date__date__gte=start_of_this_year, status="ACTIVE"
-            )
-            .values("motorcycle__brand", "motorcycle__name")
-            .annotate(count=Count("motorcycle"))
-            .order_by("-count")[:3]
-        )
-
-        queryset = (
-            Sale.objects.filter(
-                sale_date__date__gte=start_of_this_month, status="ACTIVE"
-            )
-            .values("payment_type")
-            .annotate(count=Count("id"), total_value=Sum("final_price"))
-            .order_by("-total_value")
-        )
-
-        context["sales_by_payment_type_month"] = list(queryset)
-
-        active_deposits_with_balance = Deposit.objects.filter(
-            deposit_status="active"
-        ).annotate(
-            current_withdrawals_sum=Coalesce(
-                Sum(
-                    "withdrawal__withdrawal_amount",
-                    filter=Q(withdrawal__withdrawal_status="completed"),
-                ),
-                Value(Decimal("0.00")),
-                output_field=DecimalField(),
-            ),
-            calculated_remaining_balance=F("deposit_amount")
-            - F("current_withdrawals_sum"),
-        )
-        total_customer_deposit_balance_agg = active_deposits_with_balance.aggregate(
-            total_balance=Coalesce(
-                Sum("calculated_remaining_balance"),
-                Value(Decimal("0.00")),
-                output_field=DecimalField(),
-            )
-        )
-        context["total_customer_deposit_balance"] = total_customer_deposit_balance_agg[
-            "total_balance"
-        ]
-
-        context["recent_deposits"] = Deposit.objects.select_related(
-            "customer"
-        ).order_by("-deposit_date")[:3]
-        context["recent_withdrawals"] = Withdrawal.objects.select_related(
-            "deposit__customer", "sale"
-        ).order_by("-withdrawal_date")[:3]
-
-        context["total_outstanding_loan_balance"] = Loan.objects.filter(
-            loan_status__in=["pending", "partially repaid"]
-        ).aggregate(total=Coalesce(Sum("balance"), Value(Decimal("0.00"))))["total"]
-        context["recent_loans"] = Loan.objects.select_related(
-            "customer", "sale"
-        ).order_by("-loan_date")[:3]
-        context["recent_repayments"] = LoanRepayment.objects.select_related(
-            "loan__customer"
-        ).order_by("-repayment_date")[:5]
-
-        context["recent_supplier_payments"] = SupplierPayment.objects.select_related(
-            "supplier"
-        ).order_by("-payment_date")[:5]
-
-        context["total_inventory_units"] = Inventory.objects.aggregate(
-            total=Coalesce(Sum("current_quantity"), Value(0))
-        )["total"]
-
-        latest_price_subquery = (
-            SupplierPaymentItem.objects.filter(
-                motorcycle_model_id=OuterRef("motorcycle_model_id")
-            )
-            .order_by("-payment__payment_date", "-id")
-            .values("unit_price")
-        )
-        latest_price_subquery.output_field = DecimalField()
-
-        inventory_items_with_latest_cost = Inventory.objects.filter(
-            current_quantity__gt=0
-        ).annotate(
-            latest_unit_cost=Coalesce(
-                Subquery(latest_price_subquery[:1]),
-                Value(Decimal("0.00")),
-                output_field=DecimalField(),
-            )
-        )
-
-        total_inventory_value_data = inventory_items_with_latest_cost.aggregate(
-            total_value=Sum(
-                F("current_quantity") * F("latest_unit_cost"),
-                output_field=DecimalField(),
-            )
-        )
-        context["estimated_total_inventory_value"] = total_inventory_value_data[
-            "total_value"
-        ] or Decimal("0.00")
-
-        delivered_qty_subquery = (
-            SupplierDeliveryItem.objects.filter(
-                delivery__payment_id=OuterRef("payment_id"),
-                motorcycle_model_id=OuterRef("motorcycle_model_id"),
-                delivery__is_cancelled=False,
-            )
-            .values(
-                "delivery__payment_id",
-                "motorcycle_model_id",
-            )
-            .annotate(total_delivered_for_item_on_payment=Sum("delivered_quantity"))
-            .values("total_delivered_for_item_on_payment")
-        )
-        delivered_qty_subquery.output_field = IntegerField()
-
-        active_payment_items_with_delivery_info = SupplierPaymentItem.objects.filter(
-            payment__status=SupplierPayment.ACTIVE
-        ).annotate(
-            total_delivered=Coalesce(
-                Subquery(delivered_qty_subquery[:1]),
-                Value(0),
-                output_field=IntegerField(),
-            )
-        )
-
-        undelivered_summary = (
-            active_payment_items_with_delivery_info.annotate(
-                undelivered_qty_per_item=F("expected_quantity") - F("total_delivered")
-            )
-            .filter(undelivered_qty_per_item__gt=0)
-            .aggregate(
-                grand_total_undelivered_units=Coalesce(
-                    Sum("undelivered_qty_per_item"),
-                    Value(0),
-                    output_field=IntegerField(),
-                ),
-                grand_total_undelivered_value=Coalesce(
-                    Sum(
-                        F("undelivered_qty_per_item") * F("unit_price"),
-                        output_field=DecimalField(),
-                    ),
-                    Value(Decimal("0.00")),
-                ),
-            )
-        )
-
-        context["total_undelivered_units_from_suppliers"] = undelivered_summary[
-            "grand_total_undelivered_units"
-        ]
-        context["total_undelivered_value_from_suppliers"] = undelivered_summary[
-            "grand_total_undelivered_value"
-        ]
-
-        context["low_stock_items_count"] = Inventory.objects.filter(
-            current_quantity__gt=0, current_quantity__lte=LOW_STOCK_THRESHOLD
-        ).count()
-        context["out_of_stock_items_count"] = Inventory.objects.filter(
-            current_quantity__lte=0
-        ).count()
-
-        context["recent_inventory_transactions"] = (
-            InventoryTransaction.objects.select_related("motorcycle_model").order_by(
-                "-transaction_date"
-            )[:5]
-        )
-
-        context["recent_supplier_deliveries"] = SupplierDelivery.objects.select_related(
-            "payment__supplier"
-        ).order_by("-delivery_date")[:3]
-
+        context.update(dashboard_kpis())
+        context["today_date"] = now().date()
         context["title"] = "Dashboard Overview"
         return context
 
 
-class CustomerListView(LoginRequiredMixin, ListView):
+class CustomerListView(LoginRequiredMixin, ExportMixin, ListView):
     """List view for customers with deposit and withdrawal summaries."""
 
     model = Customer
     template_name = "customer_list.html"
     context_object_name = "customers"
     paginate_by = 20
+    export_fields = [
+        ("First Name", "firstname"),
+        ("Last Name", "lastname"),
+        ("Phone", "phone"),
+        ("Address", "address"),
+        ("Deposit Balance", "current_balance"),
+        ("Created", "created_at"),
+    ]
+    export_filename = "customers"
 
     def get_queryset(self):
         queryset = Customer.objects.all()
@@ -277,33 +83,20 @@ class CustomerListView(LoginRequiredMixin, ListView):
             if cleaned_data.get("phone"):
                 queryset = queryset.filter(phone__icontains=cleaned_data["phone"])
 
-        annotated_queryset = (
-            queryset.annotate(
-                total_deposits_raw=Sum(
-                    "deposit__deposit_amount",
-                    filter=Q(deposit__deposit_status__in=["active", "completed"]),
-                    output_field=DecimalField(),
-                ),
-                total_withdrawals_raw=Sum(
-                    "deposit__withdrawal__withdrawal_amount",
-                    filter=Q(deposit__withdrawal__withdrawal_status="completed"),
-                    output_field=DecimalField(),
-                ),
-            )
-            .annotate(
-                total_deposits=Coalesce(
-                    "total_deposits_raw", Decimal("0.00"), output_field=DecimalField()
-                ),
-                total_withdrawals=Coalesce(
-                    "total_withdrawals_raw",
-                    Decimal("0.00"),
-                    output_field=DecimalField(),
-                ),
+        queryset = queryset.annotate(
+            current_balance=Coalesce(
+                "deposit_balance__balance",
+                Decimal("0.00"),
+                output_field=DecimalField(),
             )
-            .annotate(current_balance=F("total_deposits") - F("total_withdrawals"))
         )
 
-        return annotated_queryset.order_by("lastname", "firstname")
+        sort = self.filter_form.is_valid() and self.filter_form.cleaned_data.get("sort")
+        if sort == "-balance":
+            return queryset.order_by("-current_balance", "lastname", "firstname")
+        if sort == "balance":
+            return queryset.order_by("current_balance", "lastname", "firstname")
+        return queryset.order_by("lastname", "firstname")
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -342,8 +135,8 @@ class CustomerDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
 
         customer = self.object
-        deposits = customer.deposit_set.filter(
-            deposit_status__in=["active", "completed"]
+        deposits = Deposit.objects.filter(
+            customer=customer, deposit_status__in=["active", "completed"]
         ).order_by("-deposit_date")
 
         withdrawals = Withdrawal.objects.filter(
@@ -367,7 +160,7 @@ class CustomerDetailView(LoginRequiredMixin, DetailView):
             stats["total_deposits_amount"] - stats["total_withdrawals_amount"]
         )
 
-        context["deposits"] = deposits[:10]
+        context["deposits"] = deposits.with_balances()[:10]
         context["withdrawals"] = withdrawals[:10]
         context["stats"] = stats
 
@@ -402,11 +195,19 @@ def customer_edit(request, pk):
     )
 
 
-class SupplierListView(LoginRequiredMixin, ListView):
+class SupplierListView(LoginRequiredMixin, ExportMixin, ListView):
     model = Supplier
     template_name = "supplier_list.html"
     context_object_name = "suppliers"
     paginate_by = 20
+    export_fields = [
+        ("Name", "name"),
+        ("Phone", "phone"),
+        ("Address", "address"),
+        ("Active Payments", "total_payments"),
+        ("Total Paid", "total_amount"),
+    ]
+    export_filename = "suppliers"
 
     def get_queryset(self):
         queryset = Supplier.objects.all()
@@ -472,68 +273,22 @@ class SupplierDetailView(LoginRequiredMixin, DetailView):
         context = super().get_context_data(**kwargs)
         supplier = self.object
 
-        delivered_qty_subquery = (
-            SupplierDeliveryItem.objects.filter(
-                delivery__payment_id=OuterRef("payment_id"),
-                motorcycle_model_id=OuterRef("motorcycle_model_id"),
-                delivery__is_cancelled=False,
-            )
-            .values(
-                "delivery__payment_id",
-                "motorcycle_model_id",
-            )
-            .annotate(total_delivered_for_item_on_payment=Sum("delivered_quantity"))
-            .values("total_delivered_for_item_on_payment")
-        )
-        delivered_qty_subquery.output_field = IntegerField()
-
-        active_payment_items_with_delivery_info = SupplierPaymentItem.objects.filter(
-            payment__supplier=supplier,
-            payment__status=SupplierPayment.ACTIVE,
-        ).annotate(
-            total_delivered=Coalesce(
-                Subquery(delivered_qty_subquery[:1]),
-                Value(0),
-                output_field=IntegerField(),
-            )
-        )
-
-        undelivered_summary = (
-            active_payment_items_with_delivery_info.annotate(
-                undelivered_qty_per_item=F("expected_quantity") - F("total_delivered")
-            )
-            .filter(undelivered_qty_per_item__gt=0)
-            .aggregate(
-                grand_total_undelivered_units=Coalesce(
-                    Sum("undelivered_qty_per_item"),
-                    Value(0),
-                    output_field=IntegerField(),
-                ),
-                grand_total_undelivered_value=Coalesce(
-                    Sum(
-                        F("undelivered_qty_per_item") * F("unit_price"),
-                        output_field=DecimalField(),
-                    ),
-                    Value(Decimal("0.00")),
-                ),
-            )
-        )
+        undelivered_summary = OpenOrderLine.totals(supplier=supplier)
 
         payments = supplier.payments.exclude(status=SupplierPayment.CANCELLED).order_by(
             "-payment_date"
         )
 
         stats = {
-            "total_undelivered_units_from_suppliers": undelivered_summary[
-                "grand_total_undelivered_units"
-            ],
-            "total_undelivered_value_from_suppliers": undelivered_summary[
-                "grand_total_undelivered_value"
-            ],
+            "total_undelivered_units_from_suppliers": undelivered_summary["units"],
+            "total_undelivered_value_from_suppliers": undelivered_summary["value"],
         }
 
         context["payments"] = payments[:10]
         context["stats"] = stats
+        context["scorecard"] = SupplierScorecard.objects.filter(
+            supplier=supplier
+        ).first()
 
         return context
 
@@ -561,11 +316,21 @@ def supplier_edit(request, pk):
     )
 
 
-class PaymentListView(LoginRequiredMixin, ListView):
+class PaymentListView(LoginRequiredMixin, ExportMixin, ListView):
     model = SupplierPayment
     template_name = "payment_list.html"
     context_object_name = "payments"
     paginate_by = 20
+    export_fields = [
+        ("Reference", "payment_reference"),
+        ("Supplier", "supplier__name"),
+        ("Date", "payment_date"),
+        ("Amount Paid", "amount_paid"),
+        ("Method", "payment_method"),
+        ("Status", "status"),
+        ("Remarks", "remarks"),
+    ]
+    export_filename = "supplier_payments"
 
     def get_queryset(self):
         queryset = SupplierPayment.objects.select_related("supplier").prefetch_related(
@@ -634,9 +399,8 @@ def payment_create(request):
             payment.save()
 
             formset.instance = payment
-            formset.save()
+            formset.save_items(user=request.user)
 
-            payment.update_completion_status()
             messages.success(
                 request, f'Payment "{payment.payment_reference}" created successfully.'
             )
@@ -689,22 +453,13 @@ class PaymentDetailView(LoginRequiredMixin, DetailView):
 
         delivery_status_list = []
         for item in payment.payment_items.all():
-            delivered_qty = (
-                SupplierDeliveryItem.objects.filter(
-                    delivery__payment=payment,
-                    motorcycle_model=item.motorcycle_model,
-                    delivery__is_cancelled=False,
-                ).aggregate(total=Sum("delivered_quantity"))["total"]
-                or 0
-            )
-
             delivery_status_list.append(
                 {
                     "item": item,
-                    "delivered_quantity": delivered_qty,
-                    "remaining_quantity": item.expected_quantity - delivered_qty,
+                    "delivered_quantity": item.delivered_quantity,
+                    "remaining_quantity": item.remaining_quantity,
                     "total_value": item.unit_price * item.expected_quantity,
-                    "is_complete": delivered_qty >= item.expected_quantity,
+                    "is_complete": item.is_fully_delivered,
                 }
             )
 
@@ -744,9 +499,8 @@ def payment_edit(request, pk):
                 saved_payment = form.save()
 
                 formset.instance = saved_payment
-                formset.save()
+                formset.save_items(user=request.user)
 
-                saved_payment.update_completion_status(force_recalculate=True)
                 messages.success(
                     request,
                     f'Payment "{saved_payment.payment_reference}" updated successfully.',
@@ -828,13 +582,22 @@ def payment_cancel(request, pk):
     return render(request, "generic_cancel_confirm.html", context)
 
 
-class DeliveryListView(LoginRequiredMixin, ListView):
+class DeliveryListView(LoginRequiredMixin, ExportMixin, ListView):
     """List view for deliveries"""
 
     model = SupplierDelivery
     template_name = "delivery_list.html"
     context_object_name = "deliveries"
     paginate_by = 20
+    export_fields = [
+        ("Reference", "delivery_reference"),
+        ("Supplier", "payment__supplier__name"),
+        ("Payment", "payment__payment_reference"),
+        ("Date", "delivery_date"),
+        ("Cancelled", "is_cancelled"),
+        ("Remarks", "remarks"),
+    ]
+    export_filename = "deliveries"
 
     def get_queryset(self):
         queryset = SupplierDelivery.objects.select_related(
@@ -891,10 +654,11 @@ def delivery_create(request):
                 delivery.updated_by = request.user
                 delivery.save()
                 formset.instance = delivery
-                formset.save()
-
-                if delivery.payment:
-                    delivery.payment.update_completion_status(force_recalculate=True)
+                delivery_items = formset.save(commit=False)
+                for delivery_item in delivery_items:
+                    delivery_item.defer_inventory_posting = True
+                    delivery_item.save()
+                delivery.post_inventory_receipts(delivery_items, user=request.user)
 
                 messages.success(
                     request,
@@ -977,9 +741,6 @@ def delivery_cancel(request, pk):
             f'Delivery "{delivery.delivery_reference}" has been cancelled and inventory has been adjusted.',
         )
 
-        if payment_to_update:
-            payment_to_update.update_completion_status(force_recalculate=True)
-
         return redirect("delivery_detail", pk=delivery.pk)
 
     consequences = [
@@ -1000,13 +761,20 @@ def delivery_cancel(request, pk):
     return render(request, "generic_cancel_confirm.html", context)
 
 
-class InventoryListView(LoginRequiredMixin, ListView):
+class InventoryListView(LoginRequiredMixin, ExportMixin, ListView):
     """List view for inventory"""
 
     model = Inventory
     template_name = "inventory_list.html"
     context_object_name = "inventory_items"
     paginate_by = 20
+    export_fields = [
+        ("Brand", "motorcycle_model__brand"),
+        ("Model", "motorcycle_model__name"),
+        ("Quantity", "current_quantity"),
+        ("Last Updated", "last_updated"),
+    ]
+    export_filename = "inventory"
 
     def get_queryset(self):
         queryset = Inventory.objects.select_related("motorcycle_model").order_by(
@@ -1044,6 +812,28 @@ class InventoryListView(LoginRequiredMixin, ListView):
         return context
 
 
+class ReorderPlanView(LoginRequiredMixin, TemplateView):
+    """Suggested purchase quantities from recent sales velocity"""
+
+    template_name = "reorder_plan.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = ReorderPlanForm(self.request.GET)
+        windows, target_days = DEFAULT_WINDOWS, DEFAULT_TARGET_DAYS
+        if form.is_valid():
+            windows = form.cleaned_data["windows"] or windows
+            target_days = form.cleaned_data["target_days"] or target_days
+
+        plan = reorder_plan(windows=windows, target_days=target_days)
+        context["filter_form"] = form
+        context["plan"] = plan
+        context["windows"] = sorted(set(windows))
+        context["target_days"] = target_days
+        context["reorder_count"] = sum(1 for row in plan if row["suggested_quantity"])
+        return context
+
+
 class InventoryDetailView(LoginRequiredMixin, DetailView):
     model = Inventory
     template_name = "inventory_detail.html"
@@ -1056,19 +846,71 @@ class InventoryDetailView(LoginRequiredMixin, DetailView):
         queryset = super().get_queryset().select_related("motorcycle_model")
         return queryset
 
+    def get(self, request, *args, **kwargs):
+        if request.GET.get("export") == "csv":
+            return self.export_csv()
+        return super().get(request, *args, **kwargs)
+
+    def export_csv(self):
+        inventory = self.get_object()
+        ledger = (
+            InventoryTransaction.ledger_with_balance(inventory.motorcycle_model)
+            .order_by("transaction_date", "id")
+            .values_list(
+                "transaction_date",
+                "transaction_type",
+                "quantity",
+                "running_balance",
+                "reference_model",
+                "reference_id",
+                "remarks",
+            )
+        )
+        rows = (
+            (localtime(date).strftime("%Y-%m-%d %H:%M:%S"), *rest)
+            for date, *rest in ledger.iterator(chunk_size=2000)
+        )
+        return stream_csv(
+            f"inventory_{inventory.motorcycle_model_id}_ledger.csv",
+            [
+                "Date",
+                "Type",
+                "Quantity",
+                "Balance",
+                "Reference Model",
+                "Reference ID",
+                "Remarks",
+            ],
+            rows,
+        )
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         inventory = self.object
 
-        transactions_list = InventoryTransaction.objects.filter(
-            motorcycle_model=inventory.motorcycle_model
-        ).order_by("-transaction_date")
-
-        paginator = Paginator(transactions_list, 20)
-        page_number = self.request.GET.get("page")
-        page_obj = paginator.get_page(page_number)
+        paginator = KeysetPaginator(
+            InventoryTransaction.ledger_with_balance(inventory.motorcycle_model), 20
+        )
+        before = self.request.GET.get("before")
+        page = paginator.get_page(after=self.request.GET.get("after"), before=before)
 
-        context["transactions"] = page_obj
+        # Walking back towards newer rows filters out everything up to the
+        # cursor, so the window restarts there; add that balance back.
+        cursor = (
+            None if self.request.GET.get("after") else paginator.decode_cursor(before)
+        )
+        if cursor:
+            opening_balance = InventoryTransaction.balance_through(
+                inventory.motorcycle_model, *cursor
+            )
+            for transaction_row in page:
+                transaction_row.running_balance += opening_balance
+
+        context["transactions"] = page
+        if page.has_next:
+            context["older_url"] = page.next_querystring(self.request.GET)
+        if page.has_previous:
+            context["newer_url"] = page.previous_querystring(self.request.GET)
         return context
 
 
@@ -1078,16 +920,7 @@ def get_payment_items(request, payment_id):
         payment = SupplierPayment.objects.get(id=payment_id)
         items = []
 
-        for item in payment.payment_items.all():
-            delivered_qty = (
-                SupplierDeliveryItem.objects.filter(
-                    delivery__payment=payment,
-                    motorcycle_model=item.motorcycle_model,
-                    delivery__is_cancelled=False,
-                ).aggregate(total=Sum("delivered_quantity"))["total"]
-                or 0
-            )
-
+        for item in payment.payment_items.select_related("motorcycle_model"):
             items.append(
                 {
                     "id": item.id,
@@ -1096,8 +929,8 @@ def get_payment_items(request, payment_id):
                         "name": str(item.motorcycle_model),
                     },
                     "expected_quantity": item.expected_quantity,
-                    "delivered_quantity": delivered_qty,
-                    "remaining_quantity": item.expected_quantity - delivered_qty,
+                    "delivered_quantity": item.delivered_quantity,
+                    "remaining_quantity": item.remaining_quantity,
                     "unit_price": float(item.unit_price),
                 }
             )
@@ -1107,6 +940,52 @@ def get_payment_items(request, payment_id):
         return JsonResponse({"error": "Payment not found"}, status=404)
 
 
+@login_required
+def purchase_price_lookup(request):
+    """Latest and best recent purchase prices for the requested models (AJAX)"""
+    model_ids = [
+        int(model_id)
+        for model_id in request.GET.get("models", "").split(",")
+        if model_id.strip().isdigit()
+    ]
+    try:
+        days = max(int(request.GET.get("days", 90)), 1)
+    except ValueError:
+        days = 90
+    supplier_id = request.GET.get("supplier")
+    supplier_id = int(supplier_id) if supplier_id and supplier_id.isdigit() else None
+
+    def describe(price):
+        if price is None:
+            return None
+        return {
+            "unit_price": str(price.unit_price),
+            "price_date": price.price_date.isoformat(),
+            "supplier": {"id": price.supplier_id, "name": price.supplier.name},
+        }
+
+    latest = PurchasePrice.latest_for_models(model_ids)
+    best = PurchasePrice.best_for_models(model_ids, days=days)
+    from_supplier = (
+        PurchasePrice.latest_for_models(model_ids, supplier=supplier_id)
+        if supplier_id
+        else {}
+    )
+    return JsonResponse(
+        {
+            "days": days,
+            "prices": {
+                model_id: {
+                    "latest": describe(latest.get(model_id)),
+                    "latest_from_supplier": describe(from_supplier.get(model_id)),
+                    "best": describe(best.get(model_id)),
+                }
+                for model_id in model_ids
+            },
+        }
+    )
+
+
 def validate_payment_total(request):
     """Validate payment total against item costs (AJAX)"""
     if request.method == "POST":
@@ -1138,14 +1017,31 @@ def validate_payment_total(request):
     return JsonResponse({"error": "Invalid request"}, status=400)
 
 
-class DepositListView(LoginRequiredMixin, ListView):
+class DepositListView(LoginRequiredMixin, ExportMixin, ListView):
     model = Deposit
     template_name = "deposit_list.html"
     context_object_name = "deposits"
     paginate_by = 20
+    export_fields = [
+        ("Reference", "deposit_reference"),
+        ("Customer First Name", "customer__firstname"),
+        ("Customer Last Name", "customer__lastname"),
+        ("Date", "deposit_date"),
+        ("Type", "deposit_type"),
+        ("Amount", "deposit_amount"),
+        ("Withdrawn", "total_withdrawn"),
+        ("Remaining", "annotated_remaining_balance"),
+        ("Status", "deposit_status"),
+        ("Note", "transaction_note"),
+    ]
+    export_filename = "deposits"
 
     def get_queryset(self):
-        queryset = Deposit.objects.select_related("customer").order_by("-deposit_date")
+        queryset = (
+            Deposit.objects.select_related("customer")
+            .with_balances()
+            .order_by("-deposit_date")
+        )
 
         self.filter_form = DepositFilterForm(self.request.GET or None)
         if self.filter_form.is_valid():
@@ -1194,7 +1090,7 @@ class DepositDetailView(LoginRequiredMixin, DetailView):
     context_object_name = "deposit"
 
     def get_queryset(self):
-        return super().get_queryset().select_related("customer")
+        return super().get_queryset().select_related("customer").with_balances()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -1355,11 +1251,22 @@ def cancel_deposit(request, deposit_id):
     return render(request, "generic_cancel_confirm.html", context)
 
 
-class WithdrawalListView(LoginRequiredMixin, ListView):
+class WithdrawalListView(LoginRequiredMixin, ExportMixin, ListView):
     model = Withdrawal
     template_name = "withdrawal_list.html"
     context_object_name = "withdrawals"
     paginate_by = 20
+    export_fields = [
+        ("Deposit", "deposit__deposit_reference"),
+        ("Customer First Name", "deposit__customer__firstname"),
+        ("Customer Last Name", "deposit__customer__lastname"),
+        ("Sale", "sale__sale_reference"),
+        ("Date", "withdrawal_date"),
+        ("Amount", "withdrawal_amount"),
+        ("Status", "withdrawal_status"),
+        ("Remarks", "remarks"),
+    ]
+    export_filename = "withdrawals"
 
     def get_queryset(self):
         queryset = Withdrawal.objects.select_related(
@@ -1779,11 +1686,23 @@ def motorcycle_delete_permanently_view(request, pk):
     return render(request, "generic_cancel_confirm.html", context)
 
 
-class LoanListView(LoginRequiredMixin, ListView):
+class LoanListView(LoginRequiredMixin, ExportMixin, ListView):
     model = Loan
     template_name = "loan_list.html"
     context_object_name = "loans"
     paginate_by = 20
+    export_fields = [
+        ("Reference", "loan_reference"),
+        ("Customer First Name", "customer__firstname"),
+        ("Customer Last Name", "customer__lastname"),
+        ("Sale", "sale__sale_reference"),
+        ("Date", "loan_date"),
+        ("Amount", "loan_amount"),
+        ("Balance", "balance"),
+        ("Status", "loan_status"),
+        ("Remarks", "remarks"),
+    ]
+    export_filename = "loans"
 
     def get_queryset(self):
         queryset = Loan.objects.select_related("customer", "sale").order_by(
@@ -1981,11 +1900,20 @@ def cancel_loan(request, loan_id):
     return render(request, "generic_cancel_confirm.html", context)
 
 
-class LoanRepaymentListView(LoginRequiredMixin, ListView):
+class LoanRepaymentListView(LoginRequiredMixin, ExportMixin, ListView):
     model = LoanRepayment
     template_name = "loan_repayment_list.html"
     context_object_name = "repayments"
     paginate_by = 20
+    export_fields = [
+        ("Loan", "loan__loan_reference"),
+        ("Customer First Name", "loan__customer__firstname"),
+        ("Customer Last Name", "loan__customer__lastname"),
+        ("Date", "repayment_date"),
+        ("Amount", "repayment_amount"),
+        ("Remarks", "remarks"),
+    ]
+    export_filename = "loan_repayments"
 
     def get_queryset(self):
         queryset = LoanRepayment.objects.select_related("loan__customer").order_by(
@@ -2147,9 +2075,7 @@ def delete_loan_repayment(request, repayment_id):
 
 
 def generate_sale_reference():
-    today_str = timezone.now().strftime("%Y%m%d")
-    last_sale_id = Sale.objects.count()
-    return f"SALE-{today_str}-{last_sale_id + 1:04d}"
+    return ReferenceSequence.next_reference("SALE", Sale, "sale_reference")
 
 
 def _process_deposit_payment(sale_instance, customer, amount_needed):
@@ -2158,58 +2084,35 @@ def _process_deposit_payment(sale_instance, customer, amount_needed):
     Returns True if successful, False otherwise.
     Raises ValidationError if balance insufficient (should be caught by form, but as safeguard).
     """
-    active_deposits = Deposit.objects.filter(
-        customer=customer, deposit_status__in=["active"]
-    ).order_by("deposit_date")
-
-    total_available_balance = Decimal("0.00")
-    for deposit in active_deposits:
-        balance_on_this_deposit = deposit.deposit_amount - deposit.get_total_withdrawn()
-        if balance_on_this_deposit > Decimal("0.00"):
-            total_available_balance += balance_on_this_deposit
-
-    if total_available_balance < amount_needed:
-        raise ValidationError(
-            f"Insufficient total deposit balance. Need {amount_needed}, have {total_available_balance}."
-        )
-
-    amount_to_cover = amount_needed
-    withdrawals_to_create = []
-
-    for deposit in active_deposits:
-        if amount_to_cover <= Decimal("0.00"):
-            break
-
-        balance_on_this_deposit = deposit.deposit_amount - deposit.get_total_withdrawn()
-        if balance_on_this_deposit <= Decimal("0.00"):
-            continue
-
-        amount_from_this_deposit = min(balance_on_this_deposit, amount_to_cover)
-
-        new_withdrawal = Withdrawal(
-            deposit=deposit,
-            withdrawal_amount=amount_from_this_deposit,
-            withdrawal_date=timezone.now(),
-            remarks=f"Payment for Sale {sale_instance.sale_reference} (Motorcycle Eng: {sale_instance.engine_no})",
-            withdrawal_status="completed",
-            sale=sale_instance,
-        )
-        withdrawals_to_create.append(new_withdrawal)
-        amount_to_cover -= amount_from_this_deposit
-
-    if amount_to_cover > Decimal("0.00"):
-        return False
-
-    for wd in withdrawals_to_create:
-        wd.save()
-    return True
+    withdrawals = Deposit.draw_down(
+        customer,
+        amount_needed,
+        sale=sale_instance,
+        remarks=f"Payment for Sale {sale_instance.sale_reference} (Motorcycle Eng: {sale_instance.engine_no})",
+        user=sale_instance.created_by,
+    )
+    return bool(withdrawals)
 
 
-class SaleListView(LoginRequiredMixin, ListView):
+class SaleListView(LoginRequiredMixin, ExportMixin, ListView):
     model = Sale
     template_name = "sale_list.html"
     context_object_name = "sales"
     paginate_by = 20
+    export_fields = [
+        ("Reference", "sale_reference"),
+        ("Date", "sale_date"),
+        ("Customer First Name", "customer__firstname"),
+        ("Customer Last Name", "customer__lastname"),
+        ("Brand", "motorcycle__brand"),
+        ("Model", "motorcycle__name"),
+        ("Engine No", "engine_no"),
+        ("Chassis No", "chassis_no"),
+        ("Payment Type", "payment_type"),
+        ("Final Price", "final_price"),
+        ("Status", "status"),
+    ]
+    export_filename = "sales"
 
     def get_queryset(self):
         queryset = Sale.objects.select_related("customer", "motorcycle").order_by(
@@ -2305,6 +2208,7 @@ def sale_create_view(request):
                     created_by=request.user,
                     updated_by=request.user,
                 )
+                CostLayer.consume(sale)
                 messages.success(
                     request, f"Sale {sale.sale_reference} created successfully."
                 )
@@ -2386,6 +2290,7 @@ def sale_cancel_view(request, pk):
                 reference_id=sale.pk,
                 remarks=f"Reversal for cancelled Sale: {sale.sale_reference}",
             )
+            CostLayer.restore(sale)
             if original_payment_type == "DEPOSIT":
                 withdrawals_to_cancel = Withdrawal.objects.filter(
                     sale=sale, withdrawal_status="completed"
@@ -2456,261 +2361,193 @@ class ActivityLogView(LoginRequiredMixin, TemplateView):
 
         period = "today"
         view_type = "summary"
+        date_from = date_to = None
 
         if filter_form.is_valid():
             period = filter_form.cleaned_data["period"]
             view_type = filter_form.cleaned_data["view_type"]
+            date_from = filter_form.cleaned_data.get("date_from")
+            date_to = filter_form.cleaned_data.get("date_to") or date_from
 
         is_summary_view = view_type == "summary"
         today = timezone.now().date()
-        if period == "today":
-            start_date = today
-            end_date = today + datetime.timedelta(days=1)
+        if date_from:
+            start_date, end_date = date_from, date_to
+        elif period == "today":
+            start_date = end_date = today
         elif period == "yesterday":
-            start_date = today - datetime.timedelta(days=1)
-            end_date = today
+            start_date = end_date = today - datetime.timedelta(days=1)
         elif period == "this_week":
             start_date = today - datetime.timedelta(days=today.weekday())
-            end_date = start_date + datetime.timedelta(days=7)
+            end_date = start_date + datetime.timedelta(days=6)
         elif period == "last_7_days":
             start_date = today - datetime.timedelta(days=6)
-            end_date = today + datetime.timedelta(days=1)
+            end_date = today
         else:
             start_date = today.replace(day=1)
             next_month = (start_date + datetime.timedelta(days=32)).replace(day=1)
-            end_date = next_month
+            end_date = next_month - datetime.timedelta(days=1)
 
-        start_datetime = timezone.make_aware(
-            datetime.datetime.combine(start_date, datetime.datetime.min.time())
-        )
-        end_datetime = timezone.make_aware(
-            datetime.datetime.combine(end_date, datetime.datetime.min.time())
-        )
+        start_datetime, end_datetime = day_bounds(start_date, end_date)
 
         if is_summary_view:
-            summary_data = {
-                "New Sales": {"count": 0, "total_amount": Decimal("0.00")},
-                "New Supplier Payments": {"count": 0, "total_amount": Decimal("0.00")},
-                "New Deliveries": {"count": 0, "total_amount": None},
-                "New Deposits": {"count": 0, "total_amount": Decimal("0.00")},
-                "New Withdrawals": {"count": 0, "total_amount": Decimal("0.00")},
-                "New Loans": {"count": 0, "total_amount": Decimal("0.00")},
-                "New Loan Repayments": {"count": 0, "total_amount": Decimal("0.00")},
-                "Inventory Updates": {"count": 0, "total_amount": None},
-                "New Motorcycle Models": {"count": 0, "total_amount": None},
-                "New Suppliers": {"count": 0, "total_amount": None},
-            }
-
-            sales_qs = Sale.objects.filter(
-                sale_date__gte=start_datetime, sale_date__lt=end_datetime
+            context["summary_data"] = activity_summary(start_date, end_date)
+            context["is_paginated"] = False
+        else:
+            events = ActivityEvent.objects.filter(
+                occurred_at__gte=start_datetime, occurred_at__lt=end_datetime
             )
-            summary_data["New Sales"]["count"] = sales_qs.count()
-            summary_data["New Sales"]["total_amount"] = sales_qs.aggregate(
-                total=Sum("final_price")
-            )["total"] or Decimal("0.00")
+            event_type = filter_form.is_valid() and filter_form.cleaned_data.get(
+                "event_type"
+            )
+            if event_type:
+                events = events.filter(event_type=event_type)
 
-            payments_qs = SupplierPayment.objects.filter(
-                payment_date__gte=start_datetime, payment_date__lt=end_datetime
+            paginator = KeysetPaginator(
+                events, self.paginate_by, keys=("occurred_at", "id")
             )
-            summary_data["New Supplier Payments"]["count"] = payments_qs.count()
-            summary_data["New Supplier Payments"]["total_amount"] = (
-                payments_qs.aggregate(total=Sum("amount_paid"))["total"]
-                or Decimal("0.00")
+            page = paginator.get_page(
+                after=self.request.GET.get("after"),
+                before=self.request.GET.get("before"),
             )
 
-            summary_data["New Deliveries"]["count"] = SupplierDelivery.objects.filter(
-                delivery_date__gte=start_datetime, delivery_date__lt=end_datetime
-            ).count()
+            context["activities"] = page
+            context["is_paginated"] = page.has_other_pages
+            if page.has_next:
+                context["older_url"] = page.next_querystring(self.request.GET)
+            if page.has_previous:
+                context["newer_url"] = page.previous_querystring(self.request.GET)
 
-            deposits_qs = Deposit.objects.filter(
-                deposit_date__gte=start_datetime, deposit_date__lt=end_datetime
+        context["filter_form"] = filter_form
+        if date_from:
+            context["title"] = (
+                f"Activity Log for {start_date:%b %d, %Y} to {end_date:%b %d, %Y}"
             )
-            summary_data["New Deposits"]["count"] = deposits_qs.count()
-            summary_data["New Deposits"]["total_amount"] = deposits_qs.aggregate(
-                total=Sum("deposit_amount")
-            )["total"] or Decimal("0.00")
+        else:
+            context["title"] = f"Activity Log for {period.replace('_', ' ').title()}"
+        context["print_mode"] = self.request.GET.get("print", "false").lower() == "true"
+        context["is_summary_view"] = is_summary_view
+        context["start_date"] = start_date
+        context["end_date"] = end_date
 
-            withdrawals_qs = Withdrawal.objects.filter(
-                withdrawal_date__gte=start_datetime, withdrawal_date__lt=end_datetime
-            )
-            summary_data["New Withdrawals"]["count"] = withdrawals_qs.count()
-            summary_data["New Withdrawals"]["total_amount"] = withdrawals_qs.aggregate(
-                total=Sum("withdrawal_amount")
-            )["total"] or Decimal("0.00")
+        return context
 
-            loans_qs = Loan.objects.filter(
-                loan_date__gte=start_datetime, loan_date__lt=end_datetime
-            )
-            summary_data["New Loans"]["count"] = loans_qs.count()
-            summary_data["New Loans"]["total_amount"] = loans_qs.aggregate(
-                total=Sum("loan_amount")
-            )["total"] or Decimal("0.00")
 
-            repayments_qs = LoanRepayment.objects.filter(
-                repayment_date__gte=start_datetime, repayment_date__lt=end_datetime
-            )
-            summary_data["New Loan Repayments"]["count"] = repayments_qs.count()
-            summary_data["New Loan Repayments"]["total_amount"] = (
-                repayments_qs.aggregate(total=Sum("repayment_amount"))["total"]
-                or Decimal("0.00")
-            )
+class PeriodReportView(LoginRequiredMixin, TemplateView):
+    """Ledger totals for any date range, bucketed by day, week, month or year"""
 
-            summary_data["Inventory Updates"]["count"] = (
-                InventoryTransaction.objects.filter(
-                    transaction_date__gte=start_datetime,
-                    transaction_date__lt=end_datetime,
-                ).count()
-            )
-            summary_data["New Motorcycle Models"]["count"] = Motorcycle.objects.filter(
-                created_at__gte=start_datetime, created_at__lt=end_datetime
-            ).count()
-            summary_data["New Suppliers"]["count"] = Supplier.objects.filter(
-                created_at__gte=start_datetime, created_at__lt=end_datetime
-            ).count()
-
-            context["summary_data"] = {
-                k: v for k, v in summary_data.items() if v["count"] > 0
-            }
-            context["is_paginated"] = False
-        else:
-            raw_activities = []
-            sales = Sale.objects.filter(
-                sale_date__gte=start_datetime, sale_date__lt=end_datetime
-            ).select_related("customer", "motorcycle")
-            for sale in sales:
-                user_name = (
-                    sale.created_by.username if sale.created_by else "a system user"
-                )
-                raw_activities.append(
-                    {
-                        "timestamp": sale.sale_date,
-                        "activity_type": "New Sale",
-                        "description": f"Sale <a href='{sale.get_absolute_url()}'>{sale.sale_reference}</a> to {sale.customer.name} for ₦{sale.final_price:,.2f} was created by <strong>{user_name}</strong>",
-                    }
-                )
-            payments = SupplierPayment.objects.filter(
-                payment_date__gte=start_datetime, payment_date__lt=end_datetime
-            ).select_related("supplier")
-            for p in payments:
-                user_name = p.created_by.username if p.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": p.payment_date,
-                        "activity_type": "New Supplier Payment",
-                        "description": f"Payment <a href='{reverse('payment_detail', args=[p.pk])}'>{p.payment_reference}</a> of ₦{p.amount_paid:,.2f} to {p.supplier.name} was created by <strong>{user_name}</strong>",
-                    }
-                )
-            deliveries = SupplierDelivery.objects.filter(
-                delivery_date__gte=start_datetime, delivery_date__lt=end_datetime
-            ).select_related("payment__supplier")
-            for d in deliveries:
-                user_name = d.created_by.username if d.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": d.delivery_date,
-                        "activity_type": "New Delivery",
-                        "description": f"Delivery <a href='{d.get_absolute_url()}'>{d.delivery_reference}</a> received from {d.payment.supplier.name} was created by <strong>{user_name}</strong>",
-                    }
-                )
-            deposits = Deposit.objects.filter(
-                deposit_date__gte=start_datetime, deposit_date__lt=end_datetime
-            ).select_related("customer")
-            for d in deposits:
-                user_name = d.created_by.username if d.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": d.deposit_date,
-                        "activity_type": "New Deposit",
-                        "description": f"Deposit <a href='{d.get_absolute_url()}'>{d.deposit_reference}</a> of ₦{d.deposit_amount:,.2f} from {d.customer.name} was created by <strong>{user_name}</strong>",
-                    }
-                )
-            withdrawals = Withdrawal.objects.filter(
-                withdrawal_date__gte=start_datetime, withdrawal_date__lt=end_datetime
-            ).select_related("deposit__customer")
-            for w in withdrawals:
-                user_name = w.created_by.username if w.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": w.withdrawal_date,
-                        "activity_type": "New Withdrawal",
-                        "description": f"Withdrawal of ₦{w.withdrawal_amount:,.2f} from {w.deposit.customer.name}'s account (<a href='{w.get_absolute_url()}'>Details</a>) was created by <strong>{user_name}</strong>",
-                    }
-                )
-            loans = Loan.objects.filter(
-                loan_date__gte=start_datetime, loan_date__lt=end_datetime
-            ).select_related("customer")
-            for l in loans:
-                user_name = l.created_by.username if l.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": l.loan_date,
-                        "activity_type": "New Loan",
-                        "description": f"Loan <a href='{l.get_absolute_url()}'>{l.loan_reference}</a> of ₦{l.loan_amount:,.2f} issued to {l.customer.name} was created by <strong>{user_name}</strong>",
-                    }
-                )
-            repayments = LoanRepayment.objects.filter(
-                repayment_date__gte=start_datetime, repayment_date__lt=end_datetime
-            ).select_related("loan__customer")
-            for r in repayments:
-                user_name = r.created_by.username if r.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": r.repayment_date,
-                        "activity_type": "New Loan Repayment",
-                        "description": f"Repayment of ₦{r.repayment_amount:,.2f} for loan {r.loan.loan_reference} by {r.loan.customer.name} (<a href='{r.get_absolute_url()}'>Details</a>) was created by <strong>{user_name}</strong>",
-                    }
-                )
-            inv_trans = InventoryTransaction.objects.filter(
-                transaction_date__gte=start_datetime, transaction_date__lt=end_datetime
-            ).select_related("motorcycle_model")
-            for t in inv_trans:
-                user_name = t.created_by.username if t.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": t.transaction_date,
-                        "activity_type": "Inventory Update",
-                        "description": f"{t.get_transaction_type_display()}: {t.quantity} units of {t.motorcycle_model}. Remarks: {t.remarks} was created by <strong>{user_name}</strong>",
-                    }
-                )
-            motorcycles = Motorcycle.objects.filter(
-                created_at__gte=start_datetime, created_at__lt=end_datetime
+    template_name = "reports/period_report.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        today = timezone.localdate()
+        defaults = {
+            "date_from": today.replace(month=1, day=1),
+            "date_to": today,
+            "granularity": "monthly",
+        }
+        form = PeriodReportForm(self.request.GET or defaults)
+
+        if form.is_valid():
+            start_date = form.cleaned_data["date_from"]
+            end_date = form.cleaned_data["date_to"]
+            granularity = form.cleaned_data["granularity"]
+            compare = form.cleaned_data["compare"]
+            context["report"] = period_report(
+                start_date, end_date, granularity, compare
             )
-            for m in motorcycles:
-                user_name = m.created_by.username if m.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": m.created_at,
-                        "activity_type": "New Motorcycle Model",
-                        "description": f"Model <a href='{m.get_absolute_url()}'>{m}</a> was added to the system. Created by <strong>{user_name}</strong>",
-                    }
-                )
-            suppliers = Supplier.objects.filter(
-                created_at__gte=start_datetime, created_at__lt=end_datetime
+            context["compare"] = compare
+            context["title"] = (
+                f"{dict(form.fields['granularity'].choices)[granularity]} Report, "
+                f"{start_date:%b %d, %Y} to {end_date:%b %d, %Y}"
             )
-            for s in suppliers:
-                user_name = s.created_by.username if s.created_by else "a system user"
-                raw_activities.append(
-                    {
-                        "timestamp": s.created_at,
-                        "activity_type": "New Supplier",
-                        "description": f"Supplier <a href='{reverse('supplier_detail', args=[s.pk])}'>{s.name}</a> was added. Created by <strong>{user_name}</strong>",
-                    }
-                )
+        else:
+            context["title"] = "Period Report"
 
-            sorted_activities = sorted(
-                raw_activities, key=itemgetter("timestamp"), reverse=True
-            )
-            paginator = Paginator(sorted_activities, self.paginate_by)
-            page_number = self.request.GET.get("page")
-            page_obj = paginator.get_page(page_number)
+        context["filter_form"] = form
+        context["print_mode"] = self.request.GET.get("print", "false").lower() == "true"
+        return context
 
-            context["activities"] = page_obj
-            context["page_obj"] = page_obj
-            context["is_paginated"] = True if paginator.num_pages > 1 else False
 
-        context["filter_form"] = filter_form
-        context["title"] = f"Activity Log for {period.replace('_', ' ').title()}"
-        context["print_mode"] = self.request.GET.get("print", "false").lower() == "true"
-        context["is_summary_view"] = is_summary_view
+class ReportJobListView(LoginRequiredMixin, ListView):
+    """Recent background report jobs, with a form to queue another"""
+
+    model = ReportJob
+    template_name = "reports/report_job_list.html"
+    context_object_name = "jobs"
+    paginate_by = 20
 
+    def get_queryset(self):
+        return ReportJob.objects.select_related("requested_by").defer("output", "error")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        today = timezone.localdate()
+        context["form"] = ReportJobForm(
+            initial={"date_from": today.replace(day=1), "date_to": today}
+        )
         return context
+
+
+@login_required
+@require_http_methods(["POST"])
+def report_job_create(request):
+    """Queue a report, or hand back the job already covering the same request"""
+    form = ReportJobForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect("report_job_list")
+
+    job, created = enqueue(
+        form.cleaned_data["report_type"], form.get_params(), request.user
+    )
+    if created:
+        messages.success(
+            request,
+            f"{job.get_report_type_display()} queued. This page updates as it runs.",
+        )
+    elif job.status == ReportJob.DONE:
+        messages.info(request, "An up-to-date copy of this report is ready.")
+    else:
+        messages.info(request, "This report is already being prepared.")
+    return redirect(job)
+
+
+@login_required
+def report_job_detail(request, pk):
+    job = get_object_or_404(
+        ReportJob.objects.select_related("requested_by").defer("output"), pk=pk
+    )
+    return render(
+        request,
+        "reports/report_job_detail.html",
+        {"job": job, "title": f"{job.get_report_type_display()} #{job.pk}"},
+    )
+
+
+@login_required
+def report_job_status(request, pk):
+    """Progress of a job, polled by its detail page"""
+    job = get_object_or_404(ReportJob.objects.defer("output"), pk=pk)
+    return JsonResponse(
+        {
+            "status": job.status,
+            "status_display": job.get_status_display(),
+            "progress": job.progress,
+            "message": job.progress_message,
+            "error": job.error_summary,
+            "output_url": (
+                reverse("report_job_output", kwargs={"pk": job.pk})
+                if job.status == ReportJob.DONE
+                else None
+            ),
+        }
+    )
+
+
+@login_required
+def report_job_output(request, pk):
+    job = get_object_or_404(ReportJob, pk=pk, status=ReportJob.DONE)
+    return HttpResponse(job.output)
@@ -0,0 +1,22 @@
+"""
+Entry points for report worker processes. Pool processes are spawned fresh,
+so this module must import without Django being set up; everything that
+touches models is imported inside the functions, after setup().
+"""
+
+
+def setup():
+    import django
+
+    django.setup()
+
+
+def run_job(pk, token):
+    from django.db import connections
+
+    from .jobs import execute_job
+
+    try:
+        return execute_job(pk, token)
+    finally:
+        connections.close_all()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from decouple import config
 
@@ -78,6 +79,21 @@ DATABASES = {
     }
 }
 
+# Cache - shared on disk so every process serves the same entries. The
+# namespace versions that retire them are counted in the database.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": config(
+            "CACHE_LOCATION",
+            default=os.path.join(tempfile.gettempdir(), "mcms_cache"),
+        ),
+        "OPTIONS": {
+            "MAX_ENTRIES": 5000,
+        },
+    }
+}
+
 # Email Configuration - Console backend for development
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 